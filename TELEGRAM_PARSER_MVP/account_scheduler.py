@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+🕉️ Account Scheduler - Выбор аккаунта для следующего запроса
+
+Вместо round-robin аккаунты упорядочиваются в очереди с приоритетом:
+сначала те, что свободны раньше (FloodWait, rate_limit_delay, часовое
+окно, дневной лимит), затем по оставшейся квоте с учетом здоровья -
+доли ошибок и задержки последних запросов из rate_limits.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Задержка ответа, при которой здоровье аккаунта падает вдвое (секунды)
+LATENCY_SCALE = 1.0
+
+
+class AccountScheduler:
+    """
+    Планировщик аккаунтов MultiAccountParser
+
+    Работает поверх общих структур парсера: словаря аккаунтов, списка
+    активных id, AccountStateStore и RateLimiter (паузы FloodWait).
+    """
+
+    def __init__(self, accounts: Dict, active_accounts: List[str], account_state, rate_limiter):
+        self.accounts = accounts
+        self.active_accounts = active_accounts
+        self.account_state = account_state
+        self.rate_limiter = rate_limiter
+
+    def _hourly_exhausted(self, account) -> bool:
+        return bool(account.max_hourly_requests and
+                    self.account_state.requests_in_window(account.account_id) >= account.max_hourly_requests)
+
+    def has_quota(self, account) -> bool:
+        """Остались ли у аккаунта запросы (с автоматическим сбросом в новый день)"""
+        self.account_state.roll_over(account)
+        return account.daily_requests < account.max_daily_requests and not self._hourly_exhausted(account)
+
+    def delay(self, account) -> float:
+        """Через сколько секунд аккаунт сможет сделать запрос"""
+        now = datetime.now()
+        self.account_state.roll_over(account)
+
+        if account.daily_requests >= account.max_daily_requests:
+            tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            return (tomorrow - now).total_seconds()
+
+        delays = [0.0, self.rate_limiter.paused_until.get(account.account_id, 0.0) - time.monotonic()]
+        if account.last_request_time:
+            delays.append(account.rate_limit_delay - (now - account.last_request_time).total_seconds())
+        if self._hourly_exhausted(account):
+            delays.append(self.account_state.window_frees_at(account.account_id) - time.time())
+        return max(delays)
+
+    def health(self, account_id: str) -> float:
+        """Оценка 0..1 по доле ошибок и средней задержке последних запросов"""
+        recent = self.account_state.recent_requests(account_id)
+        if not recent:
+            return 1.0
+        error_rate = sum(1 for _, success in recent if not success) / len(recent)
+        latency = sum(response_time for response_time, _ in recent) / len(recent)
+        return (1.0 - error_rate) / (1.0 + latency / LATENCY_SCALE)
+
+    def _queue(self) -> List:
+        """Очередь с приоритетом: (задержка, -взвешенная квота, id)"""
+        heap = []
+        for account_id in self.active_accounts:
+            account = self.accounts[account_id]
+            remaining = account.max_daily_requests - account.daily_requests
+            score = remaining * self.health(account_id)
+            heap.append((self.delay(account), -score, account_id))
+        heapq.heapify(heap)
+        return heap
+
+    def ranked_accounts(self, limit: Optional[int] = None, available_only: bool = True) -> List:
+        """Аккаунты в порядке приоритета"""
+        heap = self._queue()
+        ranked = []
+        while heap and (limit is None or len(ranked) < limit):
+            delay, _, account_id = heapq.heappop(heap)
+            if available_only and delay > 0:
+                break
+            ranked.append(self.accounts[account_id])
+        return ranked
+
+    def ready_accounts(self, limit: Optional[int] = None) -> List:
+        """
+        Аккаунты, которые могут работать сейчас, в порядке приоритета
+
+        В отличие от ranked_accounts() не отбрасывает аккаунт, которому
+        осталось выждать только rate_limit_delay после недавнего запроса:
+        исключаются лишь аккаунты на паузе и без квоты.
+        """
+        ready = [
+            account for account in self.ranked_accounts(available_only=False)
+            if self.has_quota(account) and not self.rate_limiter.is_paused(account.account_id)
+        ]
+        return ready[:limit] if limit is not None else ready
+
+    def next_account(self):
+        """Лучший аккаунт, свободный прямо сейчас, или None"""
+        ranked = self.ranked_accounts(limit=1)
+        return ranked[0] if ranked else None
+
+    async def wait_for_account(self):
+        """Ожидание ровно до момента, когда освободится первый аккаунт"""
+        while True:
+            heap = self._queue()
+            if not heap:
+                return None
+
+            delay, _, account_id = heap[0]
+            if delay <= 0:
+                return self.accounts[account_id]
+
+            logger.info(f"⏳ Все аккаунты заняты, {account_id} освободится через {delay:.1f} с")
+            await asyncio.sleep(delay)
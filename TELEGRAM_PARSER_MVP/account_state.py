@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+🕉️ Account State - Постоянное состояние аккаунтов MultiAccountParser
+
+Дневное использование, скользящее окно запросов и дедлайны FloodWait
+хранятся в таблицах accounts и rate_limits и переживают перезапуск.
+Дневной счетчик сбрасывается автоматически при смене даты.
+"""
+
+import logging
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Окно скользящего счетчика запросов (секунды)
+REQUEST_WINDOW_SECONDS = 3600
+
+# Сколько дней хранить журнал rate_limits
+RATE_LIMITS_RETENTION_DAYS = 7
+
+# Сколько последних запросов учитывать в оценке здоровья аккаунта
+RECENT_REQUESTS = 100
+
+INSERT_REQUEST_SQL = '''
+    INSERT INTO rate_limits (account_id, request_type, timestamp, response_time, success, error_type)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+UPSERT_ACCOUNT_SQL = '''
+    INSERT INTO accounts (
+        account_id, api_id, phone_number, daily_requests, last_request_time,
+        total_requests, errors_count, is_active, usage_date, flood_wait_until
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (account_id) DO UPDATE SET
+        daily_requests = excluded.daily_requests,
+        last_request_time = excluded.last_request_time,
+        total_requests = total_requests + excluded.total_requests,
+        errors_count = errors_count + excluded.errors_count,
+        usage_date = excluded.usage_date,
+        flood_wait_until = excluded.flood_wait_until
+'''
+
+
+def _to_db_time(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat(sep=' ') if value else None
+
+
+def _from_db_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class AccountStateStore:
+    """
+    Загрузка и сохранение состояния аккаунтов
+
+    Запросы копятся в памяти (скользящее окно + очередь строк rate_limits)
+    и сбрасываются в базу одной транзакцией через persist().
+    """
+
+    def __init__(self, storage, window_seconds: int = REQUEST_WINDOW_SECONDS):
+        self.storage = storage
+        self.window_seconds = window_seconds
+        self.windows: Dict[str, Deque[float]] = {}
+        self.recent: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._pending: List[Tuple] = []
+
+    @staticmethod
+    def roll_over(account) -> bool:
+        """Сброс дневного счетчика при смене даты"""
+        today = date.today().isoformat()
+        if account.usage_date == today:
+            return False
+
+        if account.usage_date is not None:
+            logger.info(f"📅 Новый день для аккаунта {account.account_id}: счетчик запросов сброшен")
+        account.daily_requests = 0
+        account.usage_date = today
+        return True
+
+    def window(self, account_id: str) -> Deque[float]:
+        """Метки времени запросов аккаунта за последнее окно"""
+        timestamps = self.windows.setdefault(account_id, deque())
+        cutoff = time.time() - self.window_seconds
+        while timestamps and timestamps[0] < cutoff:
+            timestamps.popleft()
+        return timestamps
+
+    def requests_in_window(self, account_id: str) -> int:
+        return len(self.window(account_id))
+
+    def window_frees_at(self, account_id: str) -> float:
+        """Время (epoch), когда самый старый запрос выйдет из окна"""
+        timestamps = self.window(account_id)
+        return timestamps[0] + self.window_seconds if timestamps else time.time()
+
+    def recent_requests(self, account_id: str) -> Deque[Tuple[float, bool]]:
+        """Последние запросы аккаунта: (время ответа, успех)"""
+        return self.recent.setdefault(account_id, deque(maxlen=RECENT_REQUESTS))
+
+    def consecutive_errors(self, account_id: str) -> int:
+        """Число последних запросов аккаунта, завершившихся ошибкой подряд"""
+        count = 0
+        for _, success in reversed(self.recent_requests(account_id)):
+            if success:
+                break
+            count += 1
+        return count
+
+    def load(self, account) -> float:
+        """
+        Восстановление состояния аккаунта из базы
+
+        Возвращает, сколько секунд еще длится сохраненный FloodWait.
+        """
+        row = self.storage.fetchone(
+            "SELECT daily_requests, last_request_time, usage_date, flood_wait_until FROM accounts WHERE account_id = ?",
+            (account.account_id,)
+        )
+        if row:
+            daily_requests, last_request_time, usage_date, flood_wait_until = row
+            account.daily_requests = daily_requests or 0
+            account.last_request_time = _from_db_time(last_request_time)
+            account.usage_date = usage_date
+            account.flood_wait_until = _from_db_time(flood_wait_until)
+
+        self.roll_over(account)
+
+        since = datetime.now() - timedelta(seconds=self.window_seconds)
+        rows = self.storage.fetchall(
+            "SELECT timestamp FROM rate_limits WHERE account_id = ? AND timestamp >= ? ORDER BY timestamp",
+            (account.account_id, _to_db_time(since))
+        )
+        self.windows[account.account_id] = deque(_from_db_time(ts).timestamp() for ts, in rows)
+
+        rows = self.storage.fetchall(
+            "SELECT response_time, success FROM rate_limits WHERE account_id = ? ORDER BY timestamp DESC LIMIT ?",
+            (account.account_id, RECENT_REQUESTS)
+        )
+        recent = self.recent_requests(account.account_id)
+        recent.clear()
+        recent.extend((response_time or 0.0, bool(success)) for response_time, success in reversed(rows))
+
+        if account.flood_wait_until:
+            return max((account.flood_wait_until - datetime.now()).total_seconds(), 0.0)
+        return 0.0
+
+    def record_request(self, account, request_type: str, response_time: float,
+                       error_type: Optional[str] = None):
+        """Учет выполненного запроса (в памяти до следующего persist)"""
+        now = datetime.now()
+        self.window(account.account_id).append(now.timestamp())
+        self.recent_requests(account.account_id).append((response_time, error_type is None))
+        self._pending.append((
+            account.account_id, request_type, _to_db_time(now),
+            response_time, error_type is None, error_type
+        ))
+
+    def save(self, accounts: Iterable, rows: Optional[List[Tuple]] = None):
+        """Запись накопленных запросов и состояния аккаунтов одной транзакцией"""
+        if rows is None:
+            rows, self._pending = self._pending, []
+
+        totals: Dict[str, List[int]] = {}
+        for account_id, _, _, _, success, _ in rows:
+            counters = totals.setdefault(account_id, [0, 0])
+            counters[0] += 1
+            counters[1] += 0 if success else 1
+
+        with self.storage.transaction() as conn:
+            if rows:
+                conn.executemany(INSERT_REQUEST_SQL, rows)
+            for account in accounts:
+                total_requests, errors_count = totals.get(account.account_id, (0, 0))
+                conn.execute(UPSERT_ACCOUNT_SQL, (
+                    account.account_id,
+                    account.api_id,
+                    account.phone_number,
+                    account.daily_requests,
+                    _to_db_time(account.last_request_time),
+                    total_requests,
+                    errors_count,
+                    account.is_active,
+                    account.usage_date,
+                    _to_db_time(account.flood_wait_until)
+                ))
+
+    async def persist(self, accounts: Iterable):
+        """Сохранение в потоке БД (строки забираются в потоке event loop)"""
+        rows, self._pending = self._pending, []
+        await self.storage.run(self.save, list(accounts), rows)
+
+    def prune(self, days: int = RATE_LIMITS_RETENTION_DAYS):
+        """Удаление старых записей журнала запросов"""
+        cutoff = datetime.now() - timedelta(days=days)
+        with self.storage.transaction() as conn:
+            conn.execute("DELETE FROM rate_limits WHERE timestamp < ?", (_to_db_time(cutoff),))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+🕉️ Analysis Cache - Кэш результатов анализа текста
+
+Ключ - хэш нормализованного текста, опций анализа и версии анализаторов,
+поэтому пересланные и шаблонные посты, а также повторный парсинг стоят
+одного поиска вместо NLP. LRU в памяти стоит перед таблицей analysis_cache.
+"""
+
+import json
+import logging
+import unicodedata
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+INSERT_ANALYSIS_SQL = '''
+    INSERT INTO analysis_cache (text_hash, sentiment, keywords, language)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (text_hash) DO NOTHING
+'''
+
+
+def normalize_for_cache(text: str) -> str:
+    """
+    Нормализация текста для ключа: NFC и схлопнутые пробелы
+
+    Регистр не меняется - анализаторы могут его учитывать.
+    """
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class AnalysisCache:
+    """
+    LRU результатов анализа поверх таблицы analysis_cache
+
+    Промахи LRU читаются из базы батчем по ключам; чтение и запись идут
+    через поток БД, а не в цикле событий.
+    """
+
+    def __init__(self, storage, max_size: int = 10000):
+        self.storage = storage
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Dict]" = OrderedDict()
+        self.stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0
+        }
+
+    def key(self, text: str, options_key: str) -> bytes:
+        """Ключ кэша: текст + analysis_key() опций (в нем и версия анализаторов)"""
+        digest = blake2b(digest_size=16)
+        for part in (options_key, normalize_for_cache(text)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def _remember(self, key: bytes, result: Dict):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self, keys: Sequence[bytes]) -> Dict[bytes, Dict]:
+        placeholders = ",".join("?" for _ in keys)
+        rows = self.storage.fetchall(
+            f"SELECT text_hash, sentiment, keywords, language FROM analysis_cache WHERE text_hash IN ({placeholders})",
+            list(keys)
+        )
+        return {
+            key: {'sentiment': sentiment, 'keywords': json.loads(keywords) if keywords else [], 'language': language}
+            for key, sentiment, keywords, language in rows
+        }
+
+    async def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, Dict]:
+        """Найденные результаты анализа по ключам (промахи отсутствуют в ответе)"""
+        found = {}
+        missing = []
+        for key in keys:
+            result = self._entries.get(key)
+            if result is None:
+                missing.append(key)
+            else:
+                self._entries.move_to_end(key)
+                found[key] = result
+                self.stats['memory_hits'] += 1
+
+        if missing:
+            try:
+                loaded = await self.storage.run(self._load, list(dict.fromkeys(missing)))
+            except Exception as e:
+                logger.error(f"Ошибка чтения кэша анализа: {e}")
+                loaded = {}
+            for key in missing:
+                result = loaded.get(key)
+                if result is None:
+                    self.stats['misses'] += 1
+                    continue
+                self._remember(key, result)
+                found[key] = result
+                self.stats['db_hits'] += 1
+
+        return found
+
+    def _save(self, items: List[Tuple[bytes, Dict]]):
+        with self.storage.transaction() as conn:
+            conn.executemany(INSERT_ANALYSIS_SQL, [
+                (key, result.get('sentiment'), json.dumps(result.get('keywords')), result.get('language'))
+                for key, result in items
+            ])
+
+    async def put_many(self, items: List[Tuple[bytes, Dict]]):
+        """Сохранение свежих результатов анализа"""
+        if not items:
+            return
+        for key, result in items:
+            self._remember(key, result)
+        try:
+            await self.storage.run(self._save, items)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения кэша анализа: {e}")
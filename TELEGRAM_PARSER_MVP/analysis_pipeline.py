@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+🕉️ Analysis Pipeline - Стадия анализа текста между загрузкой и записью
+
+Цикл загрузки только кладет сырые сообщения в очередь. Воркеры набирают
+батчи, анализируют их в ProcessPoolExecutor и передают результат писателю,
+поэтому загрузка и NLP масштабируются независимо.
+
+Перед анализом батч проходит дедупликацию (MinHash-LSH): почти-дубликаты
+получают cluster_id канонической копии и ее сохраненный анализ. Остальные
+тексты ищутся в кэше анализа по точному хэшу, в процессы уходят только промахи.
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from analysis_cache import AnalysisCache
+from batch_analysis import save_corpus_counts
+from dedup import Deduplicator, analysis_key, signature_batch
+from metrics import BATCH_SIZE, STAGE_SECONDS
+from text_analysis import analyze_batch
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AnalysisConfig:
+    """Конфигурация стадии анализа"""
+    batch_size: int = 64
+    flush_interval: float = 0.5  # секунды
+    queue_size: int = 2000
+    workers: int = 0  # 0 - по числу ядер
+    dedup: bool = True  # поиск почти-дубликатов и переиспользование анализа
+    cache_size: int = 10000  # записей LRU кэша анализа, 0 - без кэша
+
+
+class AnalysisPipeline:
+    """
+    Пул анализа сообщений
+
+    Каждый воркер-корутина держит в процессе не больше одного батча,
+    так что число батчей в работе равно числу процессов.
+    """
+
+    def __init__(self, writer, config: Optional[AnalysisConfig] = None):
+        self.writer = writer
+        self.config = config or AnalysisConfig()
+        self.workers = self.config.workers or os.cpu_count() or 1
+        self.queue: Optional[asyncio.Queue] = None
+        self.dedup = Deduplicator(writer.storage) if self.config.dedup else None
+        self.corpus_db = writer.storage.db_path
+        self.cache = AnalysisCache(writer.storage, self.config.cache_size) if self.config.cache_size else None
+        self.stats = {
+            'analyzed_messages': 0,
+            'reused_analysis': 0,
+            'cached_analysis': 0,
+            'batches': 0,
+            'errors': 0
+        }
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self):
+        """Запуск пула процессов и воркеров"""
+        if self.is_running:
+            return
+
+        self.queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        logger.info(f"🧠 Стадия анализа запущена ({self.workers} процессов, batch={self.config.batch_size})")
+
+    async def put(self, msg, options: Dict, progress=None):
+        """Постановка сообщения в очередь анализа (ждет при переполнении)"""
+        if not self.is_running:
+            await self.start()
+        await self.queue.put((msg, options, progress))
+
+    async def flush(self):
+        """Ожидание анализа и записи всех поставленных сообщений"""
+        if self.is_running:
+            await self.queue.join()
+        await self.writer.flush()
+
+    async def stop(self):
+        """Дообработка очереди и остановка пула"""
+        if not self.is_running:
+            return
+
+        await self.flush()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        logger.info(f"🧠 Стадия анализа остановлена, обработано {self.stats['analyzed_messages']} сообщений")
+
+    async def _next_batch(self) -> List[Tuple]:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.config.flush_interval
+
+        while len(batch) < self.config.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _assign_clusters(self, batch: List[Tuple]) -> List[Tuple[Optional[int], Optional[Dict], bool]]:
+        """Кластеры почти-дубликатов для батча (без дедупликации - пустые)"""
+        empty = [(None, None, False)] * len(batch)
+        if self.dedup is None:
+            return empty
+
+        loop = asyncio.get_running_loop()
+        try:
+            signatures = await loop.run_in_executor(
+                self._executor, signature_batch, [msg.text for msg, _, _ in batch]
+            )
+            refs = [(msg.channel_id, msg.id, analysis_key(options)) for msg, options, _ in batch]
+            return await self.dedup.assign(refs, signatures)
+        except Exception as e:
+            # Дедупликация не должна останавливать запись: анализируем как обычно
+            logger.error(f"Ошибка дедупликации батча ({len(batch)} сообщений): {e}")
+            self.stats['errors'] += 1
+            return empty
+
+    async def _update_corpus(self, analyzed: List[Dict]):
+        """Термы проанализированных текстов пополняют корпус IDF"""
+        term_counts = Counter()
+        documents = 0
+        for result in analyzed:
+            terms = result.pop('terms', None)
+            if terms is not None:
+                term_counts.update(terms)
+                documents += 1
+        if not documents:
+            return
+        try:
+            await self.writer.storage.run(save_corpus_counts, self.writer.storage, term_counts, documents)
+        except Exception as e:
+            logger.error(f"Ошибка обновления корпуса IDF: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._next_batch()
+            BATCH_SIZE.observe(len(batch), stage="analyze")
+            started = loop.time()
+            try:
+                clusters = await self._assign_clusters(batch)
+                results = [cached for _, cached, _ in clusters]
+                reused = sum(1 for result in results if result is not None)
+
+                pending = [i for i, result in enumerate(results) if result is None]
+                cache_keys = {}
+                if self.cache is not None and pending:
+                    cache_keys = {i: self.cache.key(batch[i][0].text, analysis_key(batch[i][1])) for i in pending}
+                    hits = await self.cache.get_many(list(cache_keys.values()))
+                    for i in pending:
+                        results[i] = hits.get(cache_keys[i])
+                    pending = [i for i in pending if results[i] is None]
+                cached = len(batch) - reused - len(pending)
+
+                # Одинаковые тексты внутри батча анализируются один раз
+                unique = []
+                seen = set()
+                for i in pending:
+                    key = cache_keys.get(i, i)
+                    if key not in seen:
+                        seen.add(key)
+                        unique.append(i)
+                # Путь к корпусу IDF нужен только воркеру, в ключ опций кэша он не входит
+                payload = [(batch[i][0].text, {**batch[i][1], 'corpus_db': self.corpus_db}) for i in unique]
+                try:
+                    analyzed = await loop.run_in_executor(self._executor, analyze_batch, payload) if payload else []
+                except BrokenProcessPool as e:
+                    # Процесс-воркер упал: пересоздаем пул, батч пишем без анализа
+                    logger.error(f"Пул анализа сломан, перезапуск: {e}")
+                    self.stats['errors'] += 1
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    analyzed = [{} for _ in unique]
+                except Exception as e:
+                    # Сообщения не теряем: пишем без результатов анализа
+                    logger.error(f"Ошибка анализа батча ({len(batch)} сообщений): {e}")
+                    self.stats['errors'] += 1
+                    analyzed = [{} for _ in unique]
+                await self._update_corpus(analyzed)
+
+                by_key = {cache_keys.get(i, i): result for i, result in zip(unique, analyzed)}
+                for i in pending:
+                    results[i] = by_key[cache_keys.get(i, i)]
+                STAGE_SECONDS.observe(loop.time() - started, stage="analyze")
+                if cache_keys:
+                    await self.cache.put_many([
+                        (cache_keys[i], results[i]) for i in unique if 'sentiment' in results[i]
+                    ])
+
+                # Анализ канонических копий новых кластеров запоминаем для репостов
+                canonical = [
+                    (cluster_id, analysis_key(options), result)
+                    for (cluster_id, _, is_new), (_, options, _), result in zip(clusters, batch, results)
+                    if is_new and 'sentiment' in result
+                ]
+                if canonical:
+                    try:
+                        await self.dedup.save_analysis(canonical)
+                    except Exception as e:
+                        logger.error(f"Ошибка сохранения анализа кластеров: {e}")
+
+                for (msg, _, progress), (cluster_id, _, _), result in zip(batch, clusters, results):
+                    msg.cluster_id = cluster_id
+                    if 'sentiment' in result:
+                        msg.sentiment = result['sentiment']
+                        msg.keywords = result['keywords']
+                        msg.language = result['language']
+                    if progress is not None:
+                        progress.analyzed += 1
+                    await self.writer.put(msg, progress)
+
+                self.stats['analyzed_messages'] += len(unique)
+                self.stats['reused_analysis'] += reused
+                self.stats['cached_analysis'] += cached
+                self.stats['batches'] += 1
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
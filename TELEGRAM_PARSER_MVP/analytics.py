@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+🕉️ Analytics - Тренды и временные ряды по сохраненным сообщениям
+
+Запросы читают только агрегатные таблицы analytics_hourly и
+analytics_keywords_daily (схема v5), которые триггеры обновляют при каждой
+записи сообщения. Поэтому стоимость графика зависит от числа корзин,
+а не от числа сообщений.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Длина префикса корзины 'YYYY-MM-DD HH:00' для каждого интервала
+INTERVALS = {
+    "hour": 16,
+    "day": 10,
+    "month": 7,
+}
+
+
+def _since(days: int) -> str:
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+class Analytics:
+    """Аналитика поверх агрегатных таблиц общей базы сообщений"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def timeseries(self, channel: Optional[str] = None, interval: str = "hour",
+                   date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict]:
+        """
+        Объем сообщений и тональность по периодам
+
+        Без channel - сумма по всем каналам. score - (positive - negative)
+        к числу сообщений с определенной тональностью.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Неподдерживаемый интервал: {interval}")
+
+        conditions = ["messages > 0"]
+        params: List = []
+        if channel:
+            conditions.append("channel_name = ?")
+            params.append(channel.lstrip('@'))
+        if date_from:
+            conditions.append("bucket >= ?")
+            params.append(str(date_from)[:16])
+        if date_to:
+            # Дата без времени включает весь день
+            conditions.append("bucket <= ?")
+            params.append(str(date_to)[:16] if len(str(date_to)) > 10 else f"{date_to} 23:00")
+
+        rows = self.storage.fetchall(f'''
+            SELECT substr(bucket, 1, {INTERVALS[interval]}) AS period,
+                   SUM(messages), SUM(positive), SUM(negative), SUM(neutral)
+            FROM analytics_hourly
+            WHERE {' AND '.join(conditions)}
+            GROUP BY period
+            ORDER BY period
+        ''', tuple(params))
+
+        series = []
+        for period, messages, positive, negative, neutral in rows:
+            analyzed = positive + negative + neutral
+            series.append({
+                "period": period,
+                "messages": messages,
+                "positive": positive,
+                "negative": negative,
+                "neutral": neutral,
+                "score": round((positive - negative) / analyzed, 3) if analyzed else None
+            })
+        return series
+
+    def top_keywords(self, channel: Optional[str] = None, days: int = 7, limit: int = 20) -> List[Dict]:
+        """Самые частые ключевые слова за последние days дней"""
+        conditions = ["day >= ?"]
+        params: List = [_since(days)]
+        if channel:
+            conditions.append("channel_name = ?")
+            params.append(channel.lstrip('@'))
+        params.append(limit)
+
+        rows = self.storage.fetchall(f'''
+            SELECT keyword, SUM(count) AS total, COUNT(DISTINCT channel_name)
+            FROM analytics_keywords_daily
+            WHERE {' AND '.join(conditions)}
+            GROUP BY keyword
+            HAVING total > 0
+            ORDER BY total DESC
+            LIMIT ?
+        ''', tuple(params))
+
+        return [
+            {"keyword": keyword, "count": count, "channels": channels}
+            for keyword, count, channels in rows
+        ]
+
+    def keyword_cooccurrence(self, days: int = 7, limit: int = 20, min_count: int = 2) -> List[Dict]:
+        """
+        Пары каналов с общими ключевыми словами
+
+        Учитываются слова, встретившиеся в канале не меньше min_count раз;
+        jaccard - доля общих слов в объединении словарей двух каналов.
+        """
+        since = _since(days)
+        vocabulary: Dict[str, int] = dict(self.storage.fetchall('''
+            SELECT channel_name, COUNT(*) FROM (
+                SELECT channel_name, keyword FROM analytics_keywords_daily
+                WHERE day >= ?
+                GROUP BY channel_name, keyword
+                HAVING SUM(count) >= ?
+            ) GROUP BY channel_name
+        ''', (since, min_count)))
+
+        rows: List[Tuple] = self.storage.fetchall('''
+            WITH channel_keywords AS (
+                SELECT channel_name, keyword, SUM(count) AS count
+                FROM analytics_keywords_daily
+                WHERE day >= ?
+                GROUP BY channel_name, keyword
+                HAVING SUM(count) >= ?
+            )
+            SELECT a.channel_name, b.channel_name, COUNT(*) AS shared,
+                   SUM(MIN(a.count, b.count)) AS weight,
+                   group_concat(a.keyword, ',') AS keywords
+            FROM channel_keywords a
+            JOIN channel_keywords b ON a.keyword = b.keyword AND a.channel_name < b.channel_name
+            GROUP BY a.channel_name, b.channel_name
+            ORDER BY weight DESC
+            LIMIT ?
+        ''', (since, min_count, limit))
+
+        pairs = []
+        for first, second, shared, weight, keywords in rows:
+            union = vocabulary.get(first, 0) + vocabulary.get(second, 0) - shared
+            pairs.append({
+                "channels": [first, second],
+                "shared_keywords": shared,
+                "weight": weight,
+                "jaccard": round(shared / union, 3) if union else None,
+                "keywords": keywords.split(',')[:10]
+            })
+        return pairs
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+🕉️ Anonymizer - Ключевое хэширование идентификаторов пользователей
+
+HMAC-SHA256 с секретной солью вместо голого SHA-256: пространство
+user_id мало, и хэш без ключа восстанавливается перебором. Результаты
+кэшируются в LRU, поэтому частые авторы не хэшируются повторно.
+Один экземпляр на секрет используется обоими движками TelegramParserMVP
+и MultiAccountParser, так что хэши одного пользователя совпадают.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения с секретом (приоритетнее конфигурации)
+SECRET_ENV_VAR = "TELEGRAM_PARSER_HASH_SECRET"
+
+# Файл, куда сохраняется сгенерированный секрет, чтобы хэши не менялись между запусками
+DEFAULT_SECRET_FILE = "hash_secret.key"
+
+HASH_LENGTH = 16
+
+
+def load_secret(configured: Optional[str] = None, secret_file: str = DEFAULT_SECRET_FILE) -> bytes:
+    """Секрет из окружения, конфигурации или файла (создается при первом запуске)"""
+    secret = os.environ.get(SECRET_ENV_VAR) or configured
+    if secret:
+        return secret.encode()
+
+    path = Path(secret_file)
+    if path.exists():
+        return path.read_text(encoding='utf-8').strip().encode()
+
+    secret = secrets.token_hex(32)
+    path.write_text(secret, encoding='utf-8')
+    try:
+        path.chmod(0o600)
+    except OSError:
+        pass
+    logger.info(f"🔑 Сгенерирован секрет анонимизации: {secret_file}")
+    return secret.encode()
+
+
+class Anonymizer:
+    """HMAC-хэширование user_id с LRU-кэшем"""
+
+    def __init__(self, secret: bytes, cache_size: int = 65536):
+        # Состояние HMAC после ключа считается один раз, дальше только copy()
+        self._keyed = hmac.new(secret, digestmod=hashlib.sha256)
+        self.hash_id = lru_cache(maxsize=cache_size)(self._hash_id)
+
+    def _hash_id(self, user_id) -> str:
+        mac = self._keyed.copy()
+        mac.update(str(user_id).encode())
+        return mac.hexdigest()[:HASH_LENGTH]
+
+    def anonymize(self, user_id, username: Optional[str], hash_usernames: bool = True) -> Dict:
+        """Хэш id и, при необходимости, псевдоним вместо username"""
+        user_id_hash = self.hash_id(user_id)
+        if username and hash_usernames:
+            username = f"user_{user_id_hash}"
+
+        return {
+            'id_hash': user_id_hash,
+            'username': username if username else f"user_{user_id_hash}"
+        }
+
+    @property
+    def stats(self) -> Dict:
+        info = self.hash_id.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+
+_anonymizers: Dict[bytes, Anonymizer] = {}
+_anonymizers_lock = threading.Lock()
+
+
+def get_anonymizer(configured_secret: Optional[str] = None,
+                   secret_file: str = DEFAULT_SECRET_FILE) -> Anonymizer:
+    """Общий экземпляр Anonymizer на секрет"""
+    secret = load_secret(configured_secret, secret_file)
+    with _anonymizers_lock:
+        if secret not in _anonymizers:
+            _anonymizers[secret] = Anonymizer(secret)
+        return _anonymizers[secret]
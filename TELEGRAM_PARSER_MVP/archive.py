@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+🕉️ Archive - Колоночный архив старых сообщений
+
+Сообщения старше N дней переносятся из таблицы messages в файлы Parquet
+(zstd), разбитые по дням: archive/date=YYYY-MM-DD/part-*.parquet. Список
+файлов хранится в таблице archive_files, поэтому экспорт, поиск и
+статистика читают оба уровня. Счетчики message_stats и аналитика при
+архивации не уменьшаются: триггеры удаления пропускают архивируемые строки.
+Ключи архивированных сообщений остаются в archived_messages, и повторный
+парсинг канала не вставляет их в messages второй раз.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Соответствие объявленных типов SQLite типам Arrow
+SQLITE_TO_ARROW = {
+    "INTEGER": "int64",
+    "FLOAT": "float64",
+    "REAL": "float64",
+    "BOOLEAN": "bool",
+}
+
+# Колонки, которые нужны поиску по архиву
+SEARCH_COLUMNS = ["message_id", "channel_id", "channel_name", "date", "sentiment", "language", "text"]
+
+SNIPPET_CONTEXT = 60  # символов вокруг совпадения
+
+# Граница слова для RE2 (Arrow) и для re: \b в RE2 не знает кириллицу
+_RE2_BOUNDARY_BEFORE = r"(?:^|[^\pL\pN])"
+_RE2_BOUNDARY_AFTER = r"(?:[^\pL\pN]|$)"
+_RE2_SEPARATOR = r"[^\pL\pN]+"
+
+
+@dataclass
+class ArchiveConfig:
+    """Конфигурация архива"""
+    directory: str = "archive"
+    older_than_days: int = 180
+    compression: str = "zstd"
+    chunk_size: int = 5000
+
+
+def arrow_schema(conn: sqlite3.Connection, table: str = "messages"):
+    """Схема Arrow по объявленным типам колонок таблицы"""
+    fields = []
+    for _, name, declared_type, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        arrow_type = SQLITE_TO_ARROW.get((declared_type or "").upper(), "string")
+        fields.append(pa.field(name, getattr(pa, arrow_type)()))
+    return pa.schema(fields)
+
+
+def arrow_table(columns: List[str], rows: List[Tuple], schema):
+    """Порция строк в таблицу Arrow (даты и прочее - в строки)"""
+    data = {}
+    for index, name in enumerate(columns):
+        is_string = pa.types.is_string(schema.field(name).type)
+        data[name] = [
+            str(row[index]) if is_string and row[index] is not None else row[index]
+            for row in rows
+        ]
+    return pa.Table.from_pydict(data, schema=schema)
+
+
+def _batch_rows(batch) -> List[Tuple]:
+    """RecordBatch в кортежи как из sqlite3 (bool - в 0/1)"""
+    columns = []
+    for column in batch.columns:
+        if pa.types.is_boolean(column.type):
+            column = pc.cast(column, pa.int64())
+        columns.append(column.to_pylist())
+    return list(zip(*columns))
+
+
+def archive_files(conn: sqlite3.Connection, date_from: Optional[Any] = None,
+                  date_to: Optional[Any] = None) -> List[str]:
+    """Файлы архива, пересекающиеся с диапазоном дат (новые первыми)"""
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append("max_date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        conditions.append("min_date <= ?")
+        params.append(str(date_to))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return [path for path, in conn.execute(f"SELECT path FROM archive_files {where} ORDER BY max_date DESC", params)]
+
+
+def _filter_expression(channel: Optional[str] = None, date_from: Optional[Any] = None,
+                       date_to: Optional[Any] = None, sentiment: Optional[str] = None):
+    """Фильтры экспорта в выражение Arrow (те же условия, что в SQL)"""
+    expression = None
+    conditions = []
+    if channel:
+        conditions.append(ds.field("channel_name") == channel.lstrip('@'))
+    if date_from:
+        conditions.append(ds.field("date") >= str(date_from))
+    if date_to:
+        conditions.append(ds.field("date") <= str(date_to))
+    if sentiment:
+        conditions.append(ds.field("sentiment") == sentiment)
+
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _read_file(path: str, schema, expression, columns: Optional[List[str]] = None):
+    """
+    Строки файла архива по фильтру, новые первыми
+
+    Схема берется из текущей таблицы: колонок, добавленных после
+    архивации файла, в нем нет - они читаются как NULL.
+    """
+    table = ds.dataset(path, format="parquet", schema=schema).to_table(columns=columns, filter=expression)
+    return table.sort_by([("date", "descending")])
+
+
+def _require_pyarrow(paths: List[str]):
+    if paths and not PYARROW_AVAILABLE:
+        raise RuntimeError("В базе есть архивные файлы: для чтения архива установите pyarrow")
+
+
+def iter_archive_chunks(conn: sqlite3.Connection, filters=None,
+                        chunk_size: int = 1000) -> Iterator[Tuple[List[str], List[Tuple]]]:
+    """
+    Порции архивных строк (колонки, строки) в формате iter_row_chunks
+
+    filters - ExportFilters. Колонки совпадают с SELECT * FROM messages.
+    """
+    channel = date_from = date_to = sentiment = None
+    if filters is not None:
+        channel, date_from, date_to, sentiment = filters.channel, filters.date_from, filters.date_to, filters.sentiment
+
+    paths = archive_files(conn, date_from, date_to)
+    _require_pyarrow(paths)
+    if not paths:
+        return
+
+    schema = arrow_schema(conn)
+    expression = _filter_expression(channel, date_from, date_to, sentiment)
+    for path in paths:
+        table = _read_file(path, schema, expression)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            if batch.num_rows:
+                yield batch.schema.names, _batch_rows(batch)
+
+
+def _term_patterns(phrase: str, word: str) -> Optional[Tuple[str, "re.Pattern"]]:
+    """
+    Условие термина запроса FTS5 для архива: (регулярка RE2, регулярка re)
+
+    Слово совпадает целиком, слово* - по префиксу, фраза - подряд идущие
+    слова с любыми разделителями, как у токенизатора unicode61.
+    """
+    prefix = not phrase and word.endswith('*')
+    tokens = re.findall(r"\w+", phrase or word.rstrip('*'))
+    if not tokens:
+        return None
+
+    escaped = [re.escape(token) for token in tokens]
+    re2 = _RE2_BOUNDARY_BEFORE + _RE2_SEPARATOR.join(escaped) + ("" if prefix else _RE2_BOUNDARY_AFTER)
+    python = r"(?<!\w)" + r"\W+".join(escaped) + ("" if prefix else r"(?!\w)")
+    return re2, re.compile(python, re.IGNORECASE)
+
+
+def _snippet(text: str, patterns: List["re.Pattern"]) -> str:
+    """Фрагмент вокруг первого совпадения с подсветкой как у snippet() FTS5"""
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            start = max(match.start() - SNIPPET_CONTEXT, 0)
+            end = min(match.end() + SNIPPET_CONTEXT, len(text))
+            return (
+                ("…" if start > 0 else "")
+                + text[start:match.start()] + "<b>" + match.group(0) + "</b>" + text[match.end():end]
+                + ("…" if end < len(text) else "")
+            )
+    return text[:2 * SNIPPET_CONTEXT]
+
+
+def search_archive(conn: sqlite3.Connection, terms: List[Tuple[str, str]], channel: Optional[str] = None,
+                   date_from: Optional[Any] = None, date_to: Optional[Any] = None) -> List[Dict]:
+    """
+    Поиск по архиву (все термины должны совпасть), новые первыми
+
+    terms - пары (фраза, слово) из SEARCH_TERM_PATTERN.findall(query).
+    Архив не индексируется FTS: файлы сканируются по колонке text, но
+    диапазон дат отсекает файлы целиком.
+    """
+    paths = archive_files(conn, date_from, date_to)
+    _require_pyarrow(paths)
+
+    patterns = [pattern for pattern in (_term_patterns(phrase, word) for phrase, word in terms) if pattern]
+    if not paths or not patterns:
+        return []
+
+    schema = arrow_schema(conn)
+    expression = _filter_expression(channel, date_from, date_to)
+    for re2_pattern, _ in patterns:
+        condition = pc.match_substring_regex(ds.field("text"), pattern=re2_pattern, ignore_case=True)
+        expression = condition if expression is None else expression & condition
+
+    python_patterns = [pattern for _, pattern in patterns]
+    results = []
+    for path in paths:
+        for row in _read_file(path, schema, expression, SEARCH_COLUMNS).to_pylist():
+            text = row.pop("text") or ""
+            row.update(snippet=_snippet(text, python_patterns), rank=None, archived=True)
+            results.append(row)
+    return results
+
+
+def archive_summary(conn: sqlite3.Connection) -> Dict:
+    """Объем архива: файлы, строки, диапазон дат"""
+    files, rows, min_date, max_date = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(rows), 0), MIN(min_date), MAX(max_date) FROM archive_files"
+    ).fetchone()
+    return {"files": files, "messages": rows, "date_from": min_date, "date_to": max_date}
+
+
+def _archive_day(storage, directory: Path, day: str, max_id: int, schema, config: ArchiveConfig) -> int:
+    """Перенос сообщений одного дня в файл Parquet и удаление их из messages"""
+    next_day = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+    # id <= max_id: строки, вставленные во время архивации, не удаляются непрочитанными
+    where = "date >= ? AND date < ? AND id <= ?"
+    params = (day, next_day, max_id)
+
+    partition = directory / f"date={day}"
+    partition.mkdir(parents=True, exist_ok=True)
+    path = partition / f"part-{uuid.uuid4().hex[:12]}.parquet"
+    temp_path = path.with_suffix(".tmp")
+
+    conn = storage.connection()
+    cursor = conn.execute(f"SELECT * FROM messages WHERE {where} ORDER BY date DESC", params)
+    columns = [description[0] for description in cursor.description]
+    count = 0
+    min_date = max_date = None
+    date_index = columns.index("date")
+
+    writer = pq.ParquetWriter(temp_path, schema, compression=config.compression)
+    try:
+        while True:
+            rows = cursor.fetchmany(config.chunk_size)
+            if not rows:
+                break
+            writer.write_table(arrow_table(columns, rows, schema))
+            count += len(rows)
+            max_date = max_date or str(rows[0][date_index])
+            min_date = str(rows[-1][date_index])
+    except Exception:
+        writer.close()
+        temp_path.unlink()
+        raise
+    writer.close()
+
+    if not count:
+        temp_path.unlink()
+        return 0
+
+    os.replace(temp_path, path)
+    try:
+        # Файл становится видимым для чтения в той же транзакции, где строки удаляются
+        with storage.transaction() as conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO archived_messages (channel_id, message_id) "
+                f"SELECT channel_id, message_id FROM messages WHERE {where}",
+                params
+            )
+            conn.execute("UPDATE archive_state SET archiving = 1")
+            deleted = conn.execute(f"DELETE FROM messages WHERE {where}", params).rowcount
+            conn.execute("UPDATE archive_state SET archiving = 0")
+            if deleted != count:
+                raise RuntimeError(f"за {day} прочитано {count} строк, а удаляется {deleted}")
+            conn.execute(
+                "INSERT INTO archive_files (path, day, rows, min_date, max_date) VALUES (?, ?, ?, ?, ?)",
+                (str(path), day, count, min_date, max_date)
+            )
+    except Exception:
+        path.unlink()
+        raise
+    return count
+
+
+def archive_messages(storage, config: Optional[ArchiveConfig] = None,
+                     older_than_days: Optional[int] = None, vacuum: bool = False) -> Dict:
+    """
+    Архивация сообщений старше older_than_days (целыми днями)
+
+    Выполняется в потоке, которому принадлежит storage.connection() -
+    из asyncio ее нужно запускать через storage.run(). vacuum=True
+    возвращает освободившееся место файлу базы (долго на больших базах).
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Для архивации установите pyarrow")
+
+    config = config or ArchiveConfig()
+    days_back = config.older_than_days if older_than_days is None else older_than_days
+    cutoff = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+    directory = Path(config.directory)
+
+    conn = storage.connection()
+    max_id = conn.execute("SELECT MAX(id) FROM messages").fetchone()[0]
+    days = [day for day, in conn.execute(
+        "SELECT DISTINCT substr(date, 1, 10) FROM messages WHERE date < ? ORDER BY 1", (cutoff,)
+    )]
+    schema = arrow_schema(conn)
+
+    archived = 0
+    for day in days:
+        count = _archive_day(storage, directory, day, max_id, schema, config)
+        archived += count
+        logger.info(f"🗄️ Архив {day}: {count} сообщений")
+
+    if vacuum and archived:
+        conn.execute("VACUUM")
+
+    logger.info(f"🗄️ Архивировано {archived} сообщений старше {cutoff} ({len(days)} дней)")
+    return {"archived": archived, "days": len(days), "cutoff": cutoff}
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+🕉️ Batch Analysis - Векторизованный анализ кириллического текста батчами
+
+Батч токенизируется один раз в координатное (COO) представление
+документ x терм. Тональность - разреженное произведение на вектор весов
+русского словаря основ (с учетом отрицаний), ключевые слова - TF-IDF
+с документной частотой корпуса из таблицы corpus_terms. NumPy
+необязателен: без него те же вычисления идут на чистом Python.
+"""
+
+import logging
+import math
+import re
+import sqlite3
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from keyword_matcher import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Кириллица русского, украинского и казахского (ё после normalize_text не встречается)
+CYRILLIC = 'а-яіїєґәғқңөұүһ'
+
+# Слова через дефис и апостроф (украинское "об'єкт") - один токен
+TOKEN_PATTERN = re.compile(rf"[{CYRILLIC}a-z]+(?:[-'’][{CYRILLIC}a-z]+)*")
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+|t\.me/\S+')
+CYRILLIC_PATTERN = re.compile(rf'[{CYRILLIC}]')
+
+# Ключевые слова - кириллические токены от 3 букв (как прежний KEYWORD_PATTERN)
+KEYWORD_TOKEN = re.compile(rf"[{CYRILLIC}][{CYRILLIC}'’-]{{2,}}")
+
+SENTIMENT_THRESHOLD = 0.1
+# Основы короче MIN_STEM ловят чужие слова ("рад" - "радио", "рост" - "Ростов"),
+# поэтому короткие слова словаря заданы точными словоформами (SENTIMENT_WORDS)
+MIN_STEM = 5
+MAX_SUFFIX = 4  # окончание длиннее - уже другое слово
+
+# Сколько термов запрашивать у базы за один запрос
+CORPUS_QUERY_CHUNK = 500
+
+NEGATIONS = frozenset({'не', 'нет', 'ни', 'без', 'нельзя'})
+
+STOPWORDS = frozenset('''
+    и в во не что он на я с со как а то все всё она так его но да ты к у же вы за бы по только ее её мне
+    было вот от меня еще ещё нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до
+    вас нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их
+    чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой
+    совсем ним здесь этом один почти мой тем чтобы нее неё сейчас были куда зачем всех никогда можно при
+    наконец два об другой хоть после над больше тот через эти нас про всего них какая много разве три эту
+    моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда конечно всю
+    между это эта эти этих этим этими также который которая которое которые которых которым ещё очень
+    весь вся всё свой своя свои своих наш наша наши ваш ваша ваши который также каждый каждая будут
+    будем будете можно нужно нужен нужна стоит просто именно тоже вообще либо либо-то из-за из-под
+    сегодня вчера завтра год года году лет день дня дней время раза тысяч млн млрд руб рублей процентов
+'''.split())
+
+# Словарь основ тональности: новости, финансы, отзывы. Вес - сила окраски.
+# Основы не короче MIN_STEM, совпадают с началом слова
+SENTIMENT_STEMS: Dict[str, float] = {
+    # Позитив
+    'хорош': 1.0, 'отличн': 2.0, 'прекрасн': 2.0, 'замечательн': 2.0, 'великолепн': 2.0,
+    'превосходн': 2.0, 'радост': 1.0, 'счастлив': 2.0, 'счаст': 1.5, 'любим': 1.0, 'любов': 1.0,
+    'понрав': 1.0, 'успех': 1.5, 'успешн': 1.5, 'побед': 1.5, 'выигр': 1.0, 'вырос': 0.5,
+    'улучш': 1.0, 'поддерж': 0.5, 'благодар': 1.0, 'спасиб': 1.0, 'поздрав': 1.0,
+    'достиж': 1.0, 'прогресс': 1.0, 'выгодн': 1.0, 'эффективн': 1.0, 'надежн': 1.0,
+    'удобн': 1.0, 'интересн': 1.0, 'полезн': 1.0, 'красив': 1.0, 'вкусн': 1.0,
+    'классн': 1.0, 'супер': 1.5, 'восхит': 2.0, 'восторг': 2.0, 'чудесн': 2.0,
+    'потряса': 2.0, 'идеальн': 1.5, 'позитив': 1.0, 'оптимис': 1.0, 'безопасн': 0.5,
+    'стабильн': 0.5, 'честн': 1.0, 'весел': 1.0, 'приятн': 1.0, 'рекоменд': 0.5,
+    'здоров': 0.5, 'благополуч': 1.0, 'процвет': 1.5, 'свобод': 0.5,
+    'дружн': 1.0, 'дружб': 1.0, 'вдохнов': 1.5, 'талантлив': 1.5, 'гениальн': 2.0,
+    'бесплатн': 0.5, 'скидк': 0.5, 'праздн': 1.0, 'восстановл': 0.5, 'прибыл': 1.0,
+    'доходн': 0.5, 'укрепл': 0.5,
+    # Негатив
+    'отвратит': -2.0, 'кошмар': -2.0, 'ненавид': -2.0, 'ненавист': -2.0, 'злост': -1.0,
+    'груст': -1.0, 'печал': -1.0, 'тоскл': -1.0, 'страш': -1.5, 'опасн': -1.0, 'угроз': -1.0,
+    'кризис': -1.5, 'паден': -1.0, 'обвал': -2.0, 'убытк': -1.5, 'убыточн': -1.5, 'потерял': -1.0,
+    'проблем': -1.0, 'ошибк': -1.0, 'ошибоч': -1.0, 'авари': -1.5, 'катастроф': -2.0, 'трагед': -2.0,
+    'погиб': -2.0, 'гибел': -2.0, 'смерт': -2.0, 'убийств': -2.0, 'убийц': -2.0,
+    'атаков': -1.0, 'взрыв': -1.5, 'пожар': -1.0, 'ранен': -1.5, 'жертв': -1.5,
+    'насил': -2.0, 'преступ': -1.5, 'мошен': -1.5, 'обман': -1.5, 'корруп': -1.5,
+    'скандал': -1.0, 'санкц': -0.5, 'инфляц': -0.5, 'дефолт': -2.0, 'банкрот': -2.0,
+    'увольн': -1.0, 'безработ': -1.0, 'забастов': -1.0, 'протест': -0.5, 'арест': -1.0,
+    'задерж': -0.5, 'штраф': -1.0, 'запрет': -0.5, 'блокир': -0.5, 'отказ': -0.5, 'жалоб': -1.0,
+    'недовол': -1.5, 'разочар': -1.5, 'провал': -2.0, 'неудач': -1.5, 'бедств': -2.0, 'бедност': -1.0,
+    'болезн': -1.0, 'глупост': -1.0, 'идиот': -2.0, 'слабост': -0.5, 'тревог': -1.0, 'паник': -1.5,
+    'беспоряд': -1.0, 'разруш': -1.5, 'уничтож': -1.5, 'нищет': -1.5, 'голод': -1.0,
+    'негатив': -1.0, 'пессимис': -1.0, 'мерзк': -2.0, 'позор': -2.0,
+    'обидн': -1.0, 'оскорб': -1.5, 'агресс': -1.0, 'конфликт': -1.0, 'нарушен': -1.0,
+    'фейков': -1.0, 'скучн': -1.0, 'бесполезн': -1.5, 'подорож': -0.5, 'дорожа': -0.5,
+    'снижен': -0.5, 'сокращ': -0.5, 'дефицит': -1.0,
+}
+
+
+def _word_forms(weight: float, *forms: str) -> Dict[str, float]:
+    return {form: weight for form in forms}
+
+
+# Короткие слова словаря - только точные словоформы
+SENTIMENT_WORDS: Dict[str, float] = {
+    # Позитив
+    **_word_forms(1.0, 'лучше', 'лучший', 'лучшая', 'лучшее', 'лучшие', 'лучшего', 'лучшей', 'лучшим',
+                  'лучших', 'лучшему', 'лучшую'),
+    **_word_forms(1.0, 'рад', 'рада', 'рады', 'радует', 'радуют', 'радуюсь', 'радуемся', 'радуется'),
+    **_word_forms(1.0, 'люблю', 'нравится', 'нравятся', 'нравилось', 'нравился', 'нравилась', 'нравились'),
+    **_word_forms(0.5, 'рост', 'роста', 'росту', 'ростом', 'росте'),
+    **_word_forms(1.0, 'добрый', 'добрая', 'доброе', 'добрые', 'доброго', 'доброй', 'добрым', 'добрых',
+                  'добро', 'добра', 'добру', 'добром'),
+    **_word_forms(1.0, 'крутой', 'крутая', 'крутое', 'крутые', 'круто', 'крутого', 'крутых'),
+    **_word_forms(1.0, 'щедрый', 'щедрая', 'щедрое', 'щедрые', 'щедро'),
+    **_word_forms(0.5, 'мечта', 'мечты', 'мечту', 'мечтой', 'мечтаю', 'мечтает'),
+    **_word_forms(1.0, 'доволен', 'довольна', 'довольны', 'довольный', 'довольная', 'довольные', 'уютный', 'уютная', 'уютное', 'уютные', 'уютно'),
+    **_word_forms(0.5, 'доход', 'дохода', 'доходы', 'доходов', 'доходам', 'доходе', 'доходом'),
+    'ура': 1.5,
+    # Негатив
+    **_word_forms(-1.0, 'плохо', 'плохой', 'плохая', 'плохое', 'плохие', 'плохого', 'плохих', 'плохим',
+                  'плохую', 'хуже'),
+    **_word_forms(-2.0, 'ужас', 'ужаса', 'ужасно', 'ужасный', 'ужасная', 'ужасное', 'ужасные', 'ужасного',
+                  'ужасных', 'худший', 'худшая', 'худшее', 'худшие', 'худшего', 'худших'),
+    **_word_forms(-1.0, 'зло', 'злой', 'злая', 'злые', 'тоска', 'тоски', 'тоску'),
+    **_word_forms(-1.0, 'страх', 'страха', 'страху', 'страхом', 'страхи', 'страхов'),
+    **_word_forms(-1.0, 'упал', 'упала', 'упало', 'упали', 'потеря', 'потери', 'потерю', 'потерь'),
+    **_word_forms(-1.5, 'убыток', 'умер', 'умерла', 'умерли', 'умерло'),
+    **_word_forms(-1.0, 'сбой', 'сбоя', 'сбою', 'сбоем', 'сбои', 'сбоев'),
+    **_word_forms(-2.0, 'убит', 'убита', 'убиты', 'убито', 'убитый', 'убитых'),
+    **_word_forms(-1.5, 'война', 'войны', 'войне', 'войну', 'войной', 'краж', 'кража', 'кражи', 'краже',
+                  'кражу'),
+    **_word_forms(-1.0, 'атака', 'атаки', 'атаке', 'атаку', 'атакой', 'атак'),
+    **_word_forms(-1.0, 'бедный', 'бедная', 'бедные', 'бедных', 'глупо', 'глупый', 'глупая', 'глупые'),
+    **_word_forms(-0.5, 'слабый', 'слабая', 'слабое', 'слабые', 'слабо', 'слабых'),
+    **_word_forms(-1.5, 'хаос', 'хаоса', 'хаосе', 'нищий', 'нищие', 'нищих'),
+    **_word_forms(-1.5, 'гадкий', 'гадкая', 'гадко', 'вранье', 'вранья', 'враньем'),
+    **_word_forms(-1.0, 'стыд', 'стыдно', 'стыда', 'фейк', 'фейки', 'фейков', 'ложный', 'ложная',
+                  'ложные', 'ложно', 'ложных', 'лжи', 'жалкий', 'жалкая', 'жалко', 'жалкие'),
+}
+
+
+@lru_cache(maxsize=65536)
+def lexicon_weight(token: str) -> float:
+    """Вес токена: точная словоформа или самая длинная основа словаря (0 - нейтральный)"""
+    weight = SENTIMENT_WORDS.get(token)
+    if weight is not None:
+        return weight
+    for end in range(len(token), MIN_STEM - 1, -1):
+        if len(token) - end > MAX_SUFFIX:
+            break
+        weight = SENTIMENT_STEMS.get(token[:end])
+        if weight is not None:
+            return weight
+    return 0.0
+
+
+@lru_cache(maxsize=65536)
+def is_keyword_term(token: str) -> bool:
+    return token not in STOPWORDS and KEYWORD_TOKEN.fullmatch(token) is not None
+
+
+class BatchTokens:
+    """
+    Токены батча в координатном виде: (документ, терм, знак)
+
+    Словарь термов общий на батч; знак -1 у токена после отрицания.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        self.size = len(texts)
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.doc_ids: List[int] = []
+        self.term_ids: List[int] = []
+        self.signs: List[int] = []
+        self.lengths: List[int] = []
+        self.cyrillic: List[bool] = []
+
+        for doc_id, text in enumerate(texts):
+            normalized = URL_PATTERN.sub(' ', normalize_text(text or ''))
+            tokens = TOKEN_PATTERN.findall(normalized)
+            self.lengths.append(len(tokens))
+            self.cyrillic.append(CYRILLIC_PATTERN.search(normalized) is not None)
+
+            negated = False
+            for token in tokens:
+                term_id = self.vocab.get(token)
+                if term_id is None:
+                    term_id = self.vocab[token] = len(self.terms)
+                    self.terms.append(token)
+                self.doc_ids.append(doc_id)
+                self.term_ids.append(term_id)
+                self.signs.append(-1 if negated else 1)
+                negated = token in NEGATIONS
+
+
+def sentiment_scores(batch: BatchTokens) -> List[float]:
+    """Сумма весов словаря по документу, нормированная на корень из длины"""
+    weights = [lexicon_weight(term) for term in batch.terms]
+
+    if NUMPY_AVAILABLE and batch.doc_ids:
+        # bincount по координатам = разреженное произведение матрицы документов на вектор весов
+        values = np.asarray(weights)[np.asarray(batch.term_ids)] * np.asarray(batch.signs)
+        totals = np.bincount(np.asarray(batch.doc_ids), weights=values, minlength=batch.size).tolist()
+    else:
+        totals = [0.0] * batch.size
+        for doc_id, term_id, sign in zip(batch.doc_ids, batch.term_ids, batch.signs):
+            totals[doc_id] += weights[term_id] * sign
+
+    return [total / math.sqrt(length) if length else 0.0 for total, length in zip(totals, batch.lengths)]
+
+
+def sentiment_label(score: float) -> str:
+    if score > SENTIMENT_THRESHOLD:
+        return "positive"
+    elif score < -SENTIMENT_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+def _idf(documents: int, df: int) -> float:
+    """Сглаженный IDF: ln((1 + N) / (1 + df)) + 1"""
+    return math.log((1 + documents) / (1 + df)) + 1.0
+
+
+def tfidf_keywords(batch: BatchTokens, top_n: int = 5, corpus_documents: int = 0,
+                   corpus_df: Optional[Dict[str, int]] = None) -> Tuple[List[List[str]], List[List[str]]]:
+    """
+    Топ TF-IDF термов каждого документа
+
+    IDF считается по корпусу из базы вместе с текущим батчем. Возвращает
+    (ключевые слова, уникальные термы документа для обновления корпуса).
+    """
+    corpus_df = corpus_df or {}
+    candidate = [is_keyword_term(term) for term in batch.terms]
+    documents = corpus_documents + batch.size
+
+    if NUMPY_AVAILABLE and batch.doc_ids:
+        doc_ids = np.asarray(batch.doc_ids, dtype=np.int64)
+        term_ids = np.asarray(batch.term_ids, dtype=np.int64)
+        mask = np.asarray(candidate, dtype=bool)[term_ids]
+        n_terms = max(len(batch.terms), 1)
+
+        # Уникальные пары (документ, терм) с числом вхождений, отсортированы по документу и терму
+        pairs, counts = np.unique(doc_ids[mask] * n_terms + term_ids[mask], return_counts=True)
+        pair_docs, pair_terms = pairs // n_terms, pairs % n_terms
+        batch_df = np.bincount(pair_terms, minlength=n_terms).tolist()
+
+        idf = np.asarray([
+            _idf(documents, corpus_df.get(term, 0) + df) for term, df in zip(batch.terms, batch_df)
+        ])
+        scores = counts / np.asarray(batch.lengths)[pair_docs] * idf[pair_terms]
+
+        order = np.lexsort((pair_terms, -scores, pair_docs))
+        ranked_docs, ranked_terms = pair_docs[order], pair_terms[order]
+        bounds = np.searchsorted(ranked_docs, np.arange(batch.size + 1)).tolist()
+        ranked_terms = ranked_terms.tolist()
+        doc_term_ids = [sorted(ranked_terms[bounds[i]:bounds[i + 1]]) for i in range(batch.size)]
+        ranked = [ranked_terms[bounds[i]:bounds[i + 1]][:top_n] for i in range(batch.size)]
+    else:
+        counts: List[Counter] = [Counter() for _ in range(batch.size)]
+        for doc_id, term_id in zip(batch.doc_ids, batch.term_ids):
+            if candidate[term_id]:
+                counts[doc_id][term_id] += 1
+        batch_df = Counter(term_id for doc_counts in counts for term_id in doc_counts)
+
+        doc_term_ids = [sorted(doc_counts) for doc_counts in counts]
+        ranked = []
+        for doc_counts, length in zip(counts, batch.lengths):
+            scores = {
+                term_id: count / length * _idf(documents, corpus_df.get(batch.terms[term_id], 0) + batch_df[term_id])
+                for term_id, count in doc_counts.items()
+            }
+            ranked.append(sorted(scores, key=lambda term_id: (-scores[term_id], term_id))[:top_n])
+
+    keywords = [[batch.terms[term_id] for term_id in term_ids] for term_ids in ranked]
+    doc_terms = [[batch.terms[term_id] for term_id in term_ids] for term_ids in doc_term_ids]
+    return keywords, doc_terms
+
+
+# Соединения только для чтения с базой корпуса (по одному на процесс-воркер)
+_corpus_connections: Dict[str, sqlite3.Connection] = {}
+
+
+def corpus_frequencies(db_path: str, terms: Iterable[str]) -> Tuple[int, Dict[str, int]]:
+    """Число документов корпуса и документная частота термов из базы"""
+    try:
+        conn = _corpus_connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            _corpus_connections[db_path] = conn
+
+        row = conn.execute("SELECT documents FROM corpus_stats WHERE id = 1").fetchone()
+        documents = row[0] if row else 0
+
+        terms = list(terms)
+        frequencies = {}
+        for start in range(0, len(terms), CORPUS_QUERY_CHUNK):
+            chunk = terms[start:start + CORPUS_QUERY_CHUNK]
+            placeholders = ",".join("?" for _ in chunk)
+            frequencies.update(conn.execute(
+                f"SELECT term, df FROM corpus_terms WHERE term IN ({placeholders})", chunk
+            ))
+        return documents, frequencies
+    except sqlite3.Error as e:
+        logger.warning(f"Корпус IDF недоступен ({db_path}): {e}")
+        return 0, {}
+
+
+def save_corpus_counts(storage, term_counts: Counter, documents: int):
+    """Добавление документов батча в корпус (в потоке БД)"""
+    with storage.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO corpus_terms (term, df) VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+            term_counts.items()
+        )
+        conn.execute("UPDATE corpus_stats SET documents = documents + ? WHERE id = 1", (documents,))
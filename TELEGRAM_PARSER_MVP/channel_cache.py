@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+🕉️ Channel Cache - Кэш метаданных каналов
+
+Username и id канала разрешаются локально: сначала LRU в памяти, затем
+таблица channels с TTL. Запрос get_chat/get_entity уходит в Telegram
+только для новых или устаревших записей, поэтому частые обходы одних и
+тех же каналов не расходуют лимиты аккаунта.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHANNEL_SQL = '''
+    INSERT INTO channels (
+        channel_id, channel_name, title, description, members_count, type,
+        is_verified, is_scam, is_fake, access_hash, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (channel_id) DO UPDATE SET
+        channel_name = excluded.channel_name,
+        title = excluded.title,
+        description = COALESCE(excluded.description, description),
+        members_count = COALESCE(excluded.members_count, members_count),
+        type = excluded.type,
+        is_verified = excluded.is_verified,
+        is_scam = excluded.is_scam,
+        is_fake = excluded.is_fake,
+        access_hash = COALESCE(excluded.access_hash, access_hash),
+        updated_at = excluded.updated_at
+'''
+
+SELECT_CHANNEL_SQL = '''
+    SELECT channel_id, channel_name, title, description, members_count, type,
+           is_verified, is_scam, is_fake, access_hash, updated_at
+    FROM channels
+'''
+
+LINK_PREFIXES = ("https://t.me/", "http://t.me/", "t.me/")
+
+
+def channel_key(target) -> str:
+    """Ключ кэша: username без @ и ссылки t.me в нижнем регистре или id"""
+    key = str(target).strip()
+    for prefix in LINK_PREFIXES:
+        if key.startswith(prefix):
+            key = key[len(prefix):]
+            break
+    return key.lstrip('@').casefold()
+
+
+@dataclass
+class ChannelInfo:
+    """Метаданные канала"""
+    channel_id: int
+    channel_name: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    members_count: Optional[int] = None
+    type: Optional[str] = None
+    is_verified: bool = False
+    is_scam: bool = False
+    is_fake: bool = False
+    # access_hash действителен только для аккаунта, который его получил
+    access_hash: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+    @property
+    def display_name(self) -> str:
+        return self.channel_name or self.title or 'unknown'
+
+    @classmethod
+    def from_pyrogram(cls, chat) -> "ChannelInfo":
+        return cls(
+            channel_id=chat.id,
+            channel_name=getattr(chat, 'username', None),
+            title=getattr(chat, 'title', None),
+            description=getattr(chat, 'description', None),
+            members_count=getattr(chat, 'members_count', None),
+            type=str(chat.type),
+            is_verified=bool(getattr(chat, 'is_verified', False)),
+            is_scam=bool(getattr(chat, 'is_scam', False)),
+            is_fake=bool(getattr(chat, 'is_fake', False))
+        )
+
+    @classmethod
+    def from_telethon(cls, entity) -> "ChannelInfo":
+        return cls(
+            channel_id=entity.id,
+            channel_name=getattr(entity, 'username', None),
+            title=getattr(entity, 'title', None),
+            members_count=getattr(entity, 'participants_count', None),
+            type=type(entity).__name__,
+            is_verified=bool(getattr(entity, 'verified', False)),
+            is_scam=bool(getattr(entity, 'scam', False)),
+            is_fake=bool(getattr(entity, 'fake', False)),
+            access_hash=getattr(entity, 'access_hash', None)
+        )
+
+
+class ChannelCache:
+    """
+    LRU метаданных каналов поверх таблицы channels
+
+    Запись считается свежей ttl секунд с момента последнего разрешения
+    через API; каждая запись доступна и по username, и по id.
+    """
+
+    def __init__(self, storage, ttl: float = 3600, max_size: int = 1024):
+        self.storage = storage
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, ChannelInfo]]" = OrderedDict()
+        self.stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0
+        }
+
+    def _remember(self, info: ChannelInfo, cached_at: float):
+        keys = [str(info.channel_id)]
+        if info.channel_name:
+            keys.append(channel_key(info.channel_name))
+        for key in keys:
+            self._entries[key] = (cached_at, info)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[ChannelInfo]:
+        fresh_since = (datetime.now() - timedelta(seconds=self.ttl)).isoformat(sep=' ')
+        if key.lstrip('-').isdigit():
+            row = self.storage.fetchone(
+                SELECT_CHANNEL_SQL + " WHERE channel_id = ? AND updated_at >= ?",
+                (int(key), fresh_since)
+            )
+        else:
+            row = self.storage.fetchone(
+                SELECT_CHANNEL_SQL + " WHERE channel_name = ? COLLATE NOCASE AND updated_at >= ?",
+                (key, fresh_since)
+            )
+        if not row:
+            return None
+
+        info = ChannelInfo(*row[:10], updated_at=datetime.fromisoformat(row[10]))
+        info.is_verified, info.is_scam, info.is_fake = map(bool, (info.is_verified, info.is_scam, info.is_fake))
+        return info
+
+    def get(self, target) -> Optional[ChannelInfo]:
+        """Свежие метаданные канала или None, если нужен запрос к API"""
+        key = channel_key(target)
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return entry[1]
+
+        info = self._load(key)
+        if info is None:
+            self.stats['misses'] += 1
+            return None
+
+        # Возраст записи в базе сохраняется и в памяти
+        age = (datetime.now() - info.updated_at).total_seconds()
+        self._remember(info, time.monotonic() - age)
+        self.stats['db_hits'] += 1
+        return info
+
+    async def put(self, info: ChannelInfo):
+        """Сохранение свежих метаданных после запроса к API"""
+        info.updated_at = datetime.now()
+        self._remember(info, time.monotonic())
+        try:
+            await self.storage.run_write(UPSERT_CHANNEL_SQL, (
+                info.channel_id,
+                info.channel_name,
+                info.title,
+                info.description,
+                info.members_count,
+                info.type,
+                info.is_verified,
+                info.is_scam,
+                info.is_fake,
+                info.access_hash,
+                info.updated_at.isoformat(sep=' ')
+            ))
+        except Exception as e:
+            logger.error(f"Ошибка сохранения информации о канале: {e}")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+🕉️ Dedup - Поиск почти-дубликатов и репостов через MinHash-LSH
+
+Сигнатура MinHash строится по символьным 5-граммам нормализованного
+текста, LSH-индекс (полосы сигнатуры -> кластер) хранится в той же базе
+SQLite. Каждое сообщение получает cluster_id канонической копии, а
+результаты анализа канонической копии переиспользуются для репостов.
+"""
+
+import json
+import logging
+import random
+import re
+import zlib
+from array import array
+from hashlib import blake2b
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from keyword_matcher import normalize_text
+from text_analysis import analyzer_version
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 8  # 8 полос по 8 значений: порог срабатывания LSH около 0.77
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Фиксированное зерно: сигнатуры хранятся в базе и должны совпадать между запусками
+_rng = random.Random(1729)
+_PERM_A = [_rng.randrange(1, _MERSENNE_PRIME) for _ in range(NUM_PERM)]
+_PERM_B = [_rng.randrange(0, _MERSENNE_PRIME) for _ in range(NUM_PERM)]
+
+_WHITESPACE = re.compile(r'\s+')
+_URL = re.compile(r'https?://\S+')
+
+
+def shingles(text: str) -> List[int]:
+    """CRC32 символьных 5-грамм нормализованного текста (ссылки не учитываются)"""
+    text = _WHITESPACE.sub(' ', _URL.sub(' ', normalize_text(text))).strip()
+    if not text:
+        return []
+    if len(text) <= SHINGLE_SIZE:
+        return [zlib.crc32(text.encode())]
+    return list({zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)})
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """MinHash-сигнатура текста (None для пустого текста)"""
+    values = shingles(text)
+    if not values:
+        return None
+
+    if NUMPY_AVAILABLE:
+        # Переполнение uint64 совпадает с маской _MASK64 в чистом Python
+        x = np.array(values, dtype=np.uint64)[:, None]
+        a = np.array(_PERM_A, dtype=np.uint64)
+        b = np.array(_PERM_B, dtype=np.uint64)
+        hashed = ((x * a + b) % np.uint64(_MERSENNE_PRIME)) & np.uint64(_MAX_HASH)
+        return hashed.min(axis=0).tolist()
+
+    return [
+        min((((x * a + b) & _MASK64) % _MERSENNE_PRIME) & _MAX_HASH for x in values)
+        for a, b in zip(_PERM_A, _PERM_B)
+    ]
+
+
+def signature_batch(texts: Sequence[str]) -> List[Optional[List[int]]]:
+    """Сигнатуры батча текстов (вызывается в пуле процессов)"""
+    return [minhash_signature(text) for text in texts]
+
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Оценка сходства Жаккара по доле совпавших значений сигнатуры"""
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+def band_keys(signature: Sequence[int]) -> List[Tuple[int, int]]:
+    """Ключи LSH: (номер полосы, 64-битный хэш полосы)"""
+    rows = len(signature) // BANDS
+    keys = []
+    for band in range(BANDS):
+        data = array('Q', signature[band * rows:(band + 1) * rows]).tobytes()
+        keys.append((band, int.from_bytes(blake2b(data, digest_size=8).digest(), 'little', signed=True)))
+    return keys
+
+
+def analysis_key(options: Dict) -> str:
+    """Ключ опций анализа: сохраненный результат годится только для тех же опций и анализаторов"""
+    return json.dumps([analyzer_version(), options], sort_keys=True, ensure_ascii=False, default=list)
+
+
+def encode_signature(signature: Sequence[int]) -> bytes:
+    return array('Q', signature).tobytes()
+
+
+def decode_signature(data: bytes) -> List[int]:
+    signature = array('Q')
+    signature.frombytes(data)
+    return signature.tolist()
+
+
+class Deduplicator:
+    """
+    Назначение кластеров в потоке БД
+
+    Поиск кандидатов, проверка сходства и вставка нового кластера идут
+    в одной транзакции единственного потока записи, поэтому две копии
+    одного текста в соседних батчах не создадут два кластера.
+    """
+
+    def __init__(self, storage, threshold: float = SIMILARITY_THRESHOLD):
+        self.storage = storage
+        self.threshold = threshold
+        self.stats = {
+            'clusters': 0,
+            'duplicates': 0
+        }
+
+    def _assign_one(self, conn, channel_id: int, message_id: int, options_key: str,
+                    signature: Optional[List[int]]) -> Tuple[Optional[int], Optional[Dict], bool]:
+        # Повторный парсинг того же сообщения сохраняет его кластер
+        row = conn.execute(
+            "SELECT cluster_id FROM messages WHERE channel_id = ? AND message_id = ?",
+            (channel_id, message_id)
+        ).fetchone()
+        known_cluster = row[0] if row else None
+
+        if signature is None:
+            return known_cluster, None, False
+
+        keys = band_keys(signature)
+        if known_cluster is None:
+            placeholders = ",".join("(?, ?)" for _ in keys)
+            candidates = [cluster_id for cluster_id, in conn.execute(
+                f"SELECT DISTINCT cluster_id FROM minhash_buckets WHERE (band, bucket) IN (VALUES {placeholders})",
+                [value for key in keys for value in key]
+            )]
+
+            best, best_similarity = None, self.threshold
+            for cluster_id in candidates:
+                stored = conn.execute(
+                    "SELECT signature FROM dedup_clusters WHERE cluster_id = ?", (cluster_id,)
+                ).fetchone()
+                if stored is None:
+                    continue
+                score = similarity(signature, decode_signature(stored[0]))
+                if score >= best_similarity:
+                    best, best_similarity = cluster_id, score
+
+            if best is None:
+                cursor = conn.execute(
+                    "INSERT INTO dedup_clusters (signature, size, channel_id, message_id) VALUES (?, 1, ?, ?)",
+                    (encode_signature(signature), channel_id, message_id)
+                )
+                cluster_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT OR IGNORE INTO minhash_buckets (band, bucket, cluster_id) VALUES (?, ?, ?)",
+                    [(band, bucket, cluster_id) for band, bucket in keys]
+                )
+                self.stats['clusters'] += 1
+                return cluster_id, None, True
+
+            conn.execute("UPDATE dedup_clusters SET size = size + 1 WHERE cluster_id = ?", (best,))
+            self.stats['duplicates'] += 1
+            known_cluster = best
+
+        cached = conn.execute(
+            "SELECT sentiment, keywords, language FROM dedup_clusters WHERE cluster_id = ? AND analysis_key = ?",
+            (known_cluster, options_key)
+        ).fetchone()
+        if cached:
+            sentiment, keywords, language = cached
+            return known_cluster, {
+                'sentiment': sentiment,
+                'keywords': json.loads(keywords) if keywords else [],
+                'language': language
+            }, False
+        return known_cluster, None, False
+
+    def _assign(self, refs: List[Tuple[int, int, str]],
+                signatures: List[Optional[List[int]]]) -> List[Tuple[Optional[int], Optional[Dict], bool]]:
+        with self.storage.transaction() as conn:
+            return [
+                self._assign_one(conn, channel_id, message_id, options_key, signature)
+                for (channel_id, message_id, options_key), signature in zip(refs, signatures)
+            ]
+
+    async def assign(self, refs: List[Tuple[int, int, str]],
+                     signatures: List[Optional[List[int]]]) -> List[Tuple[Optional[int], Optional[Dict], bool]]:
+        """
+        Кластеры для батча сообщений
+
+        refs - (channel_id, message_id, ключ опций анализа). Возвращает (cluster_id, сохраненный анализ канонической копии или None,
+        создан ли новый кластер) на каждое сообщение.
+        """
+        return await self.storage.run(self._assign, refs, signatures)
+
+    def _save_analysis(self, results: List[Tuple[int, str, Dict]]):
+        with self.storage.transaction() as conn:
+            conn.executemany(
+                "UPDATE dedup_clusters SET sentiment = ?, keywords = ?, language = ?, analysis_key = ? WHERE cluster_id = ?",
+                [
+                    (result.get('sentiment'), json.dumps(result.get('keywords')), result.get('language'),
+                     options_key, cluster_id)
+                    for cluster_id, options_key, result in results
+                ]
+            )
+
+    async def save_analysis(self, results: List[Tuple[int, str, Dict]]):
+        """Запоминание анализа канонических копий новых кластеров"""
+        if results:
+            await self.storage.run(self._save_analysis, results)
+
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+🕉️ Exporter - Потоковый экспорт сообщений
+
+Курсор читается порциями через fetchmany и сразу сериализуется в JSON,
+JSON Lines, CSV или Parquet (если установлен pyarrow), при необходимости
+со сжатием gzip на лету. Фильтры передаются прямо в SQL, после строк
+базы идут строки колоночного архива (archive.py) с теми же фильтрами.
+"""
+
+import csv
+import io
+import json
+import logging
+import sqlite3
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple, Union
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from archive import archive_files, arrow_schema, arrow_table, iter_archive_chunks
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("json", "jsonl", "csv", "parquet")
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@dataclass
+class ExportFilters:
+    """Фильтры экспорта (все необязательные)"""
+    channel: Optional[str] = None
+    date_from: Optional[Union[str, datetime]] = None
+    date_to: Optional[Union[str, datetime]] = None
+    sentiment: Optional[str] = None
+
+
+def build_query(filters: Optional[ExportFilters] = None) -> Tuple[str, List]:
+    """SQL с фильтрами в WHERE (используют индексы по channel_name/date/sentiment)"""
+    conditions = []
+    params = []
+    filters = filters or ExportFilters()
+
+    if filters.channel:
+        conditions.append("channel_name = ?")
+        params.append(filters.channel.lstrip('@'))
+    if filters.date_from:
+        conditions.append("date >= ?")
+        params.append(str(filters.date_from))
+    if filters.date_to:
+        conditions.append("date <= ?")
+        params.append(str(filters.date_to))
+    if filters.sentiment:
+        conditions.append("sentiment = ?")
+        params.append(filters.sentiment)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT * FROM messages {where} ORDER BY date DESC", params
+
+
+def iter_row_chunks(conn: sqlite3.Connection, filters: Optional[ExportFilters] = None,
+                    chunk_size: int = 1000) -> Iterator[Tuple[List[str], List[Tuple]]]:
+    """
+    Порции строк (колонки, строки) без загрузки всей таблицы в память
+
+    Сначала горячие строки из messages, затем архивные (они старше).
+    """
+    sql, params = build_query(filters)
+    cursor = conn.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield columns, rows
+
+    yield from iter_archive_chunks(conn, filters, chunk_size)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподобный приемник: ParquetWriter пишет сюда, мы отдаем байты порциями"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _iter_serialized(conn: sqlite3.Connection, format_type: str,
+                     filters: Optional[ExportFilters], chunk_size: int) -> Iterator[bytes]:
+    chunks = iter_row_chunks(conn, filters, chunk_size)
+
+    if format_type == "json":
+        # Массив JSON, совместимый с прежним форматом экспорта
+        yield b"["
+        first = True
+        for columns, rows in chunks:
+            parts = []
+            for row in rows:
+                parts.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+            yield (("" if first else ",") + ",".join(parts)).encode("utf-8")
+            first = False
+        yield b"]"
+
+    elif format_type == "jsonl":
+        for columns, rows in chunks:
+            lines = [json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) for row in rows]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    elif format_type == "csv":
+        header_written = False
+        for columns, rows in chunks:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+
+    elif format_type == "parquet":
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Для экспорта в Parquet установите pyarrow")
+
+        schema = arrow_schema(conn)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        try:
+            for columns, rows in chunks:
+                writer.write_table(arrow_table(columns, rows, schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    else:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {format_type}")
+
+
+def check_export(db_path: str, format_type: str = "json", filters: Optional[ExportFilters] = None):
+    """
+    Проверка экспорта до начала потока
+
+    Ошибка внутри генератора приходит, когда StreamingResponse уже отдал
+    200, и клиент получает обрезанный файл. Поэтому формат и наличие
+    pyarrow (для Parquet и для архивных файлов в диапазоне дат)
+    проверяются заранее: ValueError или RuntimeError.
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {format_type}")
+    if PYARROW_AVAILABLE:
+        return
+    if format_type == "parquet":
+        raise RuntimeError("Для экспорта в Parquet установите pyarrow")
+
+    filters = filters or ExportFilters()
+    conn = get_storage(db_path).connection()
+    if archive_files(conn, filters.date_from, filters.date_to):
+        raise RuntimeError("В базе есть архивные файлы: для чтения архива установите pyarrow")
+
+
+def iter_export(db_path: str, format_type: str = "json", filters: Optional[ExportFilters] = None,
+                compress: bool = False, chunk_size: int = 1000) -> Iterator[bytes]:
+    """
+    Потоковый экспорт сообщений в байтах
+
+    Генератор можно отдать в StreamingResponse или писать в файл.
+    """
+    check_export(db_path, format_type, filters)
+
+    # Отдельное соединение на экспорт: генератор может продолжаться
+    # в другом потоке (StreamingResponse) и не должен мешать писателю
+    conn = get_storage(db_path).open_connection()
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 - формат gzip
+
+    try:
+        for data in _iter_serialized(conn, format_type, filters, chunk_size):
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor:
+            yield compressor.flush()
+    finally:
+        conn.close()
+
+
+def export_to_file(db_path: str, filename: str, format_type: str = "json",
+                   filters: Optional[ExportFilters] = None, compress: bool = False) -> str:
+    """Потоковая запись экспорта в файл"""
+    with open(filename, "wb") as f:
+        for data in iter_export(db_path, format_type, filters, compress):
+            f.write(data)
+    return filename
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+🕉️ Job Manager - Фоновые задачи парсинга
+
+POST-запрос только ставит задачу в очередь и сразу возвращает id.
+Задачи выполняет ограниченный пул воркеров, а прогресс каждой задачи
+считается отдельными счетчиками ParseProgress. Число воркеров - это
+и есть предел параллельно парсящихся каналов; запросы к Telegram всех
+задач ограничивает общий RateLimiter парсера.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParseProgress:
+    """Счетчики прогресса одного запуска парсинга"""
+    expected: int = 0  # верхняя граница (max_messages)
+    fetched: int = 0
+    analyzed: int = 0
+    written: int = 0
+    errors: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def to_dict(self) -> Dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        rate = self.fetched / elapsed
+        remaining = max(self.expected - self.fetched, 0)
+        return {
+            "expected": self.expected,
+            "fetched": self.fetched,
+            "analyzed": self.analyzed,
+            "written": self.written,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 1),
+            "rate_per_second": round(rate, 2),
+            # Оценка сверху: канал может закончиться раньше max_messages
+            "eta_seconds": round(remaining / rate, 1) if rate > 0 and remaining else None
+        }
+
+
+@dataclass
+class Job:
+    """Задача парсинга"""
+    id: str
+    config: Any
+    status: str = "queued"  # queued / running / completed / failed
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: ParseProgress = field(default_factory=ParseProgress)
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "target": getattr(self.config, "target", None),
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "progress": self.progress.to_dict(),
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """Очередь задач с ограниченным пулом воркеров"""
+
+    def __init__(self, runner: Callable[[Any, ParseProgress], Awaitable[Dict]],
+                 workers: int = 2, max_jobs_kept: int = 1000):
+        self.runner = runner
+        self.workers = workers
+        self.max_jobs_kept = max_jobs_kept
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Запуск воркеров (лениво, при первой задаче)"""
+        if self._tasks:
+            return
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"🧵 Менеджер задач запущен ({self.workers} воркеров)")
+
+    async def submit(self, config) -> Job:
+        """Постановка задачи в очередь"""
+        await self.start()
+
+        job = Job(id=uuid.uuid4().hex, config=config)
+        job.progress.expected = getattr(config, "max_messages", 0)
+        self.jobs[job.id] = job
+        self._evict_finished()
+
+        await self.queue.put(job)
+        logger.info(f"📥 Задача {job.id} поставлена в очередь: {job.to_dict()['target']}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        return [job.to_dict() for job in reversed(self.jobs.values())]
+
+    async def stop(self):
+        """Остановка воркеров (задачи в работе отменяются)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job.started_at = datetime.now()
+            job.progress.started_at = time.monotonic()
+
+            try:
+                result = await self.runner(job.config, job.progress)
+                if result.get("error"):
+                    job.status = "failed"
+                    job.error = result["error"]
+                else:
+                    job.status = "completed"
+                job.result = result
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"❌ Задача {job.id} завершилась с ошибкой: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.now()
+                self.queue.task_done()
+
+    def _evict_finished(self):
+        """Удаление самых старых завершенных задач сверх лимита"""
+        while len(self.jobs) > self.max_jobs_kept:
+            for job_id, job in self.jobs.items():
+                if job.status in ("completed", "failed"):
+                    del self.jobs[job_id]
+                    break
+            else:
+                break
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+🕉️ Keyword Matcher - Предкомпилированный поиск множества ключевых слов
+
+Список слов сворачивается в префиксное дерево и компилируется в одно
+регулярное выражение, поэтому проверка сообщения - один проход по тексту
+вместо цикла по всем ключевым словам.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Регистронезависимая нормализация с учетом кириллицы (ё == е)"""
+    return text.casefold().replace('ё', 'е')
+
+
+def _trie_to_pattern(node: Dict) -> str:
+    """Преобразование префиксного дерева в регулярное выражение"""
+    terminal = '' in node
+    branches = [re.escape(char) + _trie_to_pattern(child) for char, child in sorted(node.items()) if char]
+
+    if not branches:
+        return ''
+
+    if len(branches) == 1:
+        body = branches[0]
+        # Одна ветка длиной больше символа требует группы для '?'
+        if terminal:
+            return f"(?:{body})?"
+        return body
+
+    body = f"(?:{'|'.join(branches)})"
+    return f"{body}?" if terminal else body
+
+
+class KeywordMatcher:
+    """
+    Поиск ключевых слов одним регулярным выражением
+
+    whole_words=False ищет слова с начала слова (удобно для русской
+    морфологии: "биткоин" найдет "биткоина"), True - только целые слова.
+    """
+
+    def __init__(self, keywords: Iterable[str], whole_words: bool = False):
+        self.keywords: Dict[str, str] = {}
+        for keyword in keywords:
+            normalized = normalize_text(keyword.strip())
+            if normalized:
+                self.keywords.setdefault(normalized, keyword.strip())
+
+        trie: Dict = {}
+        for normalized in self.keywords:
+            node = trie
+            for char in normalized:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        right_boundary = r'(?!\w)' if whole_words else ''
+        self.pattern = re.compile(rf"(?<!\w)({_trie_to_pattern(trie)}){right_boundary}") if trie else None
+
+    def search(self, text: str, normalized: bool = False) -> bool:
+        """Есть ли в тексте хотя бы одно ключевое слово"""
+        if self.pattern is None:
+            return False
+        return self.pattern.search(text if normalized else normalize_text(text)) is not None
+
+    def find_all(self, text: str, normalized: bool = False) -> List[str]:
+        """Найденные ключевые слова в порядке первого появления"""
+        if self.pattern is None:
+            return []
+
+        found = {}
+        for match in self.pattern.finditer(text if normalized else normalize_text(text)):
+            # Выражение принимает только полные пути дерева, т.е. целые ключевые слова
+            found.setdefault(self.keywords[match.group(1)], None)
+        return list(found)
+
+
+@lru_cache(maxsize=256)
+def compile_keywords(keywords: Tuple[str, ...], whole_words: bool = False) -> Optional[KeywordMatcher]:
+    """Кэшированная компиляция списка ключевых слов (один раз на набор слов)"""
+    if not keywords:
+        return None
+    return KeywordMatcher(keywords, whole_words)
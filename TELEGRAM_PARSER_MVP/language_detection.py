@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+🕉️ Language Detection - Офлайн определение языка
+
+Детектор на символьных n-граммах (наивный Байес) с профилями ru/en/uk/kk,
+построенными из встроенных образцов текста. Никаких сетевых вызовов,
+результаты кэшируются в LRU по хэшу текста.
+"""
+
+import hashlib
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Optional
+
+# Образцы текстов для построения профилей n-грамм
+SAMPLE_TEXTS = {
+    'ru': """
+        Сегодня в городе прошла большая конференция, на которой обсуждали развитие
+        технологий и новые проекты. Мы считаем, что это очень важно для всех жителей.
+        Правительство объявило о новых мерах поддержки малого бизнеса и предпринимателей.
+        Подписывайтесь на наш канал, чтобы первыми узнавать последние новости.
+        Цены на нефть выросли, а курс рубля к доллару снова изменился за неделю.
+        Что вы думаете об этом? Напишите своё мнение в комментариях под этим постом.
+        Эксперты говорят, что рынок криптовалют может вырасти уже в этом году.
+        Объявление: ищем сотрудников в отдел продаж, опыт работы не обязателен.
+    """,
+    'uk': """
+        Сьогодні в місті відбулася велика конференція, на якій обговорювали розвиток
+        технологій і нові проєкти. Ми вважаємо, що це дуже важливо для всіх мешканців.
+        Уряд оголосив про нові заходи підтримки малого бізнесу та підприємців.
+        Підписуйтеся на наш канал, щоб першими дізнаватися останні новини.
+        Ціни на нафту зросли, а курс гривні до долара знову змінився за тиждень.
+        Що ви думаєте про це? Напишіть свою думку в коментарях під цим дописом.
+        Експерти кажуть, що ринок криптовалют може зрости вже цього року.
+        Оголошення: шукаємо працівників у відділ продажу, досвід роботи не обов'язковий.
+    """,
+    'kk': """
+        Бүгін қалада үлкен конференция өтті, онда технологиялардың дамуы мен жаңа
+        жобалар талқыланды. Біз бұл барлық тұрғындар үшін өте маңызды деп санаймыз.
+        Үкімет шағын бизнес пен кәсіпкерлерді қолдаудың жаңа шараларын жариялады.
+        Соңғы жаңалықтарды бірінші болып білу үшін біздің арнаға жазылыңыз.
+        Мұнай бағасы өсті, ал теңгенің долларға шаққандағы бағамы апта ішінде қайта өзгерді.
+        Бұл туралы не ойлайсыз? Пікіріңізді осы жазбаның астындағы түсініктемелерге жазыңыз.
+        Сарапшылардың айтуынша, криптовалюта нарығы биыл өсуі мүмкін.
+        Хабарландыру: сату бөліміне қызметкерлер іздейміз, жұмыс тәжірибесі міндетті емес.
+    """,
+    'en': """
+        Today a large conference took place in the city, where the development of
+        technology and new projects were discussed. We believe this is very important for everyone.
+        The government announced new measures to support small businesses and entrepreneurs.
+        Subscribe to our channel to be the first to know the latest news and updates.
+        Oil prices went up, and the exchange rate against the dollar changed again this week.
+        What do you think about this? Write your opinion in the comments under this post.
+        Experts say that the cryptocurrency market could grow this year.
+        Announcement: we are looking for employees in the sales department, no experience required.
+    """,
+}
+
+CYRILLIC_LANGUAGES = ('ru', 'uk', 'kk')
+LATIN_LANGUAGES = ('en',)
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+CYRILLIC_PATTERN = re.compile(r'[а-яёіїєґәғқңөұүһ]')
+LATIN_PATTERN = re.compile(r'[a-z]')
+
+
+class LanguageDetector(ABC):
+    """Базовый интерфейс детектора языка"""
+
+    name = "base"
+
+    @abstractmethod
+    def detect(self, text: str) -> Optional[str]:
+        """Код языка текста или None, если язык не определен"""
+
+
+def _ngrams(text: str, max_n: int = 3):
+    """Символьные n-граммы (1..max_n) по словам с границами"""
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f" {word} "
+        for n in range(1, max_n + 1):
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                if gram.strip():
+                    yield gram
+
+
+class NgramLanguageDetector(LanguageDetector):
+    """Наивный Байес по символьным n-граммам"""
+
+    name = "ngram"
+
+    def __init__(self, samples: Dict[str, str] = None, max_n: int = 3, min_letters: int = 3):
+        self.max_n = max_n
+        self.min_letters = min_letters
+        self.profiles: Dict[str, Dict[str, float]] = {}
+        self.unknown_logprob: Dict[str, float] = {}
+
+        samples = samples or SAMPLE_TEXTS
+        vocabulary = set()
+        counts = {}
+        for language, sample in samples.items():
+            counts[language] = Counter(_ngrams(sample, max_n))
+            vocabulary.update(counts[language])
+
+        # Лог-вероятности со сглаживанием Лапласа
+        for language, counter in counts.items():
+            total = sum(counter.values()) + len(vocabulary) + 1
+            self.profiles[language] = {
+                gram: math.log((count + 1) / total) for gram, count in counter.items()
+            }
+            self.unknown_logprob[language] = math.log(1 / total)
+
+    def detect(self, text: str) -> Optional[str]:
+        text_lower = text.lower()
+        cyrillic = len(CYRILLIC_PATTERN.findall(text_lower))
+        latin = len(LATIN_PATTERN.findall(text_lower))
+
+        if max(cyrillic, latin) < self.min_letters:
+            return None
+
+        candidates = [
+            language for language in (CYRILLIC_LANGUAGES if cyrillic >= latin else LATIN_LANGUAGES)
+            if language in self.profiles
+        ]
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        grams = Counter(_ngrams(text_lower, self.max_n))
+        best_language, best_score = None, -math.inf
+        for language in candidates:
+            profile = self.profiles[language]
+            unknown = self.unknown_logprob[language]
+            score = sum(profile.get(gram, unknown) * count for gram, count in grams.items())
+            if score > best_score:
+                best_language, best_score = language, score
+
+        return best_language
+
+
+class CachedLanguageDetector(LanguageDetector):
+    """LRU-кэш результатов по хэшу текста поверх любого детектора"""
+
+    def __init__(self, detector: LanguageDetector, maxsize: int = 10000):
+        self.detector = detector
+        self.name = detector.name
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+
+    def detect(self, text: str) -> Optional[str]:
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        language = self.detector.detect(text)
+        self._cache[key] = language
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return language
+
+
+# Реестр детекторов: сторонние реализации подключаются через register_detector
+DETECTORS: Dict[str, Callable[[], LanguageDetector]] = {
+    "ngram": NgramLanguageDetector,
+}
+
+_instances: Dict[str, LanguageDetector] = {}
+
+
+def register_detector(name: str, factory: Callable[[], LanguageDetector]):
+    """Регистрация своего детектора языка"""
+    DETECTORS[name] = factory
+    _instances.pop(name, None)
+
+
+def get_detector(name: str = "ngram") -> LanguageDetector:
+    """Кэшированный экземпляр детектора (один на процесс)"""
+    if name not in _instances:
+        if name not in DETECTORS:
+            raise ValueError(f"Неизвестный детектор языка: {name}")
+        _instances[name] = CachedLanguageDetector(DETECTORS[name]())
+    return _instances[name]
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+🕉️ Media Pipeline - Загрузка медиа из сообщений
+
+Необязательная стадия: фото и видео скачиваются ограниченным числом
+воркеров в хранилище с адресацией по содержимому (имя файла - SHA-256),
+поэтому репосты одного файла хранятся один раз. Известный file_unique_id
+пропускает загрузку совсем. Файл читается потоком частей: SHA-256 и
+размер считаются на лету, а превышение max_file_size прерывает загрузку,
+даже если размер заранее неизвестен. Таблица media связана с messages
+через message_media (channel_id, message_id).
+"""
+
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INSERT_MEDIA_SQL = '''
+    INSERT INTO media (sha256, file_unique_id, path, size, mime_type, media_type)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (sha256) DO UPDATE SET
+        file_unique_id = COALESCE(file_unique_id, excluded.file_unique_id)
+'''
+
+LINK_MEDIA_SQL = '''
+    INSERT OR IGNORE INTO message_media (channel_id, message_id, media_id)
+    VALUES (?, ?, ?)
+'''
+
+
+@dataclass
+class MediaConfig:
+    """Конфигурация стадии загрузки медиа"""
+    enabled: bool = False
+    directory: str = "media"
+    max_file_size: int = 20 * 1024 * 1024  # байты
+    concurrency: int = 4
+    queue_size: int = 200
+    types: Tuple[str, ...] = ("photo", "video")
+
+
+@dataclass
+class MediaItem:
+    """Медиа одного сообщения, готовое к загрузке"""
+    channel_id: int
+    message_id: int
+    media_type: str
+    file_unique_id: Optional[str]
+    size: Optional[int]
+    mime_type: Optional[str]
+    # Потоковая загрузка частями (stream_media / iter_download клиента)
+    stream: Callable[[], AsyncIterator[bytes]] = field(repr=False)
+
+    @property
+    def extension(self) -> str:
+        if self.media_type == "photo":
+            return ".jpg"
+        return (mimetypes.guess_extension(self.mime_type) if self.mime_type else None) or ".bin"
+
+
+def pyrogram_media_item(client, message, channel_id: int) -> Optional[MediaItem]:
+    """MediaItem из сообщения Pyrogram"""
+    if not message.media:
+        return None
+
+    media_type = message.media.value
+    media = getattr(message, media_type, None)
+    if media is None:
+        return None
+
+    return MediaItem(
+        channel_id=channel_id,
+        message_id=message.id,
+        media_type=media_type,
+        file_unique_id=getattr(media, 'file_unique_id', None),
+        size=getattr(media, 'file_size', None),
+        mime_type=getattr(media, 'mime_type', None),
+        stream=lambda: client.stream_media(message)
+    )
+
+
+def telethon_media_item(client, message, channel_id: int) -> Optional[MediaItem]:
+    """MediaItem из сообщения Telethon"""
+    if message.photo:
+        media_type, media = "photo", message.photo
+    elif message.video:
+        media_type, media = "video", message.document
+    elif message.document:
+        media_type, media = "document", message.document
+    else:
+        return None
+
+    file = message.file
+    return MediaItem(
+        channel_id=channel_id,
+        message_id=message.id,
+        media_type=media_type,
+        # id фото/документа одинаков у всех пересылок файла
+        file_unique_id=f"{media_type}:{media.id}",
+        size=getattr(file, 'size', None),
+        mime_type=getattr(file, 'mime_type', None),
+        stream=lambda: client.iter_download(media)
+    )
+
+
+def _store(temp_path: Path, directory: Path, sha256: str, extension: str) -> Path:
+    """Перенос загруженного файла в путь по содержимому (дубликат удаляется)"""
+    target = directory / sha256[:2] / f"{sha256}{extension}"
+    if target.exists():
+        temp_path.unlink()
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, target)
+    return target
+
+
+class MediaDownloader:
+    """
+    Ограниченный пул загрузки медиа
+
+    Воркеры берут MediaItem из очереди; одинаковые file_unique_id,
+    которые уже загружаются, ждут первую загрузку вместо повторной.
+    """
+
+    def __init__(self, storage, config: Optional[MediaConfig] = None):
+        self.storage = storage
+        self.config = config or MediaConfig()
+        self.directory = Path(self.config.directory)
+        self.queue: Optional[asyncio.Queue] = None
+        self.stats = {
+            'downloaded': 0,
+            'deduplicated': 0,
+            'skipped': 0,
+            'errors': 0,
+            'bytes': 0
+        }
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def accepts(self, item: Optional[MediaItem]) -> bool:
+        """Подходит ли медиа по типу и размеру"""
+        if item is None or not self.config.enabled:
+            return False
+        if item.media_type not in self.config.types:
+            return False
+        if item.size is not None and item.size > self.config.max_file_size:
+            self.stats['skipped'] += 1
+            return False
+        return True
+
+    async def start(self):
+        if self.is_running:
+            return
+        (self.directory / ".tmp").mkdir(parents=True, exist_ok=True)
+        self.queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.config.concurrency)]
+        logger.info(f"🖼️ Загрузка медиа запущена ({self.config.concurrency} потоков, {self.directory})")
+
+    async def put(self, item: MediaItem):
+        """Постановка медиа в очередь (ждет при переполнении)"""
+        if not self.is_running:
+            await self.start()
+        await self.queue.put(item)
+
+    async def flush(self):
+        if self.is_running:
+            await self.queue.join()
+
+    async def stop(self):
+        if not self.is_running:
+            return
+        await self.flush()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"🖼️ Загрузка медиа остановлена: {self.stats}")
+
+    def _known_media_id(self, file_unique_id: Optional[str]) -> Optional[int]:
+        if not file_unique_id:
+            return None
+        row = self.storage.fetchone("SELECT id FROM media WHERE file_unique_id = ?", (file_unique_id,))
+        return row[0] if row else None
+
+    def _save(self, item: MediaItem, sha256: str, path: Path, size: int) -> int:
+        with self.storage.transaction() as conn:
+            conn.execute(INSERT_MEDIA_SQL, (
+                sha256, item.file_unique_id, str(path), size, item.mime_type, item.media_type
+            ))
+            media_id = conn.execute("SELECT id FROM media WHERE sha256 = ?", (sha256,)).fetchone()[0]
+            conn.execute(LINK_MEDIA_SQL, (item.channel_id, item.message_id, media_id))
+        return media_id
+
+    def _link(self, item: MediaItem, media_id: int):
+        with self.storage.transaction() as conn:
+            conn.execute(LINK_MEDIA_SQL, (item.channel_id, item.message_id, media_id))
+
+    async def _download(self, item: MediaItem) -> Optional[int]:
+        """
+        Загрузка во временный файл с подсчетом SHA-256 и размера
+
+        None - файл оказался больше max_file_size и загрузка прервана.
+        """
+        temp_path = self.directory / ".tmp" / f"{uuid.uuid4().hex}{item.extension}"
+        digest = hashlib.sha256()
+        size = 0
+        chunks = item.stream()
+        try:
+            with open(temp_path, 'wb') as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.config.max_file_size:
+                        logger.warning(
+                            f"⚠️ Медиа {item.channel_id}/{item.message_id} больше "
+                            f"{self.config.max_file_size} байт, загрузка прервана"
+                        )
+                        self.stats['skipped'] += 1
+                        return None
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+
+            sha256 = digest.hexdigest()
+            path = await asyncio.to_thread(_store, temp_path, self.directory, sha256, item.extension)
+        finally:
+            # Прерванный генератор клиента закрывается сразу, а не сборщиком мусора
+            aclose = getattr(chunks, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+            if temp_path.exists():
+                temp_path.unlink()
+
+        self.stats['downloaded'] += 1
+        self.stats['bytes'] += size
+        return await self.storage.run(self._save, item, sha256, path, size)
+
+    async def _process(self, item: MediaItem):
+        key = item.file_unique_id
+        media_id = self._known_media_id(key)
+        if media_id is None and key in self._in_flight:
+            media_id = await self._in_flight[key]
+            if media_id is None:
+                # Первая загрузка этого файла прервана по размеру
+                self.stats['skipped'] += 1
+                return
+
+        if media_id is not None:
+            self.stats['deduplicated'] += 1
+            await self.storage.run(self._link, item, media_id)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        if key:
+            self._in_flight[key] = future
+        try:
+            media_id = await self._download(item)
+            future.set_result(media_id)
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже залогировано ниже, ожидающие его получат сами
+            future.exception()
+            raise
+        finally:
+            if key:
+                self._in_flight.pop(key, None)
+
+    async def _run(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._process(item)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки медиа {item.channel_id}/{item.message_id}: {e}")
+                self.stats['errors'] += 1
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+🕉️ Message Writer - Потоковая запись сообщений в SQLite
+
+Фоновая стадия конвейера: парсеры кладут сообщения в ограниченную очередь,
+а писатель сбрасывает их батчами через executemany в одной транзакции
+на постоянном соединении Storage в выделенном потоке БД.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from metrics import BATCH_SIZE, LAST_WRITE, MESSAGES, STAGE_SECONDS
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Upsert по уникальному индексу (channel_id, message_id): повторный парсинг
+# обновляет счетчики и анализ на месте, не меняя id строки
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages
+    (message_id, text, date, author, author_id_hash, channel_id, channel_name,
+     message_type, media_type, media_url, reply_to, views, forwards,
+     sentiment, keywords, language, cluster_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (channel_id, message_id) DO UPDATE SET
+        text = excluded.text,
+        channel_name = excluded.channel_name,
+        media_type = excluded.media_type,
+        media_url = excluded.media_url,
+        views = excluded.views,
+        forwards = excluded.forwards,
+        sentiment = excluded.sentiment,
+        keywords = excluded.keywords,
+        language = excluded.language,
+        cluster_id = COALESCE(excluded.cluster_id, cluster_id)
+'''
+
+
+@dataclass
+class WriterConfig:
+    """Конфигурация фонового писателя"""
+    batch_size: int = 500
+    flush_interval: float = 2.0  # секунды
+    queue_size: int = 5000  # ограничение очереди (backpressure)
+
+
+def message_to_row(msg) -> Tuple:
+    """Преобразование ParsedMessage в строку для INSERT"""
+    return (
+        msg.id, msg.text, msg.date, msg.author, msg.author_id,
+        msg.channel_id, msg.channel_name, msg.message_type,
+        msg.media_type, msg.media_url, msg.reply_to, msg.views,
+        msg.forwards, msg.sentiment, json.dumps(msg.keywords),
+        msg.language, msg.cluster_id
+    )
+
+
+class MessageWriter:
+    """
+    Фоновый писатель сообщений
+
+    Все операции с SQLite выполняются в выделенном потоке Storage,
+    поэтому соединение живет весь срок работы процесса.
+    """
+
+    def __init__(self, db_path: str, config: Optional[WriterConfig] = None):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        self.config = config or WriterConfig()
+        self.queue: Optional[asyncio.Queue] = None
+        self.stats = {
+            'written_messages': 0,
+            'batches': 0,
+            'errors': 0
+        }
+        # Наименьший незаписанный message_id по каналам: checkpoint не должен
+        # его перескочить (см. take_failures)
+        self._failed: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запуск фоновой задачи записи"""
+        if self.is_running:
+            return
+
+        self.queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"✍️ Писатель запущен (batch={self.config.batch_size}, "
+            f"interval={self.config.flush_interval}s, queue={self.config.queue_size})"
+        )
+
+    async def put(self, msg, progress=None):
+        """Добавление сообщения в очередь (ждет при переполнении)"""
+        if not self.is_running:
+            await self.start()
+        await self.queue.put((msg, progress))
+
+    async def flush(self):
+        """Ожидание записи всех сообщений, поставленных в очередь"""
+        if self.is_running:
+            await self.queue.join()
+
+    def take_failures(self, channel_id: int) -> Optional[int]:
+        """Наименьший id незаписанного с прошлой проверки сообщения канала или None"""
+        return self._failed.pop(channel_id, None)
+
+    async def execute(self, sql: str, params: Tuple = ()):
+        """Выполнение служебного запроса в потоке БД писателя"""
+        await self.storage.run_write(sql, params)
+
+    async def stop(self):
+        """Сброс остатка очереди и остановка фоновой задачи"""
+        if not self.is_running:
+            return
+
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"✍️ Писатель остановлен, записано {self.stats['written_messages']} сообщений")
+
+    async def _run(self):
+        """Основной цикл: набираем батч до batch_size или до flush_interval"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.config.flush_interval
+
+            while len(batch) < self.config.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self.storage.run(self._write_batch, batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write_batch(self, batch: List):
+        """Запись батча одной транзакцией"""
+        BATCH_SIZE.observe(len(batch), stage="write")
+        try:
+            with STAGE_SECONDS.time(stage="write"):
+                with self.storage.transaction() as conn:
+                    conn.executemany(INSERT_MESSAGE_SQL, [message_to_row(msg) for msg, _ in batch])
+            LAST_WRITE.set(time.time())
+            self.stats['written_messages'] += len(batch)
+            self.stats['batches'] += 1
+            logger.debug(f"Записан батч из {len(batch)} сообщений")
+            written = True
+        except Exception as e:
+            logger.error(f"Ошибка записи батча ({len(batch)} сообщений): {e}")
+            self.stats['errors'] += 1
+            for msg, _ in batch:
+                self._failed[msg.channel_id] = min(self._failed.get(msg.channel_id, msg.id), msg.id)
+            written = False
+
+        stage = "written" if written else "write_failed"
+        for channel, count in Counter(msg.channel_name or "" for msg, _ in batch).items():
+            MESSAGES.inc(count, channel=channel, stage=stage)
+
+        # Счетчики прогресса задач, которым принадлежат сообщения
+        for _, progress in batch:
+            if progress is None:
+                continue
+            if written:
+                progress.written += 1
+            else:
+                progress.errors += 1
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+🕉️ Metrics - Метрики сервиса в текстовом формате Prometheus
+
+Счетчики, гистограммы и датчики с метками без внешних зависимостей.
+Метрики объявлены здесь на уровне модуля, стадии конвейера только
+вызывают inc/observe, а /metrics отдает REGISTRY.render(). Запись идет
+и из потока БД, поэтому каждая метрика защищена своей блокировкой.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин по умолчанию (секунды)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric(ABC):
+    """Базовая метрика: имя, описание, имена меток"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """(суффикс имени, имена меток, значения меток, значение)"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError(f"{self.name}: счетчик не может уменьшаться")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield "", self.labelnames, values, value
+
+
+class Gauge(Metric):
+    """Текущее значение: задается явно или функцией, вызываемой при сборе"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                values.pop(key, None)
+        for key, value in sorted(values.items()):
+            yield "", self.labelnames, key, value
+
+
+class Histogram(Metric):
+    """Распределение наблюдений по корзинам (кумулятивно, как в Prometheus)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Значения меток -> (счетчики корзин, сумма, количество)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Наблюдение длительности блока with"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        names = self.labelnames + ("le",)
+        for values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", names, values + (_format_value(bound),), cumulative
+            yield "_sum", self.labelnames, values, total
+            yield "_count", self.labelnames, values, count
+
+
+class MetricsRegistry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+MESSAGES = REGISTRY.register(Counter(
+    "parser_messages_total",
+    "Сообщения по каналам и стадиям (fetched, filtered, written, write_failed)",
+    ("channel", "stage")
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "parser_stage_duration_seconds",
+    "Длительность стадий: fetch - ожидание сообщения от API, analyze - батч анализа, write - транзакция записи",
+    ("stage",)
+))
+FLOOD_WAITS = REGISTRY.register(Counter(
+    "parser_flood_waits_total",
+    "Число FloodWait по аккаунтам (клиентам)",
+    ("account",)
+))
+FLOOD_WAIT_SECONDS = REGISTRY.register(Counter(
+    "parser_flood_wait_seconds_total",
+    "Суммарная длительность FloodWait по аккаунтам (клиентам)",
+    ("account",)
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "parser_batch_size",
+    "Размер батчей анализа и записи в БД",
+    ("stage",),
+    buckets=BATCH_SIZE_BUCKETS
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "parser_queue_depth",
+    "Число элементов в очередях конвейера",
+    ("queue",)
+))
+LAST_WRITE = REGISTRY.register(Gauge(
+    "parser_last_write_timestamp_seconds",
+    "Время (unix) последней успешной записи батча - для алертов на остановку"
+))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+🕉️ Models - Структуры данных парсера
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+
+@dataclass
+class ParsedMessage:
+    """Структура распарсенного сообщения"""
+    id: int
+    text: str
+    date: datetime
+    author: str
+    author_id: int
+    channel_id: int
+    channel_name: str
+    message_type: str
+    media_type: Optional[str] = None
+    media_url: Optional[str] = None
+    reply_to: Optional[int] = None
+    views: Optional[int] = None
+    forwards: Optional[int] = None
+    sentiment: Optional[str] = None
+    keywords: Optional[List[str]] = None
+    language: Optional[str] = None
+    cluster_id: Optional[int] = None  # кластер почти-дубликатов (dedup)
@@ -16,20 +16,66 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union
 from dataclasses import dataclass
 from pathlib import Path
-import sqlite3
 from concurrent.futures import ThreadPoolExecutor
 import aiohttp
 
+from storage import get_storage
+from schema import init_account_schema, init_schema
+from models import ParsedMessage
+from message_writer import MessageWriter
+from analysis_pipeline import AnalysisPipeline
+from rate_limiter import RateLimiter
+from account_state import AccountStateStore
+from account_scheduler import AccountScheduler
+from anonymizer import get_anonymizer
+from metrics import MESSAGES, STAGE_SECONDS
+
 # Telegram клиенты
 try:
     from pyrogram import Client
+    from pyrogram.errors import FloodWait, PhoneNumberBanned, Unauthorized
+    PYROGRAM_AVAILABLE = True
+except ImportError:
+    PYROGRAM_AVAILABLE = False
+
+    class FloodWait(Exception):
+        value = 0
+
+    class Unauthorized(Exception):
+        pass
+
+    class PhoneNumberBanned(Exception):
+        pass
+
+try:
     from telethon import TelegramClient
-    TELEGRAM_AVAILABLE = True
+    from telethon.errors import FloodWaitError, PhoneNumberBannedError, UnauthorizedError
+    TELETHON_AVAILABLE = True
 except ImportError:
-    TELEGRAM_AVAILABLE = False
+    TELETHON_AVAILABLE = False
+
+    class FloodWaitError(Exception):
+        seconds = 0
+
+    class UnauthorizedError(Exception):
+        pass
+
+    class PhoneNumberBannedError(Exception):
+        pass
+
+TELEGRAM_AVAILABLE = PYROGRAM_AVAILABLE or TELETHON_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
+# Один API-запрос истории возвращает до 100 сообщений
+HISTORY_PAGE_SIZE = 100
+
+# Предел паузы аккаунта после ошибок подряд (секунды)
+MAX_ERROR_COOLDOWN = 3600.0
+
+# Ошибки авторизации и бана: без вмешательства аккаунт работать не будет
+ACCOUNT_BANNED_ERRORS = (Unauthorized, PhoneNumberBanned, UnauthorizedError, PhoneNumberBannedError)
+
 @dataclass
 class AccountConfig:
     """Конфигурация одного аккаунта"""
@@ -43,6 +89,10 @@ class AccountConfig:
     last_request_time: Optional[datetime] = None
     max_daily_requests: int = 5000  # Безопасный лимит
     rate_limit_delay: float = 1.0
+    engine: str = "pyrogram"  # pyrogram или telethon
+    max_hourly_requests: int = 0  # скользящее окно, 0 - без ограничения
+    usage_date: Optional[str] = None  # дата, к которой относится daily_requests
+    flood_wait_until: Optional[datetime] = None
 
 @dataclass
 class ScalingConfig:
@@ -54,15 +104,67 @@ class ScalingConfig:
     retry_delay: float = 60.0  # секунды при ошибках
     max_retries: int = 3
 
+class AccountFloodWait(Exception):
+    """Аккаунт получил FloodWait - диапазон нужно отдать другому аккаунту"""
+
+class ClientPool:
+    """Пул постоянных клиентов Telegram: один запущенный клиент на аккаунт"""
+    
+    def __init__(self):
+        self.clients: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    async def get(self, account: AccountConfig):
+        """Клиент аккаунта (запускается при первом обращении)"""
+        lock = self._locks.setdefault(account.account_id, asyncio.Lock())
+        async with lock:
+            if account.account_id not in self.clients:
+                client = await self._start_client(account)
+                self.clients[account.account_id] = (account.engine, client)
+            return self.clients[account.account_id][1]
+    
+    async def _start_client(self, account: AccountConfig):
+        if account.engine == "telethon":
+            if not TELETHON_AVAILABLE:
+                raise RuntimeError("Telethon не установлен")
+            client = TelegramClient(account.session_name, int(account.api_id), account.api_hash)
+            await client.start(phone=account.phone_number)
+        else:
+            if not PYROGRAM_AVAILABLE:
+                raise RuntimeError("Pyrogram не установлен")
+            client = Client(
+                account.session_name,
+                api_id=account.api_id,
+                api_hash=account.api_hash,
+                phone_number=account.phone_number
+            )
+            await client.start()
+        
+        logger.info(f"✅ Клиент {account.engine} для аккаунта {account.account_id} запущен")
+        return client
+    
+    async def close_all(self):
+        """Остановка всех клиентов"""
+        for account_id, (engine, client) in self.clients.items():
+            try:
+                if engine == "telethon":
+                    await client.disconnect()
+                else:
+                    await client.stop()
+            except Exception as e:
+                logger.error(f"Ошибка остановки клиента {account_id}: {e}")
+        self.clients = {}
+
 class MultiAccountParser:
     """Масштабируемый парсер с множественными аккаунтами"""
     
     def __init__(self, config_file: str = "multi_account_config.json"):
         self.config_file = config_file
+        self.db_path = "multi_account_parser.db"
+        self.storage = get_storage(self.db_path)
         self.accounts: Dict[str, AccountConfig] = {}
         self.scaling_config = ScalingConfig()
         self.active_accounts: List[str] = []
-        self.current_account_index = 0
         self.global_stats = {
             "total_messages_parsed": 0,
             "total_accounts_used": 0,
@@ -72,6 +174,26 @@ class MultiAccountParser:
         
         self._load_config()
         self._init_database()
+        
+        # Общее хранилище сообщений (та же схема, что у TelegramParserMVP)
+        init_schema(get_storage(self.messages_db_path).connection())
+        self.writer = MessageWriter(self.messages_db_path)
+        self.analysis = AnalysisPipeline(self.writer)
+        self.client_pool = ClientPool()
+        self.rate_limiter = RateLimiter(
+            requests_per_second=1.0 / max(self.scaling_config.global_rate_limit, 0.01),
+            burst=self.scaling_config.max_concurrent_accounts
+        )
+        
+        # Восстановление использования аккаунтов и пауз FloodWait
+        self.account_state = AccountStateStore(self.storage)
+        self.account_state.prune()
+        for account in self.accounts.values():
+            remaining = self.account_state.load(account)
+            if remaining > 0:
+                self.rate_limiter.pause(account.account_id, remaining, restored=True)
+        self.account_state.save(self.accounts.values())
+        self.scheduler = AccountScheduler(self.accounts, self.active_accounts, self.account_state, self.rate_limiter)
     
     def _load_config(self):
         """Загрузка конфигурации множественных аккаунтов"""
@@ -84,6 +206,13 @@ class MultiAccountParser:
                 "retry_delay": 60.0,
                 "max_retries": 3
             },
+            "database": {
+                "path": "telegram_data.db"
+            },
+            "privacy": {
+                "hash_secret": None,  # или переменная окружения TELEGRAM_PARSER_HASH_SECRET
+                "hash_secret_file": "hash_secret.key"
+            },
             "accounts": []
         }
         
@@ -133,137 +262,208 @@ class MultiAccountParser:
         # Загрузка настроек масштабирования
         scaling_data = default_config.get("scaling", {})
         self.scaling_config = ScalingConfig(**scaling_data)
+        self.messages_db_path = default_config.get("database", {}).get("path", "telegram_data.db")
+        
+        # Тот же секрет, что у TelegramParserMVP, дает совпадающие хэши авторов
+        privacy = default_config.get("privacy", {})
+        self.anonymizer = get_anonymizer(
+            privacy.get("hash_secret"),
+            privacy.get("hash_secret_file", "hash_secret.key")
+        )
         
         logger.info(f"Загружено {len(self.accounts)} аккаунтов, активных: {len(self.active_accounts)}")
     
     def _init_database(self):
         """Инициализация базы данных для множественных аккаунтов"""
-        conn = sqlite3.connect("multi_account_parser.db")
-        cursor = conn.cursor()
-        
-        # Таблица аккаунтов
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS accounts (
-                account_id TEXT PRIMARY KEY,
-                api_id TEXT,
-                phone_number TEXT,
-                daily_requests INTEGER DEFAULT 0,
-                last_request_time TIMESTAMP,
-                total_requests INTEGER DEFAULT 0,
-                errors_count INTEGER DEFAULT 0,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица статистики парсинга
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS parsing_sessions (
-                id INTEGER PRIMARY KEY,
-                session_id TEXT,
-                account_id TEXT,
-                target_channel TEXT,
-                messages_parsed INTEGER,
-                start_time TIMESTAMP,
-                end_time TIMESTAMP,
-                status TEXT,
-                error_message TEXT,
-                FOREIGN KEY (account_id) REFERENCES accounts (account_id)
-            )
-        ''')
-        
-        # Таблица лимитов и мониторинга
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rate_limits (
-                id INTEGER PRIMARY KEY,
-                account_id TEXT,
-                request_type TEXT,
-                timestamp TIMESTAMP,
-                response_time FLOAT,
-                success BOOLEAN,
-                error_type TEXT,
-                FOREIGN KEY (account_id) REFERENCES accounts (account_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        init_account_schema(self.storage.connection())
     
     def get_next_available_account(self) -> Optional[AccountConfig]:
-        """Получение следующего доступного аккаунта"""
-        if not self.active_accounts:
-            return None
-        
-        # Ротация аккаунтов
-        account_id = self.active_accounts[self.current_account_index]
-        account = self.accounts[account_id]
+        """Лучший аккаунт, свободный прямо сейчас (см. AccountScheduler)"""
+        return self.scheduler.next_account()
+    
+    @staticmethod
+    def _split_id_range(low: int, high: int, chunk_size: int) -> List[tuple]:
+        """Разбиение [low, high] на непересекающиеся диапазоны (от новых к старым)"""
+        ranges = []
+        upper = high
+        while upper >= low:
+            lower = max(low, upper - chunk_size + 1)
+            ranges.append((lower, upper))
+            upper = lower - 1
+        return ranges
+    
+    async def _begin_request(self, account: AccountConfig) -> float:
+        """Учет одного API-запроса аккаунта: rate_limit_delay аккаунта и общий rate limiting"""
+        if account.last_request_time:
+            wait = account.rate_limit_delay - (datetime.now() - account.last_request_time).total_seconds()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        await self.rate_limiter.acquire(account.account_id)
+        self.account_state.roll_over(account)
+        account.daily_requests += 1
+        account.last_request_time = datetime.now()
+        return time.monotonic()
+    
+    def _end_request(self, account: AccountConfig, request_type: str, started: float,
+                     error: Optional[Exception] = None):
+        """Запись результата запроса в журнал rate_limits"""
+        self.account_state.record_request(
+            account, request_type, time.monotonic() - started,
+            type(error).__name__ if error else None
+        )
+    
+    def _flood_wait(self, account: AccountConfig, error: Exception) -> float:
+        """Пауза аккаунта после FloodWait с сохраняемым дедлайном"""
+        seconds = getattr(error, 'value', None) or getattr(error, 'seconds', 0)
+        self.rate_limiter.pause(account.account_id, seconds)
+        account.flood_wait_until = datetime.now() + timedelta(seconds=seconds)
+        return seconds
+    
+    def _account_error(self, account: AccountConfig, error: Exception) -> str:
+        """
+        Реакция на ошибку запроса аккаунта, возвращает текст ошибки
+
+        FloodWait уже поставил аккаунт на паузу. Авторизация и бан отключают
+        аккаунт до перезапуска, прочие ошибки (сеть, таймауты) - пауза
+        retry_delay, которая удваивается с каждой ошибкой подряд.
+        """
+        error_msg = f"Ошибка аккаунта {account.account_id}: {str(error)}"
+        logger.error(error_msg)
         
-        # Проверка дневных лимитов
-        if account.daily_requests >= account.max_daily_requests:
-            logger.warning(f"Аккаунт {account_id} достиг дневного лимита")
-            return None
+        if isinstance(error, (FloodWait, FloodWaitError)):
+            return error_msg
         
-        # Проверка времени последнего запроса
-        if account.last_request_time:
-            time_since_last = (datetime.now() - account.last_request_time).total_seconds()
-            if time_since_last < account.rate_limit_delay:
-                return None
+        if isinstance(error, ACCOUNT_BANNED_ERRORS):
+            account.is_active = False
+            if account.account_id in self.active_accounts:
+                self.active_accounts.remove(account.account_id)
+            logger.warning(f"🚫 Аккаунт {account.account_id} отключен: {type(error).__name__}")
+        else:
+            failures = max(self.account_state.consecutive_errors(account.account_id), 1)
+            cooldown = min(self.scaling_config.retry_delay * 2 ** (failures - 1), MAX_ERROR_COOLDOWN)
+            self.rate_limiter.cooldown(account.account_id, cooldown)
+        return error_msg
+    
+    async def _get_top_message_id(self, account: AccountConfig, target: str) -> int:
+        """ID самого нового сообщения канала"""
+        client = await self.client_pool.get(account)
+        started = await self._begin_request(account)
         
-        # Переход к следующему аккаунту
-        self.current_account_index = (self.current_account_index + 1) % len(self.active_accounts)
+        try:
+            top_id = 0
+            if account.engine == "telethon":
+                messages = await client.get_messages(target, limit=1)
+                top_id = messages[0].id if messages else 0
+            else:
+                async for message in client.get_chat_history(target, limit=1):
+                    top_id = message.id
+                    break
+            self._end_request(account, "get_top_message", started)
+            return top_id
+        except (FloodWait, FloodWaitError) as e:
+            self._end_request(account, "get_top_message", started, e)
+            self._flood_wait(account, e)
+            raise
+        except Exception as e:
+            self._end_request(account, "get_top_message", started, e)
+            raise
+        finally:
+            await self.account_state.persist([account])
+    
+    async def _resolve_top_message_id(self, target: str, errors: List[str]) -> Optional[int]:
+        """
+        ID самого нового сообщения через первый ответивший аккаунт
         
-        return account
+        Аккаунты пробуются по очереди планировщика, каждый не больше раза:
+        после FloodWait аккаунт уже на паузе, после прочей ошибки берется
+        следующий. None - нет аккаунтов с квотой или все они ответили
+        ошибкой (тексты ошибок в errors).
+        """
+        tried = set()
+        while True:
+            candidates = [
+                account for account in self.scheduler.ranked_accounts(available_only=False)
+                if account.account_id not in tried and self.scheduler.has_quota(account)
+            ]
+            if not candidates:
+                return None
+            account = candidates[0]
+            tried.add(account.account_id)
+            
+            delay = self.scheduler.delay(account)
+            if delay > 0:
+                logger.info(f"⏳ Аккаунт {account.account_id} освободится через {delay:.1f} с")
+                await asyncio.sleep(delay)
+            
+            try:
+                return await self._get_top_message_id(account, target)
+            except Exception as e:
+                errors.append(self._account_error(account, e))
     
     async def parse_with_account_rotation(self, target: str, max_messages: int = 1000) -> Dict:
-        """Парсинг с автоматической ротацией аккаунтов"""
+        """
+        Параллельный парсинг несколькими аккаунтами
+        
+        История канала делится на непересекающиеся диапазоны message_id,
+        которые аккаунты разбирают одновременно; все сообщения пишутся
+        в общее хранилище.
+        """
         logger.info(f"🚀 Начинаем масштабированный парсинг: {target}")
         
-        all_messages = []
         accounts_used = set()
         errors = []
+        counters = {"messages": 0, "ranges": 0}
         
-        messages_parsed = 0
-        account_rotation_count = 0
+        top_id = await self._resolve_top_message_id(target, errors)
+        if top_id is None:
+            error = errors[-1] if errors else "Нет активных аккаунтов"
+            return {"success": False, "target": target, "error": error, "errors": errors}
         
-        while messages_parsed < max_messages:
-            account = self.get_next_available_account()
-            
-            if not account:
-                logger.warning("Нет доступных аккаунтов, ожидание...")
-                await asyncio.sleep(self.scaling_config.retry_delay)
-                continue
-            
-            # Парсинг с текущим аккаунтом
-            try:
-                messages_batch = await self._parse_batch_with_account(
-                    account, target, 
-                    min(max_messages - messages_parsed, self.scaling_config.account_rotation_interval)
-                )
+        ranges = asyncio.Queue()
+        for id_range in self._split_id_range(max(1, top_id - max_messages + 1), top_id,
+                                             self.scaling_config.account_rotation_interval):
+            ranges.put_nowait(id_range)
+        
+        async def account_worker(account: AccountConfig):
+            while self.scheduler.has_quota(account):
+                try:
+                    min_id, max_id = ranges.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
                 
-                if messages_batch:
-                    all_messages.extend(messages_batch)
-                    messages_parsed += len(messages_batch)
+                try:
+                    count = await self._parse_range_with_account(account, target, min_id, max_id)
+                    counters["messages"] += count
+                    counters["ranges"] += 1
                     accounts_used.add(account.account_id)
-                    account_rotation_count += 1
-                    
-                    # Обновление статистики аккаунта
-                    account.daily_requests += len(messages_batch)
-                    account.last_request_time = datetime.now()
-                    
-                    logger.info(f"✅ Аккаунт {account.account_id}: {len(messages_batch)} сообщений")
-                
-                # Глобальный rate limiting
-                await asyncio.sleep(self.scaling_config.global_rate_limit)
-                
-            except Exception as e:
-                error_msg = f"Ошибка аккаунта {account.account_id}: {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-                
-                # Временная деактивация проблемного аккаунта
-                account.is_active = False
-                if account.account_id in self.active_accounts:
-                    self.active_accounts.remove(account.account_id)
+                except AccountFloodWait:
+                    # Диапазон вернется в очередь, аккаунт ждет окончания паузы
+                    ranges.put_nowait((min_id, max_id))
+                    return
+                except Exception as e:
+                    # Диапазон вернется в очередь, аккаунт на паузе (или отключен)
+                    errors.append(self._account_error(account, e))
+                    ranges.put_nowait((min_id, max_id))
+                    return
+        
+        for attempt in range(self.scaling_config.max_retries + 1):
+            if ranges.empty() or await self.scheduler.wait_for_account() is None:
+                break
+            # Аккаунт, только что сделавший запрос, тоже участвует: паузу
+            # rate_limit_delay он выждет перед своим запросом
+            accounts = self.scheduler.ready_accounts(self.scaling_config.max_concurrent_accounts)
+            await asyncio.gather(*(account_worker(account) for account in accounts))
+        
+        if not ranges.empty():
+            errors.append(f"Не обработано диапазонов: {ranges.qsize()}")
+        
+        # Дожидаемся анализа и записи в общее хранилище
+        await self.analysis.flush()
+        
+        messages_parsed = counters["messages"]
+        self.global_stats["total_messages_parsed"] += messages_parsed
+        self.global_stats["total_accounts_used"] = len(accounts_used)
+        self.global_stats["total_errors"] += len(errors)
         
         # Сохранение статистики
         self._save_session_stats(target, accounts_used, messages_parsed, errors)
@@ -273,38 +473,108 @@ class MultiAccountParser:
             "target": target,
             "messages_parsed": messages_parsed,
             "accounts_used": list(accounts_used),
-            "account_rotations": account_rotation_count,
+            "account_rotations": counters["ranges"],
             "errors": errors,
             "global_stats": self.global_stats
         }
     
-    async def _parse_batch_with_account(self, account: AccountConfig, target: str, limit: int) -> List[Dict]:
-        """Парсинг батча сообщений с конкретным аккаунтом"""
-        # Здесь будет логика парсинга с Pyrogram/Telethon
-        # Пока заглушка для демонстрации
-        await asyncio.sleep(account.rate_limit_delay)
-        
-        # Симуляция парсинга
-        messages = []
-        for i in range(min(limit, 50)):  # Максимум 50 сообщений за раз
-            messages.append({
-                "id": f"{account.account_id}_{i}",
-                "text": f"Сообщение {i} от аккаунта {account.account_id}",
-                "date": datetime.now().isoformat(),
-                "account_id": account.account_id
-            })
-        
-        return messages
+    async def _parse_range_with_account(self, account: AccountConfig, target: str,
+                                        min_id: int, max_id: int) -> int:
+        """Загрузка сообщений с min_id <= id <= max_id одним аккаунтом"""
+        client = await self.client_pool.get(account)
+        options = {
+            'sentiment': True,
+            'keywords': True,
+            'language': True
+        }
+        channel = target.lstrip('@')
+        count = 0
+        seen = 0
+        started = None
+        
+        try:
+            started = await self._begin_request(account)
+            
+            if account.engine == "telethon":
+                history = client.iter_messages(target, min_id=min_id - 1, max_id=max_id + 1)
+            else:
+                history = client.get_chat_history(target, offset_id=max_id + 1, limit=max_id - min_id + 1)
+            
+            fetch_started = time.perf_counter()
+            async for message in history:
+                STAGE_SECONDS.observe(time.perf_counter() - fetch_started, stage="fetch")
+                if message.id < min_id:
+                    break
+                
+                MESSAGES.inc(channel=channel, stage="fetched")
+                seen += 1
+                if seen % HISTORY_PAGE_SIZE == 0:
+                    self._end_request(account, "get_history", started)
+                    started = await self._begin_request(account)
+                
+                parsed_msg = self._to_parsed_message(account, message, target)
+                if parsed_msg:
+                    await self.analysis.put(parsed_msg, options)
+                    count += 1
+                else:
+                    MESSAGES.inc(channel=channel, stage="filtered")
+                fetch_started = time.perf_counter()
+            
+            self._end_request(account, "get_history", started)
+        
+        except (FloodWait, FloodWaitError) as e:
+            self._end_request(account, "get_history", started, e)
+            self._flood_wait(account, e)
+            raise AccountFloodWait(str(e))
+        except Exception as e:
+            if started is not None:
+                self._end_request(account, "get_history", started, e)
+            raise
+        finally:
+            await self.account_state.persist([account])
+        
+        logger.info(f"✅ Аккаунт {account.account_id}: {count} сообщений (id {min_id}-{max_id})")
+        return count
+    
+    def _to_parsed_message(self, account: AccountConfig, message, target: str) -> Optional[ParsedMessage]:
+        """Преобразование сообщения Pyrogram/Telethon в ParsedMessage"""
+        if not message.text:
+            return None
+        
+        if account.engine == "telethon":
+            chat = message.chat
+            channel_id = getattr(message.peer_id, 'channel_id', None) or message.chat_id
+            user_id = message.sender_id or 0
+            username = getattr(message.sender, 'username', None) if message.sender else None
+            media_type = type(message.media).__name__ if message.media else None
+        else:
+            chat = message.chat
+            channel_id = chat.id
+            user_id = message.from_user.id if message.from_user else 0
+            username = message.from_user.username if message.from_user else None
+            media_type = message.media.value if message.media else None
+        
+        user_data = self.anonymizer.anonymize(user_id, username)
+        
+        return ParsedMessage(
+            id=message.id,
+            text=message.text,
+            date=message.date,
+            author=user_data['username'],
+            author_id=user_data['id_hash'],
+            channel_id=channel_id,
+            channel_name=getattr(chat, 'username', None) or getattr(chat, 'title', None) or target.lstrip('@'),
+            message_type="text",
+            media_type=media_type,
+            views=getattr(message, 'views', None)
+        )
     
     def _save_session_stats(self, target: str, accounts_used: set, messages_parsed: int, errors: List[str]):
         """Сохранение статистики сессии"""
-        conn = sqlite3.connect("multi_account_parser.db")
-        cursor = conn.cursor()
-        
         try:
             session_id = f"session_{int(time.time())}"
             
-            cursor.execute('''
+            self.storage.execute('''
                 INSERT INTO parsing_sessions 
                 (session_id, account_id, target_channel, messages_parsed, start_time, end_time, status, error_message)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -319,11 +589,9 @@ class MultiAccountParser:
                 "; ".join(errors) if errors else None
             ))
             
-            conn.commit()
+            self.storage.connection().commit()
         except Exception as e:
             logger.error(f"Ошибка сохранения статистики: {e}")
-        finally:
-            conn.close()
     
     def get_accounts_status(self) -> Dict:
         """Получение статуса всех аккаунтов"""
@@ -339,16 +607,25 @@ class MultiAccountParser:
                 "daily_requests": account.daily_requests,
                 "max_daily_requests": account.max_daily_requests,
                 "last_request_time": account.last_request_time.isoformat() if account.last_request_time else None,
-                "usage_percentage": (account.daily_requests / account.max_daily_requests) * 100
+                "usage_percentage": (account.daily_requests / account.max_daily_requests) * 100,
+                "requests_last_hour": self.account_state.requests_in_window(account_id),
+                "flood_wait_until": account.flood_wait_until.isoformat() if account.flood_wait_until else None
             }
         
         return status
     
+    async def close(self):
+        """Дозапись очередей и остановка клиентов"""
+        await self.analysis.stop()
+        await self.writer.stop()
+        await self.client_pool.close_all()
+    
     def reset_daily_limits(self):
-        """Сброс дневных лимитов (вызывать раз в день)"""
+        """Принудительный сброс дневных лимитов (в новый день выполняется автоматически)"""
         for account in self.accounts.values():
             account.daily_requests = 0
             account.last_request_time = None
+        self.account_state.save(self.accounts.values())
         
         logger.info("Дневные лимиты сброшены")
 
@@ -360,9 +637,12 @@ async def main():
     status = parser.get_accounts_status()
     print("Статус аккаунтов:", json.dumps(status, indent=2, ensure_ascii=False))
     
-    # Парсинг с ротацией аккаунтов
-    result = await parser.parse_with_account_rotation("@test_channel", 1000)
-    print("Результат парсинга:", json.dumps(result, indent=2, ensure_ascii=False))
+    # Параллельный парсинг несколькими аккаунтами
+    try:
+        result = await parser.parse_with_account_rotation("@test_channel", 1000)
+        print("Результат парсинга:", json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    finally:
+        await parser.close()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+🕉️ Rate Limiter - Общий планировщик запросов к Telegram
+
+Token bucket на все запросы процесса плюс паузы FloodWait,
+которые останавливают только затронутый клиент.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from metrics import FLOOD_WAIT_SECONDS, FLOOD_WAITS
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Классический token bucket: rate токенов в секунду, не более capacity"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Получение одного токена (ждет пополнения при необходимости)"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    Глобальный ограничитель запросов
+
+    Все клиенты делят один token bucket, а FloodWait ставит на паузу
+    только клиента, получившего ошибку.
+    """
+
+    def __init__(self, requests_per_second: float = 1.0, burst: int = 5):
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.paused_until: Dict[str, float] = {}
+        self.stats = {
+            'requests': 0,
+            'flood_waits': 0,
+            'flood_wait_seconds': 0.0
+        }
+
+    def cooldown(self, client_key: str, seconds: float):
+        """Пауза клиента без учета как FloodWait (например, после сетевой ошибки)"""
+        deadline = time.monotonic() + seconds
+        self.paused_until[client_key] = max(self.paused_until.get(client_key, 0.0), deadline)
+        logger.warning(f"⏸️ {client_key}: пауза {seconds:.0f} с после ошибки")
+
+    def pause(self, client_key: str, seconds: float, restored: bool = False):
+        """Пауза клиента после FloodWait (restored - пауза, восстановленная после перезапуска)"""
+        deadline = time.monotonic() + seconds
+        self.paused_until[client_key] = max(self.paused_until.get(client_key, 0.0), deadline)
+        if restored:
+            logger.info(f"⏸️ {client_key}: FloodWait еще {seconds:.0f} с (восстановлено)")
+            return
+        self.stats['flood_waits'] += 1
+        self.stats['flood_wait_seconds'] += seconds
+        FLOOD_WAITS.inc(account=client_key)
+        FLOOD_WAIT_SECONDS.inc(seconds, account=client_key)
+        logger.warning(f"⏸️ FloodWait для {client_key}: пауза {seconds:.0f} с")
+
+    def is_paused(self, client_key: str) -> bool:
+        return self.paused_until.get(client_key, 0.0) > time.monotonic()
+
+    async def acquire(self, client_key: str):
+        """Разрешение на один запрос от имени клиента"""
+        while True:
+            delay = self.paused_until.get(client_key, 0.0) - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        await self.bucket.acquire()
+        self.stats['requests'] += 1
@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+"""
+🕉️ Schema - Схема базы сообщений и ее миграции
+
+Общая для TelegramParserMVP и MultiAccountParser, чтобы оба писали
+в одну и ту же таблицу messages. Здесь же схема отдельной базы аккаунтов
+MultiAccountParser со своим списком миграций.
+"""
+
+import logging
+import sqlite3
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Миграции схемы: (версия, список SQL). Текущая версия хранится в PRAGMA user_version
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # Дедупликация за один проход: оставляем самую свежую копию сообщения
+        '''
+            DELETE FROM messages
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM messages GROUP BY channel_id, message_id
+            )
+        ''',
+        '''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_channel_message
+            ON messages (channel_id, message_id)
+        ''',
+    ]),
+    (2, [
+        # Индексы для фильтров и агрегатов
+        "CREATE INDEX IF NOT EXISTS idx_messages_channel_name ON messages (channel_name)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_sentiment ON messages (sentiment)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_language ON messages (language)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_date ON messages (date)",
+        # Материализованная статистика: счетчики по измерениям total/channel/sentiment/language
+        '''
+            CREATE TABLE IF NOT EXISTS message_stats (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, value)
+            ) WITHOUT ROWID
+        ''',
+        "DELETE FROM message_stats",
+        "INSERT INTO message_stats SELECT 'total', '', COUNT(*) FROM messages",
+        '''
+            INSERT INTO message_stats
+            SELECT 'channel', channel_name, COUNT(*) FROM messages
+            WHERE channel_name IS NOT NULL GROUP BY channel_name
+        ''',
+        '''
+            INSERT INTO message_stats
+            SELECT 'sentiment', sentiment, COUNT(*) FROM messages
+            WHERE sentiment IS NOT NULL GROUP BY sentiment
+        ''',
+        '''
+            INSERT INTO message_stats
+            SELECT 'language', language, COUNT(*) FROM messages
+            WHERE language IS NOT NULL GROUP BY language
+        ''',
+        # Триггеры поддерживают счетчики при каждой записи писателя
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_message_stats_insert AFTER INSERT ON messages
+            BEGIN
+                INSERT INTO message_stats (dimension, value, count) VALUES ('total', '', 1)
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+                INSERT INTO message_stats (dimension, value, count)
+                    SELECT 'channel', NEW.channel_name, 1 WHERE NEW.channel_name IS NOT NULL
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+                INSERT INTO message_stats (dimension, value, count)
+                    SELECT 'sentiment', NEW.sentiment, 1 WHERE NEW.sentiment IS NOT NULL
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+                INSERT INTO message_stats (dimension, value, count)
+                    SELECT 'language', NEW.language, 1 WHERE NEW.language IS NOT NULL
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_message_stats_delete AFTER DELETE ON messages
+            BEGIN
+                UPDATE message_stats SET count = count - 1 WHERE dimension = 'total';
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'channel' AND value = OLD.channel_name;
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'sentiment' AND value = OLD.sentiment;
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'language' AND value = OLD.language;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_message_stats_update
+            AFTER UPDATE OF channel_name, sentiment, language ON messages
+            BEGIN
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'channel' AND value = OLD.channel_name
+                    AND OLD.channel_name IS NOT NEW.channel_name;
+                INSERT INTO message_stats (dimension, value, count)
+                    SELECT 'channel', NEW.channel_name, 1
+                    WHERE NEW.channel_name IS NOT NULL AND OLD.channel_name IS NOT NEW.channel_name
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'sentiment' AND value = OLD.sentiment
+                    AND OLD.sentiment IS NOT NEW.sentiment;
+                INSERT INTO message_stats (dimension, value, count)
+                    SELECT 'sentiment', NEW.sentiment, 1
+                    WHERE NEW.sentiment IS NOT NULL AND OLD.sentiment IS NOT NEW.sentiment
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'language' AND value = OLD.language
+                    AND OLD.language IS NOT NEW.language;
+                INSERT INTO message_stats (dimension, value, count)
+                    SELECT 'language', NEW.language, 1
+                    WHERE NEW.language IS NOT NULL AND OLD.language IS NOT NEW.language
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+            END
+        ''',
+    ]),
+    (3, [
+        # Полнотекстовый индекс поверх messages (external content, без дублирования текста)
+        '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                text,
+                content='messages',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''',
+        "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_fts_insert AFTER INSERT ON messages
+            BEGIN
+                INSERT INTO messages_fts (rowid, text) VALUES (NEW.id, NEW.text);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_fts_delete AFTER DELETE ON messages
+            BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_fts_update AFTER UPDATE OF text ON messages
+            BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+                INSERT INTO messages_fts (rowid, text) VALUES (NEW.id, NEW.text);
+            END
+        ''',
+    ]),
+    (4, [
+        # Кэш метаданных каналов: access_hash и время последнего разрешения через API
+        "ALTER TABLE channels ADD COLUMN access_hash INTEGER",
+        "ALTER TABLE channels ADD COLUMN updated_at TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS idx_channels_name ON channels (channel_name COLLATE NOCASE)",
+    ]),
+    (5, [
+        # Аналитика по временным корзинам: объем и тональность по часам,
+        # ключевые слова по дням. Поддерживаются триггерами при записи,
+        # так что графики не сканируют messages
+        '''
+            CREATE TABLE IF NOT EXISTS analytics_hourly (
+                channel_name TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                messages INTEGER NOT NULL DEFAULT 0,
+                positive INTEGER NOT NULL DEFAULT 0,
+                negative INTEGER NOT NULL DEFAULT 0,
+                neutral INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (channel_name, bucket)
+            ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_analytics_hourly_bucket ON analytics_hourly (bucket)",
+        '''
+            CREATE TABLE IF NOT EXISTS analytics_keywords_daily (
+                channel_name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (channel_name, day, keyword)
+            ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_analytics_keywords_day ON analytics_keywords_daily (day, keyword)",
+        "DELETE FROM analytics_hourly",
+        '''
+            INSERT INTO analytics_hourly (channel_name, bucket, messages, positive, negative, neutral)
+            SELECT channel_name, strftime('%Y-%m-%d %H:00', date), COUNT(*),
+                   SUM(sentiment IS 'positive'), SUM(sentiment IS 'negative'), SUM(sentiment IS 'neutral')
+            FROM messages
+            WHERE channel_name IS NOT NULL AND strftime('%Y-%m-%d %H:00', date) IS NOT NULL
+            GROUP BY 1, 2
+        ''',
+        "DELETE FROM analytics_keywords_daily",
+        '''
+            INSERT INTO analytics_keywords_daily (channel_name, day, keyword, count)
+            SELECT m.channel_name, date(m.date), k.value, COUNT(*)
+            FROM messages m, json_each(CASE WHEN json_valid(m.keywords) THEN m.keywords ELSE '[]' END) k
+            WHERE m.channel_name IS NOT NULL AND date(m.date) IS NOT NULL AND k.type = 'text'
+            GROUP BY 1, 2, 3
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_analytics_insert AFTER INSERT ON messages
+            WHEN NEW.channel_name IS NOT NULL AND date(NEW.date) IS NOT NULL
+            BEGIN
+                INSERT INTO analytics_hourly (channel_name, bucket, messages, positive, negative, neutral)
+                    VALUES (NEW.channel_name, strftime('%Y-%m-%d %H:00', NEW.date), 1,
+                            NEW.sentiment IS 'positive', NEW.sentiment IS 'negative', NEW.sentiment IS 'neutral')
+                    ON CONFLICT DO UPDATE SET
+                        messages = messages + 1,
+                        positive = positive + (NEW.sentiment IS 'positive'),
+                        negative = negative + (NEW.sentiment IS 'negative'),
+                        neutral = neutral + (NEW.sentiment IS 'neutral');
+                INSERT INTO analytics_keywords_daily (channel_name, day, keyword, count)
+                    SELECT NEW.channel_name, date(NEW.date), value, 1
+                    FROM json_each(CASE WHEN json_valid(NEW.keywords) THEN NEW.keywords ELSE '[]' END)
+                    WHERE type = 'text'
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_analytics_delete AFTER DELETE ON messages
+            WHEN OLD.channel_name IS NOT NULL AND date(OLD.date) IS NOT NULL
+            BEGIN
+                UPDATE analytics_hourly SET
+                    messages = messages - 1,
+                    positive = positive - (OLD.sentiment IS 'positive'),
+                    negative = negative - (OLD.sentiment IS 'negative'),
+                    neutral = neutral - (OLD.sentiment IS 'neutral')
+                WHERE channel_name = OLD.channel_name AND bucket = strftime('%Y-%m-%d %H:00', OLD.date);
+                UPDATE analytics_keywords_daily SET count = count - 1
+                WHERE channel_name = OLD.channel_name AND day = date(OLD.date)
+                    AND keyword IN (
+                        SELECT value FROM json_each(CASE WHEN json_valid(OLD.keywords) THEN OLD.keywords ELSE '[]' END)
+                        WHERE type = 'text'
+                    );
+            END
+        ''',
+        # Повторный парсинг обновляет анализ: переносим вклад строки,
+        # только если изменились участвующие в агрегатах поля
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_analytics_update
+            AFTER UPDATE OF channel_name, date, sentiment, keywords ON messages
+            WHEN OLD.channel_name IS NOT NEW.channel_name OR OLD.date IS NOT NEW.date
+                OR OLD.sentiment IS NOT NEW.sentiment OR OLD.keywords IS NOT NEW.keywords
+            BEGIN
+                UPDATE analytics_hourly SET
+                    messages = messages - 1,
+                    positive = positive - (OLD.sentiment IS 'positive'),
+                    negative = negative - (OLD.sentiment IS 'negative'),
+                    neutral = neutral - (OLD.sentiment IS 'neutral')
+                WHERE channel_name = OLD.channel_name AND bucket = strftime('%Y-%m-%d %H:00', OLD.date);
+                UPDATE analytics_keywords_daily SET count = count - 1
+                WHERE channel_name = OLD.channel_name AND day = date(OLD.date)
+                    AND keyword IN (
+                        SELECT value FROM json_each(CASE WHEN json_valid(OLD.keywords) THEN OLD.keywords ELSE '[]' END)
+                        WHERE type = 'text'
+                    );
+                INSERT INTO analytics_hourly (channel_name, bucket, messages, positive, negative, neutral)
+                    SELECT NEW.channel_name, strftime('%Y-%m-%d %H:00', NEW.date), 1,
+                           NEW.sentiment IS 'positive', NEW.sentiment IS 'negative', NEW.sentiment IS 'neutral'
+                    WHERE NEW.channel_name IS NOT NULL AND date(NEW.date) IS NOT NULL
+                    ON CONFLICT DO UPDATE SET
+                        messages = messages + 1,
+                        positive = positive + (NEW.sentiment IS 'positive'),
+                        negative = negative + (NEW.sentiment IS 'negative'),
+                        neutral = neutral + (NEW.sentiment IS 'neutral');
+                INSERT INTO analytics_keywords_daily (channel_name, day, keyword, count)
+                    SELECT NEW.channel_name, date(NEW.date), value, 1
+                    FROM json_each(CASE WHEN json_valid(NEW.keywords) THEN NEW.keywords ELSE '[]' END)
+                    WHERE type = 'text' AND NEW.channel_name IS NOT NULL AND date(NEW.date) IS NOT NULL
+                    ON CONFLICT DO UPDATE SET count = count + 1;
+            END
+        ''',
+    ]),
+    (6, [
+        # Медиа с адресацией по содержимому и связь с сообщениями
+        '''
+            CREATE TABLE IF NOT EXISTS media (
+                id INTEGER PRIMARY KEY,
+                sha256 TEXT NOT NULL UNIQUE,
+                file_unique_id TEXT,
+                path TEXT NOT NULL,
+                size INTEGER,
+                mime_type TEXT,
+                media_type TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_media_file_unique_id ON media (file_unique_id)",
+        '''
+            CREATE TABLE IF NOT EXISTS message_media (
+                channel_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                media_id INTEGER NOT NULL REFERENCES media (id),
+                PRIMARY KEY (channel_id, message_id, media_id)
+            ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_message_media_media ON message_media (media_id)",
+    ]),
+    (7, [
+        # Кластеры почти-дубликатов (MinHash-LSH): сигнатура канонической копии,
+        # ее анализ для переиспользования и полосы LSH-индекса
+        "ALTER TABLE messages ADD COLUMN cluster_id INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_messages_cluster ON messages (cluster_id)",
+        '''
+            CREATE TABLE IF NOT EXISTS dedup_clusters (
+                cluster_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL,
+                size INTEGER NOT NULL DEFAULT 1,
+                channel_id INTEGER,
+                message_id INTEGER,
+                sentiment TEXT,
+                keywords TEXT,
+                language TEXT,
+                analysis_key TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                cluster_id INTEGER NOT NULL,
+                PRIMARY KEY (band, bucket)
+            ) WITHOUT ROWID
+        ''',
+    ]),
+    (8, [
+        # Архив старых сообщений в Parquet (archive.py): список файлов и флаг
+        # архивации, при котором триггеры удаления не уменьшают агрегаты
+        '''
+            CREATE TABLE IF NOT EXISTS archive_files (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                day TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                min_date TEXT,
+                max_date TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_archive_files_dates ON archive_files (max_date, min_date)",
+        '''
+            CREATE TABLE IF NOT EXISTS archive_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                archiving BOOLEAN NOT NULL DEFAULT 0
+            )
+        ''',
+        "INSERT OR IGNORE INTO archive_state (id, archiving) VALUES (1, 0)",
+        "DROP TRIGGER IF EXISTS trg_message_stats_delete",
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_message_stats_delete AFTER DELETE ON messages
+            WHEN NOT (SELECT archiving FROM archive_state)
+            BEGIN
+                UPDATE message_stats SET count = count - 1 WHERE dimension = 'total';
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'channel' AND value = OLD.channel_name;
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'sentiment' AND value = OLD.sentiment;
+                UPDATE message_stats SET count = count - 1
+                    WHERE dimension = 'language' AND value = OLD.language;
+            END
+        ''',
+        "DROP TRIGGER IF EXISTS trg_analytics_delete",
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_analytics_delete AFTER DELETE ON messages
+            WHEN OLD.channel_name IS NOT NULL AND date(OLD.date) IS NOT NULL
+                AND NOT (SELECT archiving FROM archive_state)
+            BEGIN
+                UPDATE analytics_hourly SET
+                    messages = messages - 1,
+                    positive = positive - (OLD.sentiment IS 'positive'),
+                    negative = negative - (OLD.sentiment IS 'negative'),
+                    neutral = neutral - (OLD.sentiment IS 'neutral')
+                WHERE channel_name = OLD.channel_name AND bucket = strftime('%Y-%m-%d %H:00', OLD.date);
+                UPDATE analytics_keywords_daily SET count = count - 1
+                WHERE channel_name = OLD.channel_name AND day = date(OLD.date)
+                    AND keyword IN (
+                        SELECT value FROM json_each(CASE WHEN json_valid(OLD.keywords) THEN OLD.keywords ELSE '[]' END)
+                        WHERE type = 'text'
+                    );
+            END
+        ''',
+    ]),
+    (9, [
+        # Кэш результатов анализа по хэшу текста, опций и версии анализаторов
+        '''
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                text_hash BLOB PRIMARY KEY,
+                sentiment TEXT,
+                keywords TEXT,
+                language TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+        ''',
+    ]),
+    (10, [
+        # Корпус для IDF ключевых слов: документная частота термов
+        '''
+            CREATE TABLE IF NOT EXISTS corpus_terms (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS corpus_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                documents INTEGER NOT NULL DEFAULT 0
+            )
+        ''',
+        "INSERT OR IGNORE INTO corpus_stats (id, documents) VALUES (1, 0)",
+    ]),
+    (11, [
+        # Ключи архивированных сообщений: их строки удалены из messages, и без
+        # этой таблицы повторный парсинг канала вставил бы их туда заново
+        '''
+            CREATE TABLE IF NOT EXISTS archived_messages (
+                channel_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                PRIMARY KEY (channel_id, message_id)
+            ) WITHOUT ROWID
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_skip_archived BEFORE INSERT ON messages
+            WHEN EXISTS (
+                SELECT 1 FROM archived_messages
+                WHERE channel_id = NEW.channel_id AND message_id = NEW.message_id
+            )
+            BEGIN
+                SELECT RAISE(IGNORE);
+            END
+        ''',
+    ]),
+]
+
+# Миграции базы аккаунтов MultiAccountParser (отдельный файл, своя PRAGMA user_version)
+ACCOUNT_MIGRATIONS = [
+    (1, [
+        # Постоянное состояние аккаунтов (account_state.py): дата, к которой
+        # относится дневной счетчик, и дедлайн FloodWait
+        "ALTER TABLE accounts ADD COLUMN usage_date TEXT",
+        "ALTER TABLE accounts ADD COLUMN flood_wait_until TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS idx_rate_limits_account_time ON rate_limits (account_id, timestamp)",
+    ]),
+]
+
+
+def init_schema(conn: sqlite3.Connection):
+    """Создание таблиц и применение миграций"""
+    cursor = conn.cursor()
+
+    # Таблица сообщений
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY,
+            message_id INTEGER,
+            text TEXT,
+            date TIMESTAMP,
+            author TEXT,
+            author_id_hash TEXT,
+            channel_id INTEGER,
+            channel_name TEXT,
+            message_type TEXT,
+            media_type TEXT,
+            media_url TEXT,
+            reply_to INTEGER,
+            views INTEGER,
+            forwards INTEGER,
+            sentiment TEXT,
+            keywords TEXT,
+            language TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Таблица каналов
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS channels (
+            id INTEGER PRIMARY KEY,
+            channel_id INTEGER UNIQUE,
+            channel_name TEXT,
+            title TEXT,
+            description TEXT,
+            members_count INTEGER,
+            type TEXT,
+            is_verified BOOLEAN,
+            is_scam BOOLEAN,
+            is_fake BOOLEAN,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Таблица статистики
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS parsing_stats (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT,
+            channel_name TEXT,
+            messages_parsed INTEGER,
+            errors_count INTEGER,
+            start_time TIMESTAMP,
+            end_time TIMESTAMP,
+            config TEXT
+        )
+    ''')
+
+    # Таблица checkpoint'ов для инкрементального парсинга
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS parse_checkpoints (
+            channel_id INTEGER PRIMARY KEY,
+            channel_name TEXT,
+            last_message_id INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.commit()
+
+    migrate(conn)
+
+
+def init_account_schema(conn: sqlite3.Connection):
+    """Создание таблиц базы аккаунтов MultiAccountParser и применение ее миграций"""
+    cursor = conn.cursor()
+
+    # Таблица аккаунтов
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS accounts (
+            account_id TEXT PRIMARY KEY,
+            api_id TEXT,
+            phone_number TEXT,
+            daily_requests INTEGER DEFAULT 0,
+            last_request_time TIMESTAMP,
+            total_requests INTEGER DEFAULT 0,
+            errors_count INTEGER DEFAULT 0,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Таблица статистики парсинга
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS parsing_sessions (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT,
+            account_id TEXT,
+            target_channel TEXT,
+            messages_parsed INTEGER,
+            start_time TIMESTAMP,
+            end_time TIMESTAMP,
+            status TEXT,
+            error_message TEXT,
+            FOREIGN KEY (account_id) REFERENCES accounts (account_id)
+        )
+    ''')
+
+    # Таблица лимитов и мониторинга
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            id INTEGER PRIMARY KEY,
+            account_id TEXT,
+            request_type TEXT,
+            timestamp TIMESTAMP,
+            response_time FLOAT,
+            success BOOLEAN,
+            error_type TEXT,
+            FOREIGN KEY (account_id) REFERENCES accounts (account_id)
+        )
+    ''')
+
+    conn.commit()
+
+    migrate(conn, ACCOUNT_MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection, migrations: Optional[List[Tuple[int, List[str]]]] = None):
+    """
+    Применение миграций схемы, которые еще не были выполнены
+
+    migrations - список (версия, SQL) базы, по умолчанию SCHEMA_MIGRATIONS
+    базы сообщений.
+
+    Каждая версия - одна явная транзакция вместе с PRAGMA user_version:
+    модуль sqlite3 не открывает транзакцию перед DDL, и без BEGIN
+    упавшая на середине версия оставила бы, например, часть ALTER TABLE
+    при старой версии схемы, а повторный запуск падал бы на них.
+    """
+    if migrations is None:
+        migrations = SCHEMA_MIGRATIONS
+    current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    isolation_level = conn.isolation_level
+    conn.commit()
+    conn.isolation_level = None  # BEGIN/COMMIT только явные
+    try:
+        for version, statements in migrations:
+            if version <= current_version:
+                continue
+
+            conn.execute("BEGIN")
+            try:
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+                logger.info(f"Применена миграция схемы v{version}")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                logger.error(f"Ошибка миграции схемы v{version}: {e}")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+🕉️ Storage - Общий слой хранения SQLite
+
+Одно постоянное соединение на поток с WAL и настроенными pragma,
+кэш подготовленных выражений и выделенный поток для записи из asyncio.
+Используется TelegramParserMVP и MultiAccountParser.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Настройки соединения: WAL позволяет читать во время записи,
+# synchronous=NORMAL в WAL безопасен и заметно быстрее FULL
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # мс ожидания вместо "database is locked"
+    "temp_store": "MEMORY",
+    "cache_size": -65536,  # 64 МБ
+    "mmap_size": 268435456,  # 256 МБ
+}
+
+# Сколько подготовленных выражений держать на соединение
+CACHED_STATEMENTS = 256
+
+
+class Storage:
+    """
+    Управляемые соединения с одной базой SQLite
+
+    connection() возвращает постоянное соединение текущего потока,
+    run() выполняет функцию в выделенном потоке БД - через него идут
+    все записи из асинхронного кода, поэтому писатель всегда один.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def open_connection(self) -> sqlite3.Connection:
+        """Новое соединение с настроенными pragma"""
+        # check_same_thread=False нужен только для закрытия из close()
+        # и для генераторов, которые продолжаются в другом потоке
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS
+        )
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Постоянное соединение текущего потока"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.open_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Транзакция на соединении текущего потока"""
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def fetchone(self, sql: str, params: Tuple = ()) -> Optional[Tuple]:
+        return self.connection().execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return self.connection().execute(sql, params).fetchall()
+
+    async def run(self, func, *args) -> Any:
+        """Выполнение функции в выделенном потоке БД"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-db")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def run_write(self, sql: str, params: Tuple = ()):
+        """Запись одним выражением в потоке БД"""
+        def write():
+            with self.transaction() as conn:
+                conn.execute(sql, params)
+        await self.run(write)
+
+    def close(self):
+        """Остановка потока БД и закрытие всех соединений"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.warning(f"Ошибка закрытия соединения: {e}")
+            self._connections = []
+        self._local = threading.local()
+
+
+_storages: Dict[str, Storage] = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage(db_path: str) -> Storage:
+    """Общий экземпляр Storage на файл базы"""
+    with _storages_lock:
+        if db_path not in _storages:
+            _storages[db_path] = Storage(db_path)
+        return _storages[db_path]
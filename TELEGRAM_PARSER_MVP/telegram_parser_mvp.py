@@ -13,11 +13,13 @@ import logging
 import os
 import re
 import sqlite3
+import sys
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple, Union, Any
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
-import hashlib
 import aiohttp
 from urllib.parse import urlparse
 
@@ -25,6 +27,7 @@ from urllib.parse import urlparse
 try:
     from pyrogram import Client, filters
     from pyrogram.types import Message, Chat, User
+    from pyrogram.handlers import MessageHandler
     from pyrogram.errors import FloodWait, UserDeactivated, UserDeactivatedBan
     PYROGRAM_AVAILABLE = True
 except ImportError:
@@ -32,7 +35,7 @@ except ImportError:
 
 try:
     from telethon import TelegramClient, events
-    from telethon.tl.types import Channel, Chat as TelethonChat, User as TelethonUser
+    from telethon.tl.types import Channel, Chat as TelethonChat, User as TelethonUser, InputPeerChannel
     from telethon.errors import FloodWaitError, UserDeactivatedError
     TELETHON_AVAILABLE = True
 except ImportError:
@@ -49,14 +52,31 @@ except ImportError:
 
 # Веб-фреймворк
 try:
-    from fastapi import FastAPI, HTTPException, BackgroundTasks
-    from fastapi.responses import HTMLResponse, JSONResponse
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
     from fastapi.staticfiles import StaticFiles
     from pydantic import BaseModel
     WEB_AVAILABLE = True
 except ImportError:
     WEB_AVAILABLE = False
 
+from storage import get_storage
+from schema import init_schema
+from models import ParsedMessage
+from message_writer import MessageWriter, WriterConfig
+from analysis_pipeline import AnalysisPipeline, AnalysisConfig
+import text_analysis
+from rate_limiter import RateLimiter
+from keyword_matcher import compile_keywords, normalize_text
+from job_manager import JobManager, ParseProgress
+from exporter import ExportFilters, EXPORT_FORMATS, CONTENT_TYPES, check_export, iter_export, export_to_file
+from channel_cache import ChannelCache, ChannelInfo
+from analytics import Analytics, INTERVALS
+from anonymizer import get_anonymizer
+from archive import ArchiveConfig, archive_messages, archive_summary, search_archive
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MESSAGES, QUEUE_DEPTH, REGISTRY, STAGE_SECONDS
+from media_pipeline import MediaConfig, MediaDownloader, MediaItem, pyrogram_media_item, telethon_media_item
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -68,25 +88,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class ParsedMessage:
-    """Структура распарсенного сообщения"""
-    id: int
-    text: str
-    date: datetime
-    author: str
-    author_id: int
-    channel_id: int
-    channel_name: str
-    message_type: str
-    media_type: Optional[str] = None
-    media_url: Optional[str] = None
-    reply_to: Optional[int] = None
-    views: Optional[int] = None
-    forwards: Optional[int] = None
-    sentiment: Optional[str] = None
-    keywords: Optional[List[str]] = None
-    language: Optional[str] = None
+# Размер страницы истории у Pyrogram/Telethon: один API-запрос на 100 сообщений
+HISTORY_PAGE_SIZE = 100
+
+# Термы запроса поиска: фразы в кавычках или отдельные слова (с * для префикса)
+SEARCH_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
 
 @dataclass
 class ParseConfig:
@@ -100,7 +107,20 @@ class ParseConfig:
     analyze_sentiment: bool = True
     extract_keywords: bool = True
     min_message_length: int = 10
-    rate_limit_delay: float = 1.0
+    rate_limit_delay: float = 1.0  # Не используется: запросы ограничивает общий RateLimiter
+    incremental: bool = False  # Все сообщения новее сохраненного checkpoint (без days_back)
+    match_whole_words: bool = False  # Ключевые слова только целыми словами
+
+@dataclass
+class LiveChannel:
+    """Состояние канала в режиме listen()"""
+    info: Any  # ChannelInfo
+    peer: Any  # id (Pyrogram) или сущность/InputPeer (Telethon)
+    last_seen: Optional[int] = None  # последний полученный message_id
+    saved_id: Optional[int] = None  # последний сохраненный checkpoint
+    # Пропуски (после, до) - сообщения с id строго между границами; до=None - все новее
+    gaps: List[Tuple[int, Optional[int]]] = field(default_factory=list)
+    active_at: float = 0.0  # время цикла событий последнего сообщения или проверки
 
 class TelegramParserMVP:
     """
@@ -114,21 +134,76 @@ class TelegramParserMVP:
         """Инициализация парсера"""
         self.config = self._load_config(config_file)
         self.db_path = "telegram_data.db"
+        self.storage = get_storage(self.db_path)
+        self.writer = MessageWriter(self.db_path, WriterConfig(
+            batch_size=self.config['database'].get('batch_size', 500),
+            flush_interval=self.config['database'].get('flush_interval', 2.0),
+            queue_size=self.config['database'].get('queue_size', 5000)
+        ))
+        self.analysis = AnalysisPipeline(self.writer, AnalysisConfig(
+            batch_size=self.config['ai'].get('batch_size', 64),
+            queue_size=self.config['ai'].get('queue_size', 2000),
+            workers=self.config['ai'].get('workers', 0),
+            cache_size=self.config['ai'].get('cache_size', 10000)
+        ))
+        # Один token bucket на все каналы: параллельные задачи JobManager делят его
+        self.rate_limiter = RateLimiter(
+            requests_per_second=self.config['parsing'].get('requests_per_second', 1.0),
+            burst=self.config['parsing'].get('burst', 5)
+        )
+        self.channel_cache = ChannelCache(
+            self.storage,
+            ttl=self.config['parsing'].get('channel_cache_ttl', 3600),
+            max_size=self.config['parsing'].get('channel_cache_size', 1024)
+        )
+        self.analytics = Analytics(self.storage)
+        media_config = self.config.get('media', {})
+        self.media = MediaDownloader(self.storage, MediaConfig(
+            enabled=media_config.get('enabled', False),
+            directory=media_config.get('directory', 'media'),
+            max_file_size=int(media_config.get('max_file_size_mb', 20) * 1024 * 1024),
+            concurrency=media_config.get('concurrency', 4),
+            types=tuple(media_config.get('types', ('photo', 'video')))
+        ))
+        archive_config = self.config.get('archive', {})
+        self.archive_config = ArchiveConfig(
+            directory=archive_config.get('directory', 'archive'),
+            older_than_days=archive_config.get('older_than_days', 180),
+            compression=archive_config.get('compression', 'zstd')
+        )
+        self.anonymizer = get_anonymizer(
+            self.config['privacy'].get('hash_secret'),
+            self.config['privacy'].get('hash_secret_file', 'hash_secret.key')
+        )
         self.pyrogram_client = None
         self.telethon_client = None
         self.current_engine = None
+        self._init_lock = asyncio.Lock()
+        self._listen_stop: Optional[asyncio.Event] = None
+        self._reconcile_event: Optional[asyncio.Event] = None
         self.stats = {
             'parsed_messages': 0,
             'errors': 0,
             'start_time': None,
             'channels_processed': 0
         }
+        self._register_queue_metrics()
         
         # Инициализация базы данных
         self._init_database()
         
         logger.info("🕉️ Telegram Parser MVP инициализирован")
     
+    def _register_queue_metrics(self):
+        """Глубина очередей конвейера считается в момент запроса /metrics"""
+        queues = {
+            "analysis": self.analysis,
+            "writer": self.writer,
+            "media": self.media
+        }
+        for name, stage in queues.items():
+            QUEUE_DEPTH.set_function(lambda stage=stage: stage.queue.qsize() if stage.queue else 0, queue=name)
+    
     def _load_config(self, config_file: str) -> Dict:
         """Загрузка конфигурации"""
         default_config = {
@@ -139,22 +214,51 @@ class TelegramParserMVP:
                 "session_name": "parser_session"
             },
             "database": {
-                "path": "telegram_data.db"
+                "path": "telegram_data.db",
+                "batch_size": 500,
+                "flush_interval": 2.0,
+                "queue_size": 5000
             },
             "parsing": {
                 "rate_limit": 1.0,
                 "max_retries": 3,
-                "timeout": 30
+                "timeout": 30,
+                "requests_per_second": 1.0,
+                "burst": 5,
+                "max_concurrent_jobs": 2,
+                "reconcile_interval": 60,
+                "quiet_check_interval": 900,
+                "channel_cache_ttl": 3600,
+                "channel_cache_size": 1024
             },
             "ai": {
                 "sentiment_analysis": True,
                 "keyword_extraction": True,
-                "language_detection": True
+                "language_detection": True,
+                "language_detector": "ngram",
+                "batch_size": 64,
+                "queue_size": 2000,
+                "workers": 0,
+                "cache_size": 10000
             },
             "privacy": {
                 "anonymize_users": True,
                 "exclude_private_data": True,
-                "hash_user_ids": True
+                "hash_user_ids": True,
+                "hash_secret": None,  # или переменная окружения TELEGRAM_PARSER_HASH_SECRET
+                "hash_secret_file": "hash_secret.key"
+            },
+            "media": {
+                "enabled": False,
+                "directory": "media",
+                "max_file_size_mb": 20,
+                "concurrency": 4,
+                "types": ["photo", "video"]
+            },
+            "archive": {
+                "directory": "archive",
+                "older_than_days": 180,
+                "compression": "zstd"
             }
         }
         
@@ -175,66 +279,7 @@ class TelegramParserMVP:
     
     def _init_database(self):
         """Инициализация базы данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Таблица сообщений
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY,
-                message_id INTEGER,
-                text TEXT,
-                date TIMESTAMP,
-                author TEXT,
-                author_id_hash TEXT,
-                channel_id INTEGER,
-                channel_name TEXT,
-                message_type TEXT,
-                media_type TEXT,
-                media_url TEXT,
-                reply_to INTEGER,
-                views INTEGER,
-                forwards INTEGER,
-                sentiment TEXT,
-                keywords TEXT,
-                language TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица каналов
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS channels (
-                id INTEGER PRIMARY KEY,
-                channel_id INTEGER UNIQUE,
-                channel_name TEXT,
-                title TEXT,
-                description TEXT,
-                members_count INTEGER,
-                type TEXT,
-                is_verified BOOLEAN,
-                is_scam BOOLEAN,
-                is_fake BOOLEAN,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица статистики
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS parsing_stats (
-                id INTEGER PRIMARY KEY,
-                session_id TEXT,
-                channel_name TEXT,
-                messages_parsed INTEGER,
-                errors_count INTEGER,
-                start_time TIMESTAMP,
-                end_time TIMESTAMP,
-                config TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        init_schema(self.storage.connection())
         logger.info("База данных инициализирована")
     
     async def _init_pyrogram_client(self):
@@ -296,62 +341,37 @@ class TelegramParserMVP:
         if not self.config['privacy']['anonymize_users']:
             return {'id': user_id, 'username': username}
         
-        # Хэширование ID пользователя
-        user_id_hash = hashlib.sha256(str(user_id).encode()).hexdigest()[:16]
-        
-        # Анонимизация username
-        if username and self.config['privacy']['hash_user_ids']:
-            username = f"user_{user_id_hash}"
-        
-        return {
-            'id_hash': user_id_hash,
-            'username': username if username else f"user_{user_id_hash}"
-        }
+        # HMAC с секретом и LRU-кэшем (общий для обоих движков)
+        return self.anonymizer.anonymize(user_id, username, self.config['privacy']['hash_user_ids'])
     
     def _analyze_sentiment(self, text: str) -> Optional[str]:
         """Анализ тональности текста"""
-        if not AI_AVAILABLE or not self.config['ai']['sentiment_analysis']:
-            return None
-        
-        try:
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            
-            if polarity > 0.1:
-                return "positive"
-            elif polarity < -0.1:
-                return "negative"
-            else:
-                return "neutral"
-        except Exception as e:
-            logger.warning(f"Ошибка анализа тональности: {e}")
+        if not self.config['ai']['sentiment_analysis']:
             return None
+        return text_analysis.analyze_sentiment(text)
     
     def _extract_keywords(self, text: str, top_n: int = 5) -> List[str]:
         """Извлечение ключевых слов"""
-        if not AI_AVAILABLE or not self.config['ai']['keyword_extraction']:
-            return []
-        
-        try:
-            # Простое извлечение ключевых слов
-            words = re.findall(r'\b[а-яё]{3,}\b', text.lower())
-            word_freq = Counter(words)
-            return [word for word, _ in word_freq.most_common(top_n)]
-        except Exception as e:
-            logger.warning(f"Ошибка извлечения ключевых слов: {e}")
+        if not self.config['ai']['keyword_extraction']:
             return []
+        return text_analysis.extract_keywords(text, top_n)
     
     def _detect_language(self, text: str) -> Optional[str]:
         """Определение языка текста"""
-        if not AI_AVAILABLE or not self.config['ai']['language_detection']:
-            return None
-        
-        try:
-            blob = TextBlob(text)
-            return blob.detect_language()
-        except Exception as e:
-            logger.warning(f"Ошибка определения языка: {e}")
+        if not self.config['ai']['language_detection']:
             return None
+        return text_analysis.detect_language(text, self.config['ai'].get('language_detector', 'ngram'))
+    
+    def _analysis_options(self, config: ParseConfig) -> Dict:
+        """Флаги анализа для стадии AnalysisPipeline"""
+        ai_config = self.config['ai']
+        return {
+            'sentiment': config.analyze_sentiment and ai_config['sentiment_analysis'],
+            'keywords': config.extract_keywords and ai_config['keyword_extraction'],
+            'language': ai_config['language_detection'],
+            'language_detector': ai_config.get('language_detector', 'ngram'),
+            'tracked_keywords': tuple(config.keywords or ())
+        }
     
     def _filter_message(self, text: str, config: ParseConfig) -> bool:
         """Фильтрация сообщений по критериям"""
@@ -359,241 +379,436 @@ class TelegramParserMVP:
         if len(text) < config.min_message_length:
             return False
         
+        # Матчеры компилируются один раз на набор слов и кэшируются
+        include = compile_keywords(tuple(config.keywords or ()), config.match_whole_words)
+        exclude = compile_keywords(tuple(config.exclude_keywords or ()), config.match_whole_words)
+        if not include and not exclude:
+            return True
+        
+        text_normalized = normalize_text(text)
+        
         # Проверка ключевых слов
-        if config.keywords:
-            text_lower = text.lower()
-            if not any(keyword.lower() in text_lower for keyword in config.keywords):
-                return False
+        if include and not include.search(text_normalized, normalized=True):
+            return False
         
         # Проверка исключающих слов
-        if config.exclude_keywords:
-            text_lower = text.lower()
-            if any(keyword.lower() in text_lower for keyword in config.exclude_keywords):
-                return False
+        if exclude and exclude.search(text_normalized, normalized=True):
+            return False
         
         return True
     
-    async def _parse_with_pyrogram(self, config: ParseConfig) -> List[ParsedMessage]:
-        """Парсинг с использованием Pyrogram"""
-        messages = []
+    def _message_text(self, text: Optional[str], caption: Optional[str], media_item,
+                      config: ParseConfig) -> Optional[str]:
+        """
+        Текст для сохранения или None, если сообщение пропускается
         
-        try:
-            # Получение информации о канале
-            chat = await self.pyrogram_client.get_chat(config.target)
+        Сообщения с медиа (при включенной загрузке) берут текст из подписи
+        и без подписи сохраняются, только если не задан фильтр по словам.
+        """
+        if text:
+            return text if self._filter_message(text, config) else None
+        if media_item is None:
+            return None
+        if caption:
+            return caption if self._filter_message(caption, config) else None
+        return "" if not config.keywords else None
+    
+    def _get_checkpoint(self, channel_id: int) -> Optional[int]:
+        """Получение последнего сохраненного message_id канала"""
+        row = self.storage.fetchone(
+            "SELECT last_message_id FROM parse_checkpoints WHERE channel_id = ?",
+            (channel_id,)
+        )
+        return row[0] if row else None
+    
+    @staticmethod
+    def _reaches_checkpoint(checkpoint: Optional[int], min_id: int) -> bool:
+        """
+        Примыкает ли загрузка к checkpoint с самого начала
+        
+        Инкрементальная загрузка идет вверх от checkpoint, а без checkpoint
+        примыкать не к чему. Загрузка от новых к старым примыкает, только
+        если дошла до checkpoint: иначе max_messages или days_back оставили
+        между ними пропуск, и checkpoint не должен через него перескочить.
+        """
+        return bool(min_id) or not checkpoint
+    
+    async def _save_checkpoint(self, channel_id: int, channel_name: str, last_message_id: int) -> bool:
+        """
+        Сохранение checkpoint после успешной записи сообщений канала
+        
+        Если батч с сообщениями канала не записался, checkpoint остается
+        на месте и следующий запуск загрузит их снова. Возвращает, сохранен ли он.
+        """
+        # Сначала дожидаемся анализа, записи и медиа, чтобы checkpoint не опережал данные
+        await self.analysis.flush()
+        await self.media.flush()
+        if self.writer.take_failures(channel_id) is not None:
+            logger.warning(f"⚠️ {channel_name}: часть сообщений не записана, checkpoint не сдвигается")
+            return False
+        await self._write_checkpoint(channel_id, channel_name, last_message_id)
+        return True
+    
+    async def _write_checkpoint(self, channel_id: int, channel_name: str, last_message_id: int):
+        """Запись checkpoint в потоке БД (только вперед)"""
+        await self.writer.execute('''
+            INSERT INTO parse_checkpoints (channel_id, channel_name, last_message_id, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                channel_name = excluded.channel_name,
+                last_message_id = MAX(last_message_id, excluded.last_message_id),
+                updated_at = excluded.updated_at
+        ''', (channel_id, channel_name, last_message_id))
+    
+    async def _resolve_pyrogram_channel(self, target: str) -> ChannelInfo:
+        """Метаданные канала из кэша или через get_chat"""
+        info = self.channel_cache.get(target)
+        if info is None:
+            await self.rate_limiter.acquire("pyrogram")
+            info = ChannelInfo.from_pyrogram(await self.pyrogram_client.get_chat(target))
+            await self.channel_cache.put(info)
+        return info
+    
+    async def _resolve_telethon_channel(self, target: str) -> Tuple[Any, ChannelInfo]:
+        """Сущность для запросов и метаданные канала; с access_hash из кэша get_entity не нужен"""
+        info = self.channel_cache.get(target)
+        if info is not None and info.access_hash is not None:
+            return InputPeerChannel(info.channel_id, info.access_hash), info
+        
+        await self.rate_limiter.acquire("telethon")
+        entity = await self.telethon_client.get_entity(target)
+        info = ChannelInfo.from_telethon(entity)
+        await self.channel_cache.put(info)
+        return entity, info
+    
+    async def _iter_pyrogram_history(self, config: ParseConfig, min_id: int = 0):
+        """
+        История канала через Pyrogram с rate limiting и возобновлением после FloodWait
+        
+        Без min_id - от новых к старым, с min_id - только новее него по возрастанию id.
+        """
+        if min_id:
+            async for message in self._iter_pyrogram_newer(config, min_id):
+                yield message
+            return
+        
+        seen = 0
+        offset_id = 0
+        retries = 0
+        max_retries = self.config['parsing'].get('max_retries', 3)
+        
+        while seen < config.max_messages:
+            await self.rate_limiter.acquire("pyrogram")
+            started = time.perf_counter()
+            try:
+                async for message in self.pyrogram_client.get_chat_history(
+                    config.target,
+                    limit=config.max_messages - seen,
+                    offset_id=offset_id
+                ):
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage="fetch")
+                    seen += 1
+                    offset_id = message.id
+                    # Токен на следующую страницу истории
+                    if seen % HISTORY_PAGE_SIZE == 0:
+                        await self.rate_limiter.acquire("pyrogram")
+                    yield message
+                    started = time.perf_counter()
+                return
+            except FloodWait as e:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                # Пауза только для этого клиента, продолжаем с последнего сообщения
+                self.rate_limiter.pause("pyrogram", e.value)
+    
+    async def _iter_pyrogram_newer(self, config: ParseConfig, min_id: int):
+        """
+        Сообщения новее min_id по возрастанию id
+        
+        У get_chat_history нет min_id и обратного порядка, поэтому история
+        читается окнами id (курсор, курсор + HISTORY_PAGE_SIZE] - по одному
+        запросу на окно - от min_id до верхнего сообщения канала.
+        """
+        seen = 0
+        cursor = min_id
+        top_id = None
+        retries = 0
+        max_retries = self.config['parsing'].get('max_retries', 3)
+        
+        while seen < config.max_messages and (top_id is None or cursor < top_id):
+            await self.rate_limiter.acquire("pyrogram")
+            started = time.perf_counter()
+            try:
+                if top_id is None:
+                    top_id = 0
+                    async for message in self.pyrogram_client.get_chat_history(config.target, limit=1):
+                        top_id = message.id
+                    continue
+                window = [
+                    message async for message in self.pyrogram_client.get_chat_history(
+                        config.target,
+                        limit=HISTORY_PAGE_SIZE,
+                        offset_id=cursor + HISTORY_PAGE_SIZE + 1
+                    )
+                    if message.id > cursor
+                ]
+            except FloodWait as e:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                self.rate_limiter.pause("pyrogram", e.value)
+                continue
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="fetch")
             
-            # Сохранение информации о канале
-            await self._save_channel_info(chat)
+            for message in sorted(window, key=lambda message: message.id)[:config.max_messages - seen]:
+                seen += 1
+                yield message
+            cursor += HISTORY_PAGE_SIZE
+    
+    async def _iter_telethon_history(self, entity, config: ParseConfig, min_id: int = 0):
+        """
+        История канала через Telethon с rate limiting и возобновлением после FloodWaitError
+        
+        Без min_id - от новых к старым, с min_id - только новее него по возрастанию id.
+        """
+        seen = 0
+        reverse = bool(min_id)
+        # В обратном порядке offset_id - нижняя граница, с нее и продолжаем после паузы
+        offset_id = min_id
+        retries = 0
+        max_retries = self.config['parsing'].get('max_retries', 3)
+        
+        while seen < config.max_messages:
+            await self.rate_limiter.acquire("telethon")
+            started = time.perf_counter()
+            try:
+                async for message in self.telethon_client.iter_messages(
+                    entity,
+                    limit=config.max_messages - seen,
+                    offset_id=offset_id,
+                    min_id=min_id,
+                    reverse=reverse
+                ):
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage="fetch")
+                    seen += 1
+                    offset_id = message.id
+                    if seen % HISTORY_PAGE_SIZE == 0:
+                        await self.rate_limiter.acquire("telethon")
+                    yield message
+                    started = time.perf_counter()
+                return
+            except FloodWaitError as e:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                self.rate_limiter.pause("telethon", e.seconds)
+    
+    def _build_pyrogram_message(self, message, chat: ChannelInfo,
+                                config: ParseConfig) -> Optional[Tuple[ParsedMessage, Optional[MediaItem]]]:
+        """Сообщение Pyrogram -> ParsedMessage и медиа (None, если не проходит фильтры)"""
+        MESSAGES.inc(channel=chat.display_name, stage="fetched")
+        media_item = None
+        if config.include_media and message.media:
+            media_item = pyrogram_media_item(self.pyrogram_client, message, chat.channel_id)
+            if not self.media.accepts(media_item):
+                media_item = None
+        
+        # Фильтрация сообщений
+        text = self._message_text(message.text, message.caption, media_item, config)
+        if text is None:
+            MESSAGES.inc(channel=chat.display_name, stage="filtered")
+            return None
+        
+        # Анонимизация данных пользователя
+        user_data = self._anonymize_user_data(
+            message.from_user.id if message.from_user else 0,
+            message.from_user.username if message.from_user else "unknown"
+        )
+        
+        parsed_msg = ParsedMessage(
+            id=message.id,
+            text=text,
+            date=message.date,
+            author=user_data['username'],
+            author_id=user_data.get('id_hash', user_data.get('id', 0)),
+            channel_id=chat.channel_id,
+            channel_name=chat.display_name,
+            message_type="media" if media_item else "text",
+            media_type=message.media.value if message.media else None,
+            views=message.views,
+        )
+        return parsed_msg, media_item
+    
+    def _build_telethon_message(self, message, channel: ChannelInfo,
+                                config: ParseConfig) -> Optional[Tuple[ParsedMessage, Optional[MediaItem]]]:
+        """Сообщение Telethon -> ParsedMessage и медиа (None, если не проходит фильтры)"""
+        MESSAGES.inc(channel=channel.display_name, stage="fetched")
+        media_item = None
+        if config.include_media and message.media:
+            media_item = telethon_media_item(self.telethon_client, message, channel.channel_id)
+            if not self.media.accepts(media_item):
+                media_item = None
+        
+        # Фильтрация сообщений (у Telethon подпись медиа уже в message.text)
+        text = self._message_text(message.text, None, media_item, config)
+        if text is None:
+            MESSAGES.inc(channel=channel.display_name, stage="filtered")
+            return None
+        
+        # Анонимизация данных пользователя
+        user_data = self._anonymize_user_data(
+            message.sender_id or 0,
+            getattr(message.sender, 'username', 'unknown') if message.sender else 'unknown'
+        )
+        
+        parsed_msg = ParsedMessage(
+            id=message.id,
+            text=text,
+            date=message.date,
+            author=user_data['username'],
+            author_id=user_data.get('id_hash', user_data.get('id', 0)),
+            channel_id=channel.channel_id,
+            channel_name=channel.display_name,
+            message_type="media" if media_item else "text",
+            media_type=str(type(message.media).__name__) if message.media else None,
+            views=getattr(message, 'views', None),
+        )
+        return parsed_msg, media_item
+    
+    async def _enqueue_message(self, parsed_msg: ParsedMessage, media_item: Optional[MediaItem],
+                               analysis_options: Dict, progress: Optional[ParseProgress]):
+        """Анализ текста выполняется в пуле процессов, затем сообщение уходит в писатель"""
+        await self.analysis.put(parsed_msg, analysis_options, progress)
+        if media_item:
+            await self.media.put(media_item)
+    
+    async def _parse_with_pyrogram(self, config: ParseConfig, progress: ParseProgress) -> Tuple[int, List[ParsedMessage]]:
+        """Парсинг с использованием Pyrogram (сообщения уходят в писатель)"""
+        count = 0
+        sample = []
+        
+        try:
+            # Информация о канале (из кэша, если свежая)
+            chat = await self._resolve_pyrogram_channel(config.target)
             
             # Вычисление даты начала
             start_date = datetime.now() - timedelta(days=config.days_back)
             
+            # Инкрементальный режим идет вверх от checkpoint без пропусков (days_back не применяется)
+            checkpoint = self._get_checkpoint(chat.channel_id)
+            min_id = checkpoint if config.incremental and checkpoint else 0
+            top_id = 0
+            reached = self._reaches_checkpoint(checkpoint, min_id)
+            analysis_options = self._analysis_options(config)
+            
             # Получение сообщений
-            async for message in self.pyrogram_client.get_chat_history(
-                config.target, 
-                limit=config.max_messages
-            ):
-                if message.date < start_date:
+            async for message in self._iter_pyrogram_history(config, min_id):
+                if not min_id and message.date < start_date:
                     break
                 
-                if not message.text:
-                    continue
-                
-                # Фильтрация сообщений
-                if not self._filter_message(message.text, config):
+                top_id = max(top_id, message.id)
+                reached = reached or message.id <= checkpoint + 1
+                built = self._build_pyrogram_message(message, chat, config)
+                if built is None:
                     continue
                 
-                # Анонимизация данных пользователя
-                user_data = self._anonymize_user_data(
-                    message.from_user.id if message.from_user else 0,
-                    message.from_user.username if message.from_user else "unknown"
-                )
-                
-                # Анализ текста
-                sentiment = self._analyze_sentiment(message.text) if config.analyze_sentiment else None
-                keywords = self._extract_keywords(message.text) if config.extract_keywords else []
-                language = self._detect_language(message.text)
-                
-                # Создание объекта сообщения
-                parsed_msg = ParsedMessage(
-                    id=message.id,
-                    text=message.text,
-                    date=message.date,
-                    author=user_data['username'],
-                    author_id=user_data.get('id_hash', user_data.get('id', 0)),
-                    channel_id=chat.id,
-                    channel_name=chat.username or chat.title,
-                    message_type="text",
-                    media_type=message.media.value if message.media else None,
-                    views=message.views,
-                    sentiment=sentiment,
-                    keywords=keywords,
-                    language=language
-                )
-                
-                messages.append(parsed_msg)
+                parsed_msg, media_item = built
+                await self._enqueue_message(parsed_msg, media_item, analysis_options, progress)
+                progress.fetched += 1
+                count += 1
+                if len(sample) < 5:
+                    sample.append(parsed_msg)
                 self.stats['parsed_messages'] += 1
                 
-                # Rate limiting
-                await asyncio.sleep(config.rate_limit_delay)
-                
-                if len(messages) % 100 == 0:
-                    logger.info(f"Обработано {len(messages)} сообщений")
+                if count % 100 == 0:
+                    logger.info(f"Обработано {count} сообщений")
+            
+            if top_id and reached:
+                await self._save_checkpoint(chat.channel_id, chat.display_name, top_id)
         
         except Exception as e:
             logger.error(f"Ошибка парсинга с Pyrogram: {e}")
             self.stats['errors'] += 1
+            progress.errors += 1
         
-        return messages
+        return count, sample
     
-    async def _parse_with_telethon(self, config: ParseConfig) -> List[ParsedMessage]:
-        """Парсинг с использованием Telethon"""
-        messages = []
+    async def _parse_with_telethon(self, config: ParseConfig, progress: ParseProgress) -> Tuple[int, List[ParsedMessage]]:
+        """Парсинг с использованием Telethon (сообщения уходят в писатель)"""
+        count = 0
+        sample = []
         
         try:
-            # Получение информации о канале
-            entity = await self.telethon_client.get_entity(config.target)
+            # Информация о канале (из кэша, если свежая)
+            entity, channel = await self._resolve_telethon_channel(config.target)
             
             # Вычисление даты начала
             start_date = datetime.now() - timedelta(days=config.days_back)
             
+            # Инкрементальный режим идет вверх от checkpoint без пропусков (days_back не применяется)
+            checkpoint = self._get_checkpoint(channel.channel_id)
+            min_id = checkpoint if config.incremental and checkpoint else 0
+            top_id = 0
+            reached = self._reaches_checkpoint(checkpoint, min_id)
+            analysis_options = self._analysis_options(config)
+            
             # Получение сообщений
-            async for message in self.telethon_client.iter_messages(
-                entity,
-                limit=config.max_messages
-            ):
-                if message.date < start_date:
+            async for message in self._iter_telethon_history(entity, config, min_id=min_id):
+                if not min_id and message.date < start_date:
                     break
                 
-                if not message.text:
-                    continue
-                
-                # Фильтрация сообщений
-                if not self._filter_message(message.text, config):
+                top_id = max(top_id, message.id)
+                reached = reached or message.id <= checkpoint + 1
+                built = self._build_telethon_message(message, channel, config)
+                if built is None:
                     continue
                 
-                # Анонимизация данных пользователя
-                user_data = self._anonymize_user_data(
-                    message.sender_id or 0,
-                    getattr(message.sender, 'username', 'unknown') if message.sender else 'unknown'
-                )
-                
-                # Анализ текста
-                sentiment = self._analyze_sentiment(message.text) if config.analyze_sentiment else None
-                keywords = self._extract_keywords(message.text) if config.extract_keywords else []
-                language = self._detect_language(message.text)
-                
-                # Создание объекта сообщения
-                parsed_msg = ParsedMessage(
-                    id=message.id,
-                    text=message.text,
-                    date=message.date,
-                    author=user_data['username'],
-                    author_id=user_data.get('id_hash', user_data.get('id', 0)),
-                    channel_id=entity.id,
-                    channel_name=getattr(entity, 'username', None) or getattr(entity, 'title', 'unknown'),
-                    message_type="text",
-                    media_type=str(type(message.media).__name__) if message.media else None,
-                    views=getattr(message, 'views', None),
-                    sentiment=sentiment,
-                    keywords=keywords,
-                    language=language
-                )
-                
-                messages.append(parsed_msg)
+                parsed_msg, media_item = built
+                await self._enqueue_message(parsed_msg, media_item, analysis_options, progress)
+                progress.fetched += 1
+                count += 1
+                if len(sample) < 5:
+                    sample.append(parsed_msg)
                 self.stats['parsed_messages'] += 1
                 
-                # Rate limiting
-                await asyncio.sleep(config.rate_limit_delay)
-                
-                if len(messages) % 100 == 0:
-                    logger.info(f"Обработано {len(messages)} сообщений")
+                if count % 100 == 0:
+                    logger.info(f"Обработано {count} сообщений")
+            
+            if top_id and reached:
+                await self._save_checkpoint(channel.channel_id, channel.display_name, top_id)
         
         except Exception as e:
             logger.error(f"Ошибка парсинга с Telethon: {e}")
             self.stats['errors'] += 1
+            progress.errors += 1
         
-        return messages
-    
-    async def _save_channel_info(self, chat):
-        """Сохранение информации о канале"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO channels 
-                (channel_id, channel_name, title, description, members_count, type, is_verified, is_scam, is_fake)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                chat.id,
-                getattr(chat, 'username', None),
-                getattr(chat, 'title', None),
-                getattr(chat, 'description', None),
-                getattr(chat, 'members_count', None),
-                str(chat.type),
-                getattr(chat, 'is_verified', False),
-                getattr(chat, 'is_scam', False),
-                getattr(chat, 'is_fake', False)
-            ))
-            conn.commit()
-        except Exception as e:
-            logger.error(f"Ошибка сохранения информации о канале: {e}")
-        finally:
-            conn.close()
-    
-    async def _save_messages(self, messages: List[ParsedMessage]):
-        """Сохранение сообщений в базу данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            for msg in messages:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO messages 
-                    (message_id, text, date, author, author_id_hash, channel_id, channel_name, 
-                     message_type, media_type, media_url, reply_to, views, forwards, 
-                     sentiment, keywords, language)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    msg.id, msg.text, msg.date, msg.author, msg.author_id,
-                    msg.channel_id, msg.channel_name, msg.message_type,
-                    msg.media_type, msg.media_url, msg.reply_to, msg.views,
-                    msg.forwards, msg.sentiment, json.dumps(msg.keywords),
-                    msg.language
-                ))
-            
-            conn.commit()
-            logger.info(f"Сохранено {len(messages)} сообщений в базу данных")
-        
-        except Exception as e:
-            logger.error(f"Ошибка сохранения сообщений: {e}")
-        finally:
-            conn.close()
+        return count, sample
     
-    async def parse_channel(self, config: ParseConfig) -> Dict:
+    async def parse_channel(self, config: ParseConfig, progress: Optional[ParseProgress] = None) -> Dict:
         """Основной метод парсинга канала"""
         logger.info(f"🚀 Начинаем парсинг: {config.target}")
         self.stats['start_time'] = datetime.now()
+        # Счетчики конкретного запуска (общий self.stats - только итоги процесса)
+        progress = progress or ParseProgress(expected=config.max_messages)
         
-        # Инициализация клиентов если не сделано
-        if not self.current_engine:
-            if not await self.initialize_clients():
-                return {"error": "Не удалось инициализировать клиенты"}
-        
-        messages = []
+        # Инициализация клиентов если не сделано (один раз на все параллельные задачи)
+        async with self._init_lock:
+            if not self.current_engine:
+                if not await self.initialize_clients():
+                    return {"error": "Не удалось инициализировать клиенты"}
         
         try:
             # Выбор движка для парсинга
             if self.current_engine == "pyrogram":
-                messages = await self._parse_with_pyrogram(config)
+                count, sample = await self._parse_with_pyrogram(config, progress)
             elif self.current_engine == "telethon":
-                messages = await self._parse_with_telethon(config)
+                count, sample = await self._parse_with_telethon(config, progress)
             else:
                 return {"error": "Нет доступных движков для парсинга"}
             
-            # Сохранение сообщений
-            if messages:
-                await self._save_messages(messages)
+            # Дожидаемся анализа и записи всех сообщений канала
+            await self.analysis.flush()
             
             # Обновление статистики
             self.stats['channels_processed'] += 1
@@ -601,99 +816,368 @@ class TelegramParserMVP:
             result = {
                 "success": True,
                 "channel": config.target,
-                "messages_parsed": len(messages),
+                "messages_parsed": count,
                 "engine_used": self.current_engine,
                 "stats": self.stats.copy(),
-                "messages_sample": [asdict(msg) for msg in messages[:5]]  # Первые 5 сообщений
+                "progress": progress.to_dict(),
+                "messages_sample": [asdict(msg) for msg in sample]  # Первые 5 сообщений
             }
             
-            logger.info(f"✅ Парсинг завершен: {len(messages)} сообщений")
+            logger.info(f"✅ Парсинг завершен: {count} сообщений")
             return result
             
         except Exception as e:
             logger.error(f"❌ Ошибка парсинга: {e}")
             return {"error": str(e)}
     
-    def export_data(self, format_type: str = "json", filename: str = None) -> str:
-        """Экспорт данных в различных форматах"""
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"telegram_export_{timestamp}.{format_type}"
+    async def listen(self, channels: List[str], config: Optional[ParseConfig] = None,
+                     reconcile_interval: Optional[float] = None) -> Dict:
+        """
+        Режим реального времени: подписка на новые сообщения каналов
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        Сообщения приходят через обработчики обновлений и идут по тому же
+        конвейеру фильтров, анализа и записи. Пропуски id (после
+        переподключения или простоя процесса) догружаются из истории:
+        сразу при обнаружении и периодически раз в reconcile_interval.
+        Работает до вызова stop_listening() или отмены задачи.
+        """
+        async with self._init_lock:
+            if not self.current_engine:
+                if not await self.initialize_clients():
+                    return {"error": "Не удалось инициализировать клиенты"}
+        
+        config = config or ParseConfig(target="live")
+        reconcile_interval = reconcile_interval or self.config['parsing'].get('reconcile_interval', 60)
+        analysis_options = self._analysis_options(config)
+        progress = ParseProgress()
+        live: Dict[int, LiveChannel] = {}
+        
+        for target in channels:
+            try:
+                if self.current_engine == "pyrogram":
+                    info = await self._resolve_pyrogram_channel(target)
+                    peer = info.channel_id
+                else:
+                    peer, info = await self._resolve_telethon_channel(target)
+                checkpoint = self._get_checkpoint(info.channel_id)
+                channel = LiveChannel(info=info, peer=peer, last_seen=checkpoint, saved_id=checkpoint)
+                if checkpoint:
+                    # Догружаем пропущенное, пока процесс не работал
+                    channel.gaps.append((checkpoint, None))
+                live[info.channel_id] = channel
+            except Exception as e:
+                logger.error(f"❌ Не удалось подписаться на {target}: {e}")
+                self.stats['errors'] += 1
+        
+        if not live:
+            return {"error": "Нет доступных каналов для прослушивания"}
+        
+        async def on_message(channel_id: int, message):
+            channel = live.get(channel_id)
+            if channel is None:
+                return
+            if channel.last_seen is not None and message.id > channel.last_seen + 1:
+                channel.gaps.append((channel.last_seen, message.id))
+                self._reconcile_event.set()
+            if channel.last_seen is None or message.id > channel.last_seen:
+                channel.last_seen = message.id
+            channel.active_at = asyncio.get_running_loop().time()
+            await self._ingest_live(message, channel, config, analysis_options, progress)
+        
+        if self.current_engine == "pyrogram":
+            async def on_pyrogram_message(client, message):
+                await on_message(message.chat.id, message)
+            handler = MessageHandler(on_pyrogram_message, filters.chat(list(live)))
+            self.pyrogram_client.add_handler(handler)
+        else:
+            async def on_telethon_message(event):
+                await on_message(getattr(event.message.peer_id, 'channel_id', None), event.message)
+            self.telethon_client.add_event_handler(
+                on_telethon_message,
+                events.NewMessage(chats=[channel.peer for channel in live.values()])
+            )
+        
+        self._listen_stop = asyncio.Event()
+        self._reconcile_event = asyncio.Event()
+        self._reconcile_event.set()
+        reconcile_task = asyncio.create_task(
+            self._reconcile_loop(live, config, analysis_options, progress, reconcile_interval)
+        )
+        logger.info(f"👂 Прослушивание {len(live)} каналов ({self.current_engine})")
         
         try:
-            # Получение всех сообщений
-            cursor.execute('''
-                SELECT * FROM messages 
-                ORDER BY date DESC
-            ''')
-            
-            columns = [description[0] for description in cursor.description]
-            rows = cursor.fetchall()
-            
-            if format_type == "json":
-                data = [dict(zip(columns, row)) for row in rows]
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            await self._listen_stop.wait()
+        finally:
+            if self.current_engine == "pyrogram":
+                self.pyrogram_client.remove_handler(handler)
+            else:
+                self.telethon_client.remove_event_handler(on_telethon_message)
+            reconcile_task.cancel()
+            await asyncio.gather(reconcile_task, return_exceptions=True)
+            await self._save_live_checkpoints(live)
+            logger.info("👂 Прослушивание остановлено")
+        
+        return {"success": True, "channels": len(live), "progress": progress.to_dict()}
+    
+    def stop_listening(self):
+        """Остановка режима listen()"""
+        if self._listen_stop is not None:
+            self._listen_stop.set()
+    
+    async def _ingest_live(self, message, channel: LiveChannel, config: ParseConfig,
+                           analysis_options: Dict, progress: ParseProgress):
+        """Новое сообщение (из обновлений или догрузки) в общий конвейер"""
+        if self.current_engine == "pyrogram":
+            built = self._build_pyrogram_message(message, channel.info, config)
+        else:
+            built = self._build_telethon_message(message, channel.info, config)
+        if built is None:
+            return
+        
+        parsed_msg, media_item = built
+        await self._enqueue_message(parsed_msg, media_item, analysis_options, progress)
+        progress.fetched += 1
+        self.stats['parsed_messages'] += 1
+    
+    async def _iter_missing(self, channel: LiveChannel, after_id: int, before_id: Optional[int]):
+        """
+        Сообщения канала с after_id < id < before_id (before_id=None - все новее after_id)
+        
+        От новых к старым, постранично до after_id без ограничения числа сообщений.
+        """
+        if self.current_engine == "pyrogram":
+            await self.rate_limiter.acquire("pyrogram")
+            seen = 0
+            async for message in self.pyrogram_client.get_chat_history(
+                channel.peer, offset_id=before_id or 0
+            ):
+                if message.id <= after_id:
+                    break
+                seen += 1
+                if seen % HISTORY_PAGE_SIZE == 0:
+                    await self.rate_limiter.acquire("pyrogram")
+                yield message
+        else:
+            await self.rate_limiter.acquire("telethon")
+            seen = 0
+            async for message in self.telethon_client.iter_messages(
+                channel.peer, limit=None, min_id=after_id, max_id=before_id or 0
+            ):
+                seen += 1
+                if seen % HISTORY_PAGE_SIZE == 0:
+                    await self.rate_limiter.acquire("telethon")
+                yield message
+    
+    @staticmethod
+    def _flood_wait_seconds(error: Exception) -> Optional[float]:
+        """Длительность FloodWait любого движка или None для прочих ошибок"""
+        if PYROGRAM_AVAILABLE and isinstance(error, FloodWait):
+            return error.value
+        if TELETHON_AVAILABLE and isinstance(error, FloodWaitError):
+            return error.seconds
+        return None
+    
+    async def _reconcile_channel(self, channel: LiveChannel, config: ParseConfig,
+                                 analysis_options: Dict, progress: ParseProgress):
+        """Догрузка пропусков канала; неудачные пропуски остаются на следующую попытку"""
+        now = asyncio.get_running_loop().time()
+        quiet_interval = self.config['parsing'].get('quiet_check_interval', 900)
+        if channel.last_seen is not None and not channel.gaps and now - channel.active_at >= quiet_interval:
+            # Давно тихий канал: проверяем, не пропущено ли что-то после переподключения
+            channel.gaps.append((channel.last_seen, None))
+        if not channel.gaps:
+            return
+        channel.active_at = now
+        
+        # Пропуск убирается только после догрузки до after_id: при отмене или
+        # ошибке остается его недогруженная нижняя часть, и checkpoint не
+        # перескочит через нее
+        for gap in list(channel.gaps):
+            after_id, before_id = gap
+            lowest = None
+            try:
+                fetched = 0
+                async for message in self._iter_missing(channel, after_id, before_id):
+                    fetched += 1
+                    if channel.last_seen is None or message.id > channel.last_seen:
+                        channel.last_seen = message.id
+                    await self._ingest_live(message, channel, config, analysis_options, progress)
+                    lowest = message.id
+                if fetched:
+                    logger.info(f"🔁 {channel.info.display_name}: догружено {fetched} пропущенных сообщений")
+                channel.gaps.remove(gap)
+                lowest = None
+            except Exception as e:
+                flood_wait = self._flood_wait_seconds(e)
+                if flood_wait is not None:
+                    self.rate_limiter.pause(self.current_engine, flood_wait)
+                else:
+                    logger.error(f"Ошибка догрузки {channel.info.display_name}: {e}")
+                    progress.errors += 1
+            finally:
+                if lowest is not None:
+                    channel.gaps[channel.gaps.index(gap)] = (after_id, lowest)
+    
+    async def _reconcile_loop(self, live: Dict[int, LiveChannel], config: ParseConfig,
+                              analysis_options: Dict, progress: ParseProgress, interval: float):
+        """Периодическая (или по обнаруженному пропуску) сверка и сохранение checkpoint"""
+        while True:
+            try:
+                await asyncio.wait_for(self._reconcile_event.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._reconcile_event.clear()
             
-            elif format_type == "csv":
-                import csv
-                with open(filename, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(columns)
-                    writer.writerows(rows)
+            for channel in live.values():
+                await self._reconcile_channel(channel, config, analysis_options, progress)
+            await self._save_live_checkpoints(live)
+    
+    async def _save_live_checkpoints(self, live: Dict[int, LiveChannel]):
+        await self.analysis.flush()
+        await self.media.flush()
+        for channel in live.values():
+            failed_id = self.writer.take_failures(channel.info.channel_id)
+            if failed_id is not None:
+                # Незаписанные сообщения догружаются заново как пропуск
+                logger.warning(f"⚠️ {channel.info.display_name}: сообщения от id {failed_id} не записаны, догрузка")
+                channel.gaps.append((failed_id - 1, None))
+                self._reconcile_event.set()
             
+            # Checkpoint не двигается через недогруженный пропуск
+            safe_id = min([after_id for after_id, _ in channel.gaps] + [channel.last_seen or 0])
+            if safe_id and safe_id != channel.saved_id:
+                await self._write_checkpoint(channel.info.channel_id, channel.info.display_name, safe_id)
+                channel.saved_id = safe_id
+    
+    def export_data(self, format_type: str = "json", filename: str = None,
+                    filters: Optional[ExportFilters] = None, compress: bool = False) -> str:
+        """Потоковый экспорт данных в файл (json, jsonl, csv, parquet)"""
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"telegram_export_{timestamp}.{format_type}" + (".gz" if compress else "")
+        
+        try:
+            export_to_file(self.db_path, filename, format_type, filters, compress)
             logger.info(f"Данные экспортированы в файл: {filename}")
             return filename
             
         except Exception as e:
             logger.error(f"Ошибка экспорта данных: {e}")
             return None
-        finally:
-            conn.close()
     
-    def get_statistics(self) -> Dict:
-        """Получение статистики парсинга"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def archive_messages(self, older_than_days: Optional[int] = None, vacuum: bool = False) -> Dict:
+        """Перенос старых сообщений в колоночный архив (см. archive.py)"""
+        return archive_messages(self.storage, self.archive_config, older_than_days, vacuum)
+    
+    def iter_export(self, format_type: str = "json", filters: Optional[ExportFilters] = None,
+                    compress: bool = False):
+        """Потоковый экспорт данных порциями байтов (для StreamingResponse)"""
+        return iter_export(self.db_path, format_type, filters, compress)
+    
+    @staticmethod
+    def _build_fts_query(query: str) -> str:
+        """Безопасный запрос FTS5: каждое слово и фраза берутся в кавычки"""
+        terms = []
+        for phrase, word in SEARCH_TERM_PATTERN.findall(query):
+            if phrase:
+                terms.append('"' + phrase.replace('"', '') + '"')
+            else:
+                prefix = word.endswith('*')
+                word = word.rstrip('*').replace('"', '')
+                if word:
+                    terms.append(f'"{word}"' + ('*' if prefix else ''))
+        return " ".join(terms)
+    
+    def search(self, query: str, channel: Optional[str] = None, date_range: Optional[Tuple] = None,
+               limit: int = 20, offset: int = 0) -> Dict:
+        """
+        Полнотекстовый поиск по сообщениям (ранжирование bm25)
+
+        Архивные совпадения (archive.py) идут после горячих, новые первыми.
+        """
+        fts_query = self._build_fts_query(query)
+        if not fts_query:
+            return {"query": query, "total": 0, "limit": limit, "offset": offset, "results": []}
+        
+        conditions = ["messages_fts MATCH ?"]
+        params: List[Any] = [fts_query]
+        if channel:
+            conditions.append("m.channel_name = ?")
+            params.append(channel.lstrip('@'))
+        if date_range:
+            date_from, date_to = date_range
+            if date_from:
+                conditions.append("m.date >= ?")
+                params.append(str(date_from))
+            if date_to:
+                conditions.append("m.date <= ?")
+                params.append(str(date_to))
+        where = " AND ".join(conditions)
+        date_from, date_to = date_range or (None, None)
+        
+        cursor = self.storage.connection().cursor()
         
         try:
-            # Общая статистика
-            cursor.execute("SELECT COUNT(*) FROM messages")
-            total_messages = cursor.fetchone()[0]
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM messages_fts
+                JOIN messages m ON m.id = messages_fts.rowid
+                WHERE {where}
+            ''', params)
+            total = cursor.fetchone()[0]
             
-            cursor.execute("SELECT COUNT(DISTINCT channel_name) FROM messages")
-            total_channels = cursor.fetchone()[0]
+            cursor.execute(f'''
+                SELECT m.message_id, m.channel_id, m.channel_name, m.date, m.sentiment, m.language,
+                       snippet(messages_fts, 0, '<b>', '</b>', '…', 16) AS snippet,
+                       bm25(messages_fts) AS rank
+                FROM messages_fts
+                JOIN messages m ON m.id = messages_fts.rowid
+                WHERE {where}
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            ''', params + [limit, offset])
+            columns = [description[0] for description in cursor.description]
+            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
             
-            # Статистика по каналам
-            cursor.execute('''
-                SELECT channel_name, COUNT(*) as message_count 
-                FROM messages 
-                GROUP BY channel_name 
-                ORDER BY message_count DESC
-            ''')
-            channels_stats = cursor.fetchall()
+            archived = search_archive(
+                self.storage.connection(), SEARCH_TERM_PATTERN.findall(query), channel, date_from, date_to
+            )
+            archive_offset = max(offset - total, 0)
+            results += archived[archive_offset:archive_offset + limit - len(results)]
+            total += len(archived)
             
-            # Статистика по тональности
-            cursor.execute('''
-                SELECT sentiment, COUNT(*) as count 
-                FROM messages 
-                WHERE sentiment IS NOT NULL 
-                GROUP BY sentiment
-            ''')
-            sentiment_stats = cursor.fetchall()
+            return {"query": query, "total": total, "limit": limit, "offset": offset, "results": results}
             
-            # Статистика по языкам
+        except Exception as e:
+            logger.error(f"Ошибка поиска: {e}")
+            return {"query": query, "total": 0, "limit": limit, "offset": offset, "results": [], "error": str(e)}
+    
+    def get_statistics(self) -> Dict:
+        """Получение статистики парсинга"""
+        cursor = self.storage.connection().cursor()
+        
+        try:
+            # Счетчики читаются из материализованной таблицы message_stats,
+            # которую поддерживают триггеры на messages
             cursor.execute('''
-                SELECT language, COUNT(*) as count 
-                FROM messages 
-                WHERE language IS NOT NULL 
-                GROUP BY language 
+                SELECT dimension, value, count FROM message_stats
+                WHERE count > 0
                 ORDER BY count DESC
             ''')
-            language_stats = cursor.fetchall()
+            aggregates = {'total': {}, 'channel': {}, 'sentiment': {}, 'language': {}}
+            for dimension, value, count in cursor.fetchall():
+                aggregates[dimension][value] = count
+            
+            total_messages = aggregates['total'].get('', 0)
+            total_channels = len(aggregates['channel'])
+            channels_stats = aggregates['channel']
+            sentiment_stats = aggregates['sentiment']
+            language_stats = aggregates['language']
+
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size > 1), 0) FROM dedup_clusters")
+            unique_content, reposted_content = cursor.fetchone()
+            
+            # message_stats учитывает и архивные строки, отдельно показываем объем архива
+            archive = archive_summary(self.storage.connection())
             
             return {
                 "total_messages": total_messages,
@@ -701,18 +1185,24 @@ class TelegramParserMVP:
                 "channels": dict(channels_stats),
                 "sentiment": dict(sentiment_stats),
                 "languages": dict(language_stats),
+                "unique_content": unique_content,
+                "reposted_content": reposted_content,
+                "archived_messages": archive["messages"],
+                "archive": archive,
                 "parsing_stats": self.stats
             }
             
         except Exception as e:
             logger.error(f"Ошибка получения статистики: {e}")
             return {}
-        finally:
-            conn.close()
     
     async def cleanup(self):
         """Очистка ресурсов"""
         try:
+            await self.analysis.stop()
+            await self.media.stop()
+            await self.writer.stop()
+            self.storage.close()
             if self.pyrogram_client:
                 await self.pyrogram_client.stop()
             if self.telethon_client:
@@ -723,8 +1213,21 @@ class TelegramParserMVP:
 
 # Веб-интерфейс (если доступен FastAPI)
 if WEB_AVAILABLE:
-    app = FastAPI(title="Telegram Parser MVP", version="1.0.0")
     parser = TelegramParserMVP()
+    job_manager = JobManager(
+        parser.parse_channel,
+        workers=parser.config['parsing'].get('max_concurrent_jobs', 2)
+    )
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Остановка сервиса: сначала задачи, затем сброс очередей записи и закрытие базы"""
+        yield
+        logger.info("🛑 Остановка веб-сервиса")
+        await job_manager.stop()
+        await parser.cleanup()
+    
+    app = FastAPI(title="Telegram Parser MVP", version="1.0.0", lifespan=lifespan)
     
     class ParseRequest(BaseModel):
         target: str
@@ -734,6 +1237,8 @@ if WEB_AVAILABLE:
         exclude_keywords: Optional[List[str]] = None
         analyze_sentiment: bool = True
         extract_keywords: bool = True
+        incremental: bool = False
+        match_whole_words: bool = False
     
     @app.get("/", response_class=HTMLResponse)
     async def dashboard():
@@ -876,7 +1381,8 @@ if WEB_AVAILABLE:
                             body: JSON.stringify(data)
                         });
                         
-                        const result = await response.json();
+                        const job = await response.json();
+                        const result = await waitForJob(job.job_id, resultsDiv);
                         
                         if (result.success) {
                             resultsDiv.innerHTML = `
@@ -896,6 +1402,24 @@ if WEB_AVAILABLE:
                     }
                 });
                 
+                // Ожидание завершения фоновой задачи с выводом прогресса
+                async function waitForJob(jobId, resultsDiv) {
+                    while (true) {
+                        const response = await fetch(`/api/jobs/${jobId}`);
+                        const job = await response.json();
+                        
+                        if (job.status === 'completed' || job.status === 'failed') {
+                            return job.result || { error: job.error };
+                        }
+                        
+                        const p = job.progress;
+                        resultsDiv.innerHTML = `<p>⏳ Парсинг в процессе: получено ${p.fetched}, ` +
+                            `проанализировано ${p.analyzed}, записано ${p.written} ` +
+                            `(${p.rate_per_second} сообщ./с${p.eta_seconds ? `, осталось ~${Math.round(p.eta_seconds)} с` : ''})</p>`;
+                        await new Promise(resolve => setTimeout(resolve, 1000));
+                    }
+                }
+                
                 // Скачивание данных
                 async function downloadData() {
                     window.open('/api/export?format=json', '_blank');
@@ -909,40 +1433,145 @@ if WEB_AVAILABLE:
         """
         return html_content
     
+    def request_to_config(request: ParseRequest) -> ParseConfig:
+        return ParseConfig(
+            target=request.target,
+            max_messages=request.max_messages,
+            days_back=request.days_back,
+            keywords=request.keywords,
+            exclude_keywords=request.exclude_keywords,
+            analyze_sentiment=request.analyze_sentiment,
+            extract_keywords=request.extract_keywords,
+            incremental=request.incremental,
+            match_whole_words=request.match_whole_words
+        )
+    
     @app.post("/api/parse")
-    async def parse_endpoint(request: ParseRequest, background_tasks: BackgroundTasks):
-        """API endpoint для парсинга"""
+    async def parse_endpoint(request: ParseRequest):
+        """API endpoint для парсинга: ставит задачу в очередь и сразу возвращает id"""
         try:
-            config = ParseConfig(
-                target=request.target,
-                max_messages=request.max_messages,
-                days_back=request.days_back,
-                keywords=request.keywords,
-                exclude_keywords=request.exclude_keywords,
-                analyze_sentiment=request.analyze_sentiment,
-                extract_keywords=request.extract_keywords
-            )
+            job = await job_manager.submit(request_to_config(request))
+            return {"job_id": job.id, "status": job.status}
             
-            # Запуск парсинга в фоне
-            result = await parser.parse_channel(config)
-            return result
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.get("/api/jobs")
+    async def list_jobs_endpoint():
+        """API endpoint для списка задач"""
+        return job_manager.list_jobs()
+    
+    @app.get("/api/jobs/{job_id}")
+    async def get_job_endpoint(job_id: str):
+        """API endpoint для прогресса задачи"""
+        job = job_manager.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+        return job.to_dict()
+    
+    @app.post("/api/parse/batch")
+    async def parse_batch_endpoint(requests: List[ParseRequest]):
+        """
+        API endpoint для парсинга нескольких каналов: задача на канал
+        
+        Задачи сразу ставятся в очередь менеджера, их параллельность
+        ограничивает max_concurrent_jobs, прогресс - /api/jobs/{job_id}.
+        """
+        try:
+            jobs = [await job_manager.submit(request_to_config(request)) for request in requests]
+            return [{"job_id": job.id, "target": job.config.target, "status": job.status} for job in jobs]
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics_endpoint():
+        """Метрики в текстовом формате Prometheus"""
+        return PlainTextResponse(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+    
     @app.get("/api/stats")
     async def get_stats():
         """API endpoint для получения статистики"""
-        return parser.get_statistics()
+        # Чтения SQLite - в потоке пула: цикл событий продолжает загрузку и задачи
+        return await asyncio.to_thread(parser.get_statistics)
+    
+    @app.get("/api/analytics/timeseries")
+    async def analytics_timeseries_endpoint(
+        channel: Optional[str] = None,
+        interval: str = "hour",
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ):
+        """API endpoint временного ряда объема и тональности"""
+        if interval not in INTERVALS:
+            raise HTTPException(status_code=400, detail=f"Неподдерживаемый интервал: {interval}")
+        return await asyncio.to_thread(parser.analytics.timeseries, channel, interval, date_from, date_to)
+    
+    @app.get("/api/analytics/keywords")
+    async def analytics_keywords_endpoint(channel: Optional[str] = None, days: int = 7, limit: int = 20):
+        """API endpoint топа ключевых слов за период"""
+        return await asyncio.to_thread(parser.analytics.top_keywords, channel, max(days, 1), max(1, min(limit, 200)))
+    
+    @app.get("/api/analytics/cooccurrence")
+    async def analytics_cooccurrence_endpoint(days: int = 7, limit: int = 20, min_count: int = 2):
+        """API endpoint пар каналов с общими ключевыми словами"""
+        return await asyncio.to_thread(
+            parser.analytics.keyword_cooccurrence, max(days, 1), max(1, min(limit, 200)), max(min_count, 1)
+        )
+    
+    @app.post("/api/archive")
+    async def archive_endpoint(older_than_days: Optional[int] = None):
+        """API endpoint архивации старых сообщений"""
+        if older_than_days is not None and older_than_days < 1:
+            raise HTTPException(status_code=400, detail="older_than_days должен быть не меньше 1")
+        try:
+            # Поток БД: архивация не пересекается с писателем
+            return await parser.storage.run(parser.archive_messages, older_than_days)
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    @app.get("/api/search")
+    async def search_endpoint(
+        q: str,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ):
+        """API endpoint для полнотекстового поиска с пагинацией"""
+        limit = max(1, min(limit, 100))
+        # FTS5/bm25 и сканирование архива - вне цикла событий
+        return await asyncio.to_thread(parser.search, q, channel, (date_from, date_to), limit, max(offset, 0))
     
     @app.get("/api/export")
-    async def export_data_endpoint(format: str = "json"):
-        """API endpoint для экспорта данных"""
-        filename = parser.export_data(format)
-        if filename:
-            return {"filename": filename, "download_url": f"/download/{filename}"}
-        else:
-            raise HTTPException(status_code=500, detail="Ошибка экспорта данных")
+    async def export_data_endpoint(
+        format: str = "json",
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        gzip: bool = False
+    ):
+        """API endpoint для потокового экспорта данных"""
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Неподдерживаемый формат: {format}")
+        
+        filters = ExportFilters(channel=channel, date_from=date_from, date_to=date_to, sentiment=sentiment)
+        try:
+            # До начала потока: после первого байта ответ уже 200
+            await asyncio.to_thread(check_export, parser.db_path, format, filters)
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"telegram_export_{timestamp}.{format}" + (".gz" if gzip else "")
+        
+        return StreamingResponse(
+            parser.iter_export(format, filters, compress=gzip),
+            media_type="application/gzip" if gzip else CONTENT_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
 
 # CLI интерфейс
 async def main():
@@ -990,7 +1619,7 @@ async def main():
             # Экспорт данных
             export_choice = input("Экспортировать данные? (y/n): ").lower()
             if export_choice == 'y':
-                format_choice = input("Формат (json/csv): ").lower() or "json"
+                format_choice = input("Формат (json/jsonl/csv/parquet): ").lower() or "json"
                 filename = parser.export_data(format_choice)
                 if filename:
                     print(f"📁 Данные экспортированы в файл: {filename}")
@@ -1011,8 +1640,32 @@ async def main():
     finally:
         await parser.cleanup()
 
+async def listen_main(channels: List[str]):
+    """CLI режима реального времени: python telegram_parser_mvp.py listen @a @b"""
+    parser = TelegramParserMVP()
+    try:
+        result = await parser.listen(channels)
+        if result.get("error"):
+            print(f"❌ {result['error']}")
+    except KeyboardInterrupt:
+        print("\n⏹️ Прослушивание прервано пользователем")
+    finally:
+        await parser.cleanup()
+
+def archive_main(args: List[str]):
+    """CLI архивации: python telegram_parser_mvp.py archive [дней] [--vacuum]"""
+    parser = TelegramParserMVP()
+    days = next((int(arg) for arg in args if arg.isdigit()), None)
+    result = parser.archive_messages(days, vacuum="--vacuum" in args)
+    print(f"🗄️ Архивировано сообщений: {result['archived']} (старше {result['cutoff']})")
+
 if __name__ == "__main__":
-    if WEB_AVAILABLE:
+    if len(sys.argv) > 2 and sys.argv[1] == "listen":
+        print("👂 Запуск режима реального времени...")
+        asyncio.run(listen_main(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "archive":
+        archive_main(sys.argv[2:])
+    elif WEB_AVAILABLE:
         print("🌐 Запуск веб-сервера...")
         print("Откройте http://localhost:8000 в браузере")
         import uvicorn
@@ -0,0 +1,141 @@
+"""
+Общие фикстуры тестов парсера
+
+Модули парсера импортируют друг друга по имени файла, поэтому каталог
+проекта добавляется в sys.path.
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage as storage_module  # noqa: E402
+from message_writer import INSERT_MESSAGE_SQL, message_to_row  # noqa: E402
+from schema import init_account_schema, init_schema  # noqa: E402
+from storage import Storage  # noqa: E402
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Storage на временной базе с актуальной схемой"""
+    storage = Storage(str(tmp_path / "messages.db"))
+    init_schema(storage.connection())
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def accounts_storage(tmp_path):
+    """Storage на временной базе аккаунтов MultiAccountParser"""
+    storage = Storage(str(tmp_path / "accounts.db"))
+    init_account_schema(storage.connection())
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Временный текущий каталог с отдельным реестром get_storage()
+
+    Парсеры открывают базы и конфиги по относительным путям, а общий
+    Storage на путь иначе пережил бы смену каталога между тестами.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage_module, "_storages", {})
+    yield tmp_path
+    for shared in storage_module._storages.values():
+        shared.close()
+
+
+@pytest.fixture
+def web(workdir):
+    """
+    Модуль telegram_parser_mvp с веб-приложением на временном каталоге
+
+    При импорте модуль создает parser с config.json и базой в текущем
+    каталоге, поэтому импорт повторяется внутри workdir.
+    """
+    pytest.importorskip("fastapi")
+    pytest.importorskip("aiohttp")
+    # pyrogram при первом импорте берет asyncio.get_event_loop(), а после
+    # asyncio.run() в предыдущих тестах текущего цикла уже нет
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    sys.modules.pop("telegram_parser_mvp", None)
+    module = importlib.import_module("telegram_parser_mvp")
+    yield module
+    module.parser.storage.close()
+    sys.modules.pop("telegram_parser_mvp", None)
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def make_message(message_id: int, channel_id: int = 1, channel_name: str = "channel",
+                 date: str = "2024-01-01 12:00:00", sentiment: str = "neutral",
+                 language: str = "ru", text: str = "текст", **fields) -> SimpleNamespace:
+    """Сообщение с полями ParsedMessage, которые читает message_to_row"""
+    values = dict(
+        id=message_id, text=text, date=date, author=None, author_id=None,
+        channel_id=channel_id, channel_name=channel_name, message_type="text",
+        media_type=None, media_url=None, reply_to=None, views=0, forwards=0,
+        sentiment=sentiment, keywords=[], language=language, cluster_id=None
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def stored_stats(conn) -> dict:
+    """Ненулевые счетчики message_stats"""
+    return {
+        (dimension, value): count
+        for dimension, value, count in conn.execute("SELECT dimension, value, count FROM message_stats")
+        if count
+    }
+
+
+def expected_stats(conn) -> dict:
+    """Счетчики message_stats, пересчитанные по таблице messages"""
+    stats = {('total', ''): conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]}
+    for dimension, column in (('channel', 'channel_name'), ('sentiment', 'sentiment'), ('language', 'language')):
+        stats.update(
+            ((dimension, value), count) for value, count in conn.execute(
+                f"SELECT {column}, COUNT(*) FROM messages WHERE {column} IS NOT NULL GROUP BY {column}"
+            )
+        )
+    return {key: count for key, count in stats.items() if count}
+
+
+def hourly_totals(conn) -> dict:
+    """Ненулевые корзины analytics_hourly"""
+    return {
+        (channel_name, bucket): (messages, positive, negative, neutral)
+        for channel_name, bucket, messages, positive, negative, neutral in conn.execute(
+            "SELECT channel_name, bucket, messages, positive, negative, neutral FROM analytics_hourly"
+        )
+        if messages
+    }
+
+
+def expected_hourly(conn) -> dict:
+    """Корзины analytics_hourly, пересчитанные по таблице messages"""
+    return {
+        (channel_name, bucket): (messages, positive, negative, neutral)
+        for channel_name, bucket, messages, positive, negative, neutral in conn.execute('''
+            SELECT channel_name, strftime('%Y-%m-%d %H:00', date), COUNT(*),
+                   SUM(sentiment IS 'positive'), SUM(sentiment IS 'negative'), SUM(sentiment IS 'neutral')
+            FROM messages WHERE channel_name IS NOT NULL GROUP BY 1, 2
+        ''')
+    }
+
+
+def write_messages(conn, messages):
+    """Запись сообщений тем же UPSERT, что и у MessageWriter"""
+    with conn:
+        conn.executemany(INSERT_MESSAGE_SQL, [message_to_row(msg) for msg in messages])
@@ -0,0 +1,87 @@
+"""Тесты выбора аккаунта по доступности, квоте и здоровью"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from account_scheduler import AccountScheduler
+from account_state import AccountStateStore
+from rate_limiter import RateLimiter
+
+
+def make_scheduler(accounts_storage, **accounts):
+    """Планировщик над аккаунтами {id: поля, отличные от значений по умолчанию}"""
+    state = {}
+    for account_id, fields in accounts.items():
+        values = dict(
+            account_id=account_id, daily_requests=0, max_daily_requests=100, max_hourly_requests=0,
+            rate_limit_delay=0.0, last_request_time=None, usage_date=datetime.now().date().isoformat()
+        )
+        values.update(fields)
+        state[account_id] = SimpleNamespace(**values)
+    return AccountScheduler(state, list(state), AccountStateStore(accounts_storage), RateLimiter())
+
+
+def ids(accounts):
+    return [account.account_id for account in accounts]
+
+
+def test_remaining_quota_decides_order(accounts_storage):
+    scheduler = make_scheduler(accounts_storage, a0={"daily_requests": 90}, a1={"daily_requests": 10})
+
+    assert ids(scheduler.ranked_accounts()) == ["a1", "a0"]
+    assert scheduler.next_account().account_id == "a1"
+
+
+def test_unhealthy_account_goes_last(accounts_storage):
+    scheduler = make_scheduler(accounts_storage, a0={}, a1={"daily_requests": 20})
+    for _ in range(3):
+        scheduler.account_state.record_request(scheduler.accounts["a0"], "get_history", 2.0, "TimeoutError")
+
+    assert scheduler.health("a0") == 0.0
+    assert ids(scheduler.ranked_accounts()) == ["a1", "a0"]
+
+
+def test_paused_and_exhausted_accounts_are_not_ready(accounts_storage):
+    scheduler = make_scheduler(
+        accounts_storage, a0={}, a1={"daily_requests": 100}, a2={"max_hourly_requests": 1}, a3={}
+    )
+    scheduler.rate_limiter.pause("a0", 60)
+    scheduler.account_state.record_request(scheduler.accounts["a2"], "get_history", 0.1)
+
+    assert ids(scheduler.ready_accounts()) == ["a3"]
+    assert scheduler.delay(scheduler.accounts["a0"]) > 59
+    assert scheduler.delay(scheduler.accounts["a2"]) > 3500
+
+
+def test_recent_request_delays_but_keeps_account_ready(accounts_storage):
+    scheduler = make_scheduler(
+        accounts_storage, a0={"rate_limit_delay": 5.0, "last_request_time": datetime.now()}
+    )
+
+    assert 4 < scheduler.delay(scheduler.accounts["a0"]) <= 5
+    assert scheduler.ranked_accounts() == []
+    assert ids(scheduler.ready_accounts()) == ["a0"]
+
+
+def test_new_day_restores_quota(accounts_storage):
+    yesterday = (datetime.now() - timedelta(days=1)).date().isoformat()
+    scheduler = make_scheduler(accounts_storage, a0={"daily_requests": 100, "usage_date": yesterday})
+
+    assert scheduler.has_quota(scheduler.accounts["a0"])
+    assert scheduler.accounts["a0"].daily_requests == 0
+
+
+def test_wait_for_account_sleeps_until_first_is_free(accounts_storage):
+    scheduler = make_scheduler(
+        accounts_storage,
+        a0={"rate_limit_delay": 0.3, "last_request_time": datetime.now()},
+        a1={"rate_limit_delay": 0.1, "last_request_time": datetime.now()}
+    )
+
+    started = time.monotonic()
+    account = asyncio.run(scheduler.wait_for_account())
+
+    assert account.account_id == "a1"
+    assert 0.08 <= time.monotonic() - started < 0.3
@@ -0,0 +1,102 @@
+"""Тесты постоянного состояния аккаунтов MultiAccountParser"""
+
+import sqlite3
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from account_state import AccountStateStore
+from schema import ACCOUNT_MIGRATIONS, init_account_schema
+
+
+def make_account(account_id: str = "a0", **fields) -> SimpleNamespace:
+    values = dict(
+        account_id=account_id, api_id="1", phone_number="+1", daily_requests=0, max_daily_requests=100,
+        last_request_time=None, is_active=True, usage_date=None, flood_wait_until=None
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_baseline_accounts_database_is_migrated(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "accounts.db"))
+    # Таблица accounts до сохранения состояния аккаунтов
+    conn.execute('''
+        CREATE TABLE accounts (
+            account_id TEXT PRIMARY KEY, api_id TEXT, phone_number TEXT,
+            daily_requests INTEGER DEFAULT 0, last_request_time TIMESTAMP,
+            total_requests INTEGER DEFAULT 0, errors_count INTEGER DEFAULT 0,
+            is_active BOOLEAN DEFAULT TRUE, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("INSERT INTO accounts (account_id, daily_requests) VALUES ('a0', 7)")
+    conn.commit()
+
+    init_account_schema(conn)
+    init_account_schema(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == ACCOUNT_MIGRATIONS[-1][0]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(accounts)")}
+    assert {"usage_date", "flood_wait_until"} <= columns
+    assert conn.execute("SELECT daily_requests FROM accounts").fetchone() == (7,)
+    conn.close()
+
+
+def test_state_survives_restart(accounts_storage):
+    store = AccountStateStore(accounts_storage)
+    account = make_account(daily_requests=42, last_request_time=datetime.now(),
+                           usage_date=date.today().isoformat(),
+                           flood_wait_until=datetime.now() + timedelta(seconds=120))
+    store.record_request(account, "get_history", 0.2)
+    store.record_request(account, "get_history", 0.4, "RPCError")
+    store.save([account])
+
+    restarted = AccountStateStore(accounts_storage)
+    restored = make_account()
+    remaining = restarted.load(restored)
+
+    assert restored.daily_requests == 42
+    assert 100 < remaining <= 120
+    assert restarted.requests_in_window("a0") == 2
+    assert list(restarted.recent_requests("a0")) == [(0.2, True), (0.4, False)]
+    assert accounts_storage.fetchone(
+        "SELECT total_requests, errors_count FROM accounts WHERE account_id = 'a0'"
+    ) == (2, 1)
+
+
+def test_daily_counter_rolls_over(accounts_storage):
+    store = AccountStateStore(accounts_storage)
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    account = make_account(daily_requests=99, usage_date=yesterday)
+    store.save([account])
+
+    restored = make_account()
+    store.load(restored)
+
+    assert restored.daily_requests == 0
+    assert restored.usage_date == date.today().isoformat()
+    assert not store.roll_over(restored)
+
+
+def test_consecutive_errors_count_trailing_failures(accounts_storage):
+    store = AccountStateStore(accounts_storage)
+    account = make_account()
+
+    for error in (None, "TimeoutError", None, "TimeoutError", "ConnectionError"):
+        store.record_request(account, "get_history", 0.1, error)
+
+    assert store.consecutive_errors("a0") == 2
+
+
+def test_prune_removes_old_requests(accounts_storage):
+    store = AccountStateStore(accounts_storage)
+    old = (datetime.now() - timedelta(days=30)).isoformat(sep=' ')
+    with accounts_storage.transaction() as conn:
+        conn.execute(
+            "INSERT INTO rate_limits (account_id, request_type, timestamp, success) VALUES ('a0', 'x', ?, 1)", (old,)
+        )
+    store.record_request(make_account(), "get_history", 0.1)
+    store.save([])
+
+    store.prune()
+
+    assert accounts_storage.fetchone("SELECT COUNT(*) FROM rate_limits") == (1,)
@@ -0,0 +1,55 @@
+"""Тесты кэша результатов анализа"""
+
+import asyncio
+
+from analysis_cache import AnalysisCache
+
+RESULT = {'sentiment': 'positive', 'keywords': ['биткоин'], 'language': 'ru'}
+
+
+def test_forwarded_copy_hits_same_key(storage):
+    cache = AnalysisCache(storage)
+
+    key = cache.key("Биткоин  растет\n", "v1")
+
+    assert cache.key(" Биткоин растет", "v1") == key
+    # Регистр и опции анализа входят в ключ
+    assert cache.key("биткоин растет", "v1") != key
+    assert cache.key("Биткоин растет", "v2") != key
+
+
+def test_results_survive_restart(storage):
+    cache = AnalysisCache(storage)
+    key = cache.key("Биткоин растет", "v1")
+    asyncio.run(cache.put_many([(key, RESULT)]))
+
+    restarted = AnalysisCache(storage)
+    found = asyncio.run(restarted.get_many([key, cache.key("другой текст", "v1")]))
+
+    assert found == {key: RESULT}
+    assert restarted.stats == {'memory_hits': 0, 'db_hits': 1, 'misses': 1}
+    asyncio.run(restarted.get_many([key]))
+    assert restarted.stats['memory_hits'] == 1
+
+
+def test_lru_evicts_oldest(storage):
+    cache = AnalysisCache(storage, max_size=2)
+    keys = [cache.key(f"текст {i}", "v1") for i in range(3)]
+
+    asyncio.run(cache.put_many([(keys[0], RESULT), (keys[1], RESULT)]))
+    asyncio.run(cache.get_many([keys[0]]))
+    asyncio.run(cache.put_many([(keys[2], RESULT)]))
+
+    assert list(cache._entries) == [keys[0], keys[2]]
+
+
+def test_database_errors_degrade_to_misses(storage):
+    cache = AnalysisCache(storage)
+    key = cache.key("текст", "v1")
+    storage.connection().execute("DROP TABLE analysis_cache")
+
+    asyncio.run(cache.put_many([(key, RESULT)]))
+    cache._entries.clear()
+
+    assert asyncio.run(cache.get_many([key])) == {}
+    assert cache.stats['misses'] == 1
@@ -0,0 +1,73 @@
+"""Тесты колоночного архива старых сообщений"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import hourly_totals, make_message, stored_stats, write_messages
+
+pytest.importorskip("pyarrow")
+
+from archive import ArchiveConfig, archive_messages  # noqa: E402
+from exporter import iter_export  # noqa: E402
+
+OLD_DATE = (datetime.now() - timedelta(days=400)).strftime("%Y-%m-%d 12:00:00")
+NEW_DATE = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def archive(storage, tmp_path):
+    return archive_messages(storage, ArchiveConfig(directory=str(tmp_path / "archive")), older_than_days=180)
+
+
+def test_archive_keeps_counts(storage, tmp_path):
+    conn = storage.connection()
+    write_messages(conn, [
+        make_message(1, date=OLD_DATE, sentiment="positive"),
+        make_message(2, date=OLD_DATE, sentiment="negative"),
+        make_message(3, date=NEW_DATE, sentiment="neutral"),
+    ])
+    stats = stored_stats(conn)
+    hourly = hourly_totals(conn)
+
+    result = archive(storage, tmp_path)
+
+    # Архивные сообщения остаются в статистике, хотя из messages удалены
+    assert result["archived"] == 2
+    assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 1
+    assert conn.execute("SELECT archiving FROM archive_state").fetchone() == (0,)
+    assert stored_stats(conn) == stats
+    assert hourly_totals(conn) == hourly
+
+    # После архивации удаление снова уменьшает счетчики
+    with conn:
+        conn.execute("DELETE FROM messages WHERE message_id = 3")
+    assert stored_stats(conn)[('total', '')] == 2
+    assert ('sentiment', 'neutral') not in stored_stats(conn)
+
+
+def test_reparsed_archived_message_is_not_duplicated(storage, tmp_path):
+    conn = storage.connection()
+    write_messages(conn, [make_message(1, date=OLD_DATE, text="старый пост")])
+    archive(storage, tmp_path)
+
+    # Повторный обход канала приносит то же сообщение и одно новое
+    write_messages(conn, [
+        make_message(1, date=OLD_DATE, text="старый пост"),
+        make_message(2, date=NEW_DATE, text="новый пост"),
+    ])
+
+    assert conn.execute("SELECT message_id FROM messages").fetchall() == [(2,)]
+    assert stored_stats(conn)[('total', '')] == 2
+    exported = b"".join(iter_export(storage.db_path, "jsonl")).decode().splitlines()
+    assert sorted(json.loads(line)["message_id"] for line in exported) == [1, 2]
+
+
+def test_archived_ids_are_per_channel(storage, tmp_path):
+    conn = storage.connection()
+    write_messages(conn, [make_message(1, channel_id=1, date=OLD_DATE)])
+    archive(storage, tmp_path)
+
+    write_messages(conn, [make_message(1, channel_id=2, channel_name="other", date=OLD_DATE)])
+
+    assert conn.execute("SELECT channel_id, message_id FROM messages").fetchall() == [(2, 1)]
@@ -0,0 +1,38 @@
+"""Тесты векторизованного анализа батчей"""
+
+import pytest
+
+import batch_analysis
+from batch_analysis import BatchTokens, sentiment_label, sentiment_scores, tfidf_keywords
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def numpy_mode(request, monkeypatch):
+    if request.param and not batch_analysis.NUMPY_AVAILABLE:
+        pytest.skip("numpy не установлен")
+    monkeypatch.setattr(batch_analysis, "NUMPY_AVAILABLE", request.param)
+
+
+def test_ukrainian_and_kazakh_words_are_whole_tokens():
+    batch = BatchTokens(["Зустріч відбулася сьогодні, об'єкт здано", "Қазақстан ғылымы"])
+
+    assert batch.terms == ["зустріч", "відбулася", "сьогодні", "об'єкт", "здано", "қазақстан", "ғылымы"]
+    assert batch.cyrillic == [True, True]
+
+
+def test_ukrainian_keywords_keep_their_letters(numpy_mode):
+    batch = BatchTokens(["Зустріч відбулася сьогодні", "Зустріч перенесли"])
+
+    keywords, doc_terms = tfidf_keywords(batch)
+
+    assert sorted(keywords[0]) == ["відбулася", "зустріч", "сьогодні"]
+    assert keywords[0][:2] == ["відбулася", "сьогодні"]
+    assert "дбулася" not in doc_terms[0] and "сьогодн" not in doc_terms[0]
+
+
+def test_negation_flips_sentiment(numpy_mode):
+    batch = BatchTokens(["Отличный результат", "Не отличный результат", "Обычный день"])
+
+    labels = [sentiment_label(score) for score in sentiment_scores(batch)]
+
+    assert labels == ["positive", "negative", "neutral"]
@@ -0,0 +1,107 @@
+"""Тесты поиска почти-дубликатов (MinHash-LSH)"""
+
+import asyncio
+import random
+
+from dedup import Deduplicator, band_keys, minhash_signature, signature_batch, similarity
+
+VOCABULARY = (
+    "рынок биржа курс акции нефть газ доллар рубль банк ставка инфляция кредит "
+    "инвестор компания отчет прибыль выручка налог бюджет закон министр регион "
+    "город завод проект спрос цена экспорт импорт санкции сделка фонд облигации "
+    "новости заявил сообщил неделя месяц квартал рост снижение прогноз аналитик"
+).split()
+
+
+def make_texts(count: int, words: int = 40, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(count)]
+
+
+def near_duplicate(text: str, rng: random.Random) -> str:
+    """Репост: ссылка, другой регистр, пробелы и одно замененное слово"""
+    words = text.split()
+    words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    edited = "  ".join(words).upper() if rng.random() < 0.5 else " ".join(words)
+    return f"{edited} https://t.me/source/{rng.randrange(10000)}"
+
+
+def lsh_candidate(first, second) -> bool:
+    return bool(set(band_keys(first)) & set(band_keys(second)))
+
+
+def test_signature_ignores_links_case_and_whitespace():
+    text = "Курс рубля вырос на открытии торгов"
+
+    assert minhash_signature(text) == minhash_signature("  КУРС рубля   вырос на открытии торгов https://t.me/x/1")
+    assert minhash_signature("") is None
+    assert signature_batch([text, ""]) == [minhash_signature(text), None]
+
+
+def test_near_duplicate_recall():
+    rng = random.Random(11)
+    texts = make_texts(200)
+
+    found = 0
+    for text in texts:
+        first = minhash_signature(text)
+        second = minhash_signature(near_duplicate(text, rng))
+        if lsh_candidate(first, second) and similarity(first, second) >= 0.8:
+            found += 1
+
+    assert found / len(texts) >= 0.95
+
+
+def test_unrelated_texts_false_positive_rate():
+    signatures = signature_batch(make_texts(150, seed=13))
+
+    pairs = 0
+    false_positives = 0
+    for i in range(len(signatures)):
+        for j in range(i + 1, len(signatures)):
+            pairs += 1
+            if lsh_candidate(signatures[i], signatures[j]) and similarity(signatures[i], signatures[j]) >= 0.8:
+                false_positives += 1
+
+    assert false_positives / pairs <= 0.001
+
+
+def test_deduplicator_clusters_reposts(storage):
+    rng = random.Random(3)
+    originals = make_texts(50, seed=5)
+    texts = originals + [near_duplicate(text, rng) for text in originals]
+    refs = [(1, message_id, "options") for message_id in range(1, len(texts) + 1)]
+
+    deduplicator = Deduplicator(storage)
+    clusters = asyncio.run(deduplicator.assign(refs, signature_batch(texts)))
+
+    original_clusters = [cluster_id for cluster_id, _, _ in clusters[:50]]
+    repost_clusters = [cluster_id for cluster_id, _, _ in clusters[50:]]
+    assert len(set(original_clusters)) == 50
+    assert all(is_new for _, _, is_new in clusters[:50])
+    matched = sum(1 for original, repost in zip(original_clusters, repost_clusters) if original == repost)
+    assert matched / len(originals) >= 0.95
+    assert deduplicator.stats['clusters'] + deduplicator.stats['duplicates'] == len(texts)
+
+
+def test_deduplicator_reuses_canonical_analysis(storage):
+    text = make_texts(1, seed=21)[0]
+    repost = near_duplicate(text, random.Random(1))
+    analysis = {'sentiment': 'positive', 'keywords': ['рынок'], 'language': 'ru'}
+    deduplicator = Deduplicator(storage)
+
+    async def scenario():
+        (cluster_id, cached, is_new), = await deduplicator.assign([(1, 1, "options")], [minhash_signature(text)])
+        assert is_new and cached is None
+        await deduplicator.save_analysis([(cluster_id, "options", analysis)])
+
+        same, other = await deduplicator.assign(
+            [(2, 7, "options"), (2, 8, "other-options")],
+            [minhash_signature(repost), minhash_signature(repost)]
+        )
+        return cluster_id, same, other
+
+    cluster_id, same, other = asyncio.run(scenario())
+    assert same == (cluster_id, analysis, False)
+    # Анализ с другими опциями не переиспользуется
+    assert other == (cluster_id, None, False)
@@ -0,0 +1,85 @@
+"""Тесты потокового экспорта сообщений"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import exporter
+from conftest import make_message, write_messages
+from exporter import ExportFilters, check_export, export_to_file, iter_export
+
+
+@pytest.fixture
+def db_path(storage, workdir):
+    write_messages(storage.connection(), [
+        make_message(1, channel_name="crypto", date="2024-01-01 10:00:00", sentiment="positive", text="Биткоин растет"),
+        make_message(2, channel_name="crypto", date="2024-01-02 10:00:00", sentiment="negative", text="Рынок падает"),
+        make_message(3, channel_name="news", date="2024-01-03 10:00:00", sentiment="neutral", text="Новости, дня"),
+    ])
+    return storage.db_path
+
+
+def export(db_path, format_type, filters=None, **kwargs) -> bytes:
+    # Маленькие порции проверяют склейку между fetchmany
+    return b"".join(iter_export(db_path, format_type, filters, chunk_size=2, **kwargs))
+
+
+def test_json_is_one_array(db_path):
+    rows = json.loads(export(db_path, "json"))
+
+    assert [row["message_id"] for row in rows] == [3, 2, 1]
+    assert rows[0]["text"] == "Новости, дня"
+
+
+def test_jsonl_and_csv_match_json(db_path):
+    lines = export(db_path, "jsonl").decode("utf-8").splitlines()
+    table = list(csv.DictReader(io.StringIO(export(db_path, "csv").decode("utf-8"))))
+
+    assert [json.loads(line)["message_id"] for line in lines] == [3, 2, 1]
+    assert [row["message_id"] for row in table] == ["3", "2", "1"]
+    assert table[0]["text"] == "Новости, дня"
+
+
+def test_filters_go_to_sql(db_path):
+    by_channel = json.loads(export(db_path, "json", ExportFilters(channel="@crypto")))
+    by_dates = json.loads(export(db_path, "json", ExportFilters(date_from="2024-01-02", date_to="2024-01-03")))
+    by_sentiment = json.loads(export(db_path, "json", ExportFilters(sentiment="negative")))
+
+    assert [row["message_id"] for row in by_channel] == [2, 1]
+    assert [row["message_id"] for row in by_dates] == [2]
+    assert [row["message_id"] for row in by_sentiment] == [2]
+
+
+def test_empty_result_is_valid_json(db_path):
+    assert json.loads(export(db_path, "json", ExportFilters(channel="missing"))) == []
+
+
+def test_gzip_export_to_file(db_path, tmp_path):
+    filename = export_to_file(db_path, str(tmp_path / "export.jsonl.gz"), "jsonl", compress=True)
+
+    with gzip.open(filename, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["message_id"] for line in f] == [3, 2, 1]
+
+
+def test_parquet_export(db_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    table = pq.read_table(io.BytesIO(export(db_path, "parquet")))
+
+    assert table.column("message_id").to_pylist() == [3, 2, 1]
+
+
+def test_unknown_format_fails_before_streaming(db_path):
+    with pytest.raises(ValueError):
+        check_export(db_path, "xml")
+
+
+def test_parquet_without_pyarrow_fails_before_streaming(db_path, monkeypatch):
+    monkeypatch.setattr(exporter, "PYARROW_AVAILABLE", False)
+
+    with pytest.raises(RuntimeError):
+        check_export(db_path, "parquet")
+    check_export(db_path, "csv")
@@ -0,0 +1,135 @@
+"""Тесты фоновых задач парсинга и остановки веб-сервиса"""
+
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import make_message
+from job_manager import JobManager
+
+
+def config(target: str = "@channel", max_messages: int = 100):
+    return SimpleNamespace(target=target, max_messages=max_messages)
+
+
+def test_jobs_report_progress_and_result():
+    async def runner(job_config, progress):
+        progress.fetched = progress.written = 10
+        return {"success": True, "messages": 10}
+
+    async def scenario():
+        manager = JobManager(runner)
+        job = await manager.submit(config())
+        assert job.to_dict()["status"] == "queued"
+        await manager.queue.join()
+        await manager.stop()
+        return job.to_dict()
+
+    job = asyncio.run(scenario())
+
+    assert job["status"] == "completed"
+    assert job["target"] == "@channel"
+    assert job["result"] == {"success": True, "messages": 10}
+    assert job["progress"]["expected"] == 100 and job["progress"]["written"] == 10
+
+
+def test_failures_are_reported_per_job():
+    async def runner(job_config, progress):
+        if job_config.target == "@broken":
+            raise ConnectionError("нет сети")
+        return {"error": "Канал не найден"}
+
+    async def scenario():
+        manager = JobManager(runner)
+        jobs = [await manager.submit(config("@broken")), await manager.submit(config("@missing"))]
+        await manager.queue.join()
+        await manager.stop()
+        return jobs
+
+    broken, missing = asyncio.run(scenario())
+
+    assert (broken.status, broken.error) == ("failed", "нет сети")
+    assert (missing.status, missing.error) == ("failed", "Канал не найден")
+
+
+def test_workers_limit_parallel_jobs():
+    async def scenario():
+        running = []
+        peak = []
+
+        async def runner(job_config, progress):
+            running.append(job_config.target)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.remove(job_config.target)
+            return {}
+
+        manager = JobManager(runner, workers=2)
+        for i in range(6):
+            await manager.submit(config(f"@channel{i}"))
+        await manager.queue.join()
+        await manager.stop()
+        return max(peak)
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_only_finished_jobs_are_evicted():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def runner(job_config, progress):
+            if job_config.target == "@slow":
+                await release.wait()
+            return {}
+
+        manager = JobManager(runner, workers=2, max_jobs_kept=2)
+        slow = await manager.submit(config("@slow"))
+        for i in range(3):
+            await manager.submit(config(f"@fast{i}"))
+            await asyncio.sleep(0.01)
+        kept = [job["target"] for job in manager.list_jobs()]
+        release.set()
+        await manager.stop()
+        return slow, kept
+
+    slow, kept = asyncio.run(scenario())
+
+    assert kept == ["@fast2", "@slow"]
+    assert slow.error == "cancelled"
+
+
+def test_shutdown_cancels_jobs_then_drains_writer(web, monkeypatch):
+    TestClient = pytest.importorskip("fastapi.testclient").TestClient
+    events = []
+    cleanup = web.parser.cleanup
+
+    async def runner(job_config, progress):
+        await web.parser.writer.put(make_message(1), progress)
+        events.append("queued")
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    async def recorded_cleanup():
+        events.append("cleanup")
+        await cleanup()
+
+    monkeypatch.setattr(web.job_manager, "runner", runner)
+    monkeypatch.setattr(web.parser, "cleanup", recorded_cleanup)
+    web.parser.writer.config.flush_interval = 0.5
+
+    with TestClient(web.app) as client:
+        job_id = client.post("/api/parse", json={"target": "@channel"}).json()["job_id"]
+        while "queued" not in events:
+            client.get(f"/api/jobs/{job_id}")
+
+    assert events == ["queued", "cancelled", "cleanup"]
+    assert web.job_manager.get(job_id).status == "failed"
+    # Сообщение из очереди писателя сброшено в базу при остановке
+    with sqlite3.connect(web.parser.db_path) as conn:
+        assert conn.execute("SELECT message_id FROM messages").fetchall() == [(1,)]
@@ -0,0 +1,57 @@
+"""Тесты поиска ключевых слов"""
+
+from keyword_matcher import KeywordMatcher, compile_keywords, normalize_text
+
+
+def test_prefix_matches_word_forms():
+    matcher = KeywordMatcher(["биткоин", "рынок"])
+
+    assert matcher.search("Курс биткоина снова растет")
+    assert matcher.find_all("Биткоином платят на рынке") == ["биткоин"]
+
+
+def test_prefix_requires_word_start():
+    matcher = KeywordMatcher(["коин"])
+
+    assert not matcher.search("Курс биткоина снова растет")
+    assert matcher.search("Новый коин на бирже")
+
+
+def test_whole_words_rejects_word_forms():
+    matcher = KeywordMatcher(["биткоин"], whole_words=True)
+
+    assert matcher.search("Купил биткоин вчера")
+    assert matcher.search("биткоин!")
+    assert not matcher.search("Курс биткоина снова растет")
+
+
+def test_yo_and_case_are_equivalent():
+    matcher = KeywordMatcher(["Ёлка", "зеленый"])
+
+    assert matcher.find_all("ЕЛКА и зелёный шар") == ["Ёлка", "зеленый"]
+    assert normalize_text("ЁЖ") == "еж"
+
+
+def test_overlapping_keywords_report_longest_match():
+    matcher = KeywordMatcher(["крипт", "криптовалюта"], whole_words=True)
+
+    assert matcher.find_all("криптовалюта и крипт") == ["криптовалюта", "крипт"]
+
+
+def test_find_all_keeps_first_appearance_order():
+    matcher = KeywordMatcher(["рынок", "акции", "нефть"])
+
+    assert matcher.find_all("Нефть дорожает, акции падают, нефть снова") == ["нефть", "акции"]
+
+
+def test_normalized_input_skips_normalization():
+    matcher = KeywordMatcher(["Ёлка"])
+
+    assert matcher.search(normalize_text("ЁЛКА"), normalized=True)
+    assert not matcher.search("ЁЛКА", normalized=True)
+
+
+def test_compile_keywords_caches_and_handles_empty():
+    assert compile_keywords(()) is None
+    assert compile_keywords(("рынок",)) is compile_keywords(("рынок",))
+    assert compile_keywords(("рынок",), True) is not compile_keywords(("рынок",), False)
@@ -0,0 +1,47 @@
+"""Тесты офлайн определения языка"""
+
+import pytest
+
+import language_detection
+from language_detection import LanguageDetector, NgramLanguageDetector, get_detector, register_detector
+
+
+@pytest.mark.parametrize("text, language", [
+    ("Сегодня на рынке снова вырос курс биткоина", "ru"),
+    ("Сьогодні у місті відбулася велика зустріч мешканців", "uk"),
+    ("Бүгін қалада үлкен жиналыс өтті", "kk"),
+    ("The market is growing again today", "en"),
+])
+def test_ngram_detector(text, language):
+    assert NgramLanguageDetector().detect(text) == language
+
+
+def test_detector_without_detect_cannot_be_created():
+    class Incomplete(LanguageDetector):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        LanguageDetector()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_registered_detector_is_cached(monkeypatch):
+    monkeypatch.setattr(language_detection, "DETECTORS", dict(language_detection.DETECTORS))
+    monkeypatch.setattr(language_detection, "_instances", {})
+    calls = []
+
+    class Fixed(LanguageDetector):
+        name = "fixed"
+
+        def detect(self, text):
+            calls.append(text)
+            return "en"
+
+    register_detector("fixed", Fixed)
+    detector = get_detector("fixed")
+
+    assert detector.detect("текст") == "en"
+    assert detector.detect("текст") == "en"
+    assert calls == ["текст"]
+    assert get_detector("fixed") is detector
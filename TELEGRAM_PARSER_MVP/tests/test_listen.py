@@ -0,0 +1,148 @@
+"""Тесты режима реального времени: обнаружение и догрузка пропусков"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from channel_cache import ChannelInfo
+from job_manager import ParseProgress
+
+CHANNEL_ID = -1001
+
+
+class FakePyrogramClient:
+    """Клиент Pyrogram с историей канала из сообщений 1..top_id"""
+
+    def __init__(self, top_id: int, fail_after=None):
+        self.top_id = top_id
+        self.fail_after = fail_after
+        self.handlers = []
+
+    def add_handler(self, handler):
+        self.handlers.append(handler)
+
+    def remove_handler(self, handler):
+        self.handlers.remove(handler)
+
+    async def get_chat_history(self, peer, offset_id=0):
+        newest = min(offset_id - 1, self.top_id) if offset_id else self.top_id
+        for message_id in range(newest, 0, -1):
+            if self.fail_after is not None and message_id < self.fail_after:
+                raise ConnectionError("connection reset")
+            yield SimpleNamespace(id=message_id)
+
+
+@pytest.fixture
+def live_parser(web, monkeypatch):
+    parser = web.parser
+    parser.ingested = []
+
+    async def ingest(message, channel, config, analysis_options, progress):
+        parser.ingested.append(message.id)
+
+    async def resolve(target):
+        return ChannelInfo(channel_id=CHANNEL_ID, channel_name=target.lstrip('@'))
+
+    parser.current_engine = "pyrogram"
+    monkeypatch.setattr(parser, "_ingest_live", ingest)
+    monkeypatch.setattr(parser, "_resolve_pyrogram_channel", resolve)
+    return parser
+
+
+def checkpoint(parser):
+    return parser._get_checkpoint(CHANNEL_ID)
+
+
+def make_channel(web, last_seen=None, gaps=None):
+    return web.LiveChannel(
+        info=ChannelInfo(channel_id=CHANNEL_ID, channel_name="channel"), peer=CHANNEL_ID,
+        last_seen=last_seen, gaps=list(gaps or [])
+    )
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def reconcile(web, channel):
+    asyncio.run(web.parser._reconcile_channel(channel, web.ParseConfig(target="live"), {}, ParseProgress()))
+
+
+def test_missed_ids_are_fetched_and_checkpoint_advances(live_parser, monkeypatch):
+    parser = live_parser
+    parser.pyrogram_client = FakePyrogramClient(top_id=12)
+    monkeypatch.setitem(parser.config['parsing'], 'reconcile_interval', 0.05)
+
+    async def scenario():
+        await parser._write_checkpoint(CHANNEL_ID, "channel", 3)
+        task = asyncio.create_task(parser.listen(["@channel"]))
+        await wait_until(lambda: parser.pyrogram_client.handlers)
+        callback = parser.pyrogram_client.handlers[0].callback
+
+        # Сообщения 4..10 пришли, пока процесс не работал; 11 пропущено в обновлениях
+        await callback(None, SimpleNamespace(id=10, chat=SimpleNamespace(id=CHANNEL_ID)))
+        await callback(None, SimpleNamespace(id=12, chat=SimpleNamespace(id=CHANNEL_ID)))
+        await wait_until(lambda: {4, 11} <= set(parser.ingested))
+        parser.stop_listening()
+        return await task
+
+    result = asyncio.run(scenario())
+
+    assert result["success"]
+    assert sorted(set(parser.ingested)) == list(range(4, 13))
+    assert checkpoint(parser) == 12
+    assert not parser.pyrogram_client.handlers
+
+
+def test_failed_gap_keeps_unfetched_part(web, live_parser):
+    parser = live_parser
+    parser.pyrogram_client = FakePyrogramClient(top_id=20, fail_after=15)
+    channel = make_channel(web, last_seen=20, gaps=[(10, 20)])
+
+    reconcile(web, channel)
+
+    assert parser.ingested == [19, 18, 17, 16, 15]
+    assert channel.gaps == [(10, 15)]
+
+    asyncio.run(parser._save_live_checkpoints({CHANNEL_ID: channel}))
+    # Checkpoint не перескакивает через недогруженные 11..14
+    assert checkpoint(parser) == 10
+
+    parser.pyrogram_client.fail_after = None
+    reconcile(web, channel)
+    asyncio.run(parser._save_live_checkpoints({CHANNEL_ID: channel}))
+
+    assert parser.ingested[5:] == [14, 13, 12, 11]
+    assert channel.gaps == []
+    assert checkpoint(parser) == 20
+
+
+def test_quiet_channel_is_checked_for_missed_messages(web, live_parser, monkeypatch):
+    parser = live_parser
+    parser.pyrogram_client = FakePyrogramClient(top_id=7)
+    monkeypatch.setitem(parser.config['parsing'], 'quiet_check_interval', 0)
+    channel = make_channel(web, last_seen=5)
+
+    reconcile(web, channel)
+
+    assert parser.ingested == [7, 6]
+    assert channel.last_seen == 7 and channel.gaps == []
+
+
+def test_unwritten_messages_become_a_gap(web, live_parser):
+    parser = live_parser
+    channel = make_channel(web, last_seen=30)
+    parser.writer._failed[CHANNEL_ID] = 25
+
+    async def scenario():
+        parser._reconcile_event = asyncio.Event()
+        await parser._save_live_checkpoints({CHANNEL_ID: channel})
+        return parser._reconcile_event.is_set()
+
+    assert asyncio.run(scenario())
+    assert channel.gaps == [(24, None)]
+    assert checkpoint(parser) == 24
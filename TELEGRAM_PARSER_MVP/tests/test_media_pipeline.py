@@ -0,0 +1,76 @@
+"""Тесты загрузки медиа в хранилище по содержимому"""
+
+import asyncio
+import hashlib
+
+from media_pipeline import MediaConfig, MediaDownloader, MediaItem
+
+
+def make_item(message_id: int, content: bytes, file_unique_id=None, size=None, chunk_size: int = 4) -> MediaItem:
+    async def stream():
+        for start in range(0, len(content), chunk_size):
+            await asyncio.sleep(0)
+            yield content[start:start + chunk_size]
+
+    return MediaItem(
+        channel_id=1, message_id=message_id, media_type="photo",
+        file_unique_id=file_unique_id, size=size, mime_type=None, stream=stream
+    )
+
+
+def download(storage, tmp_path, items, max_file_size: int = 1024):
+    downloader = MediaDownloader(storage, MediaConfig(
+        enabled=True, directory=str(tmp_path / "media"), max_file_size=max_file_size, concurrency=2
+    ))
+
+    async def scenario():
+        for item in items:
+            assert downloader.accepts(item)
+            await downloader.put(item)
+        await downloader.stop()
+
+    asyncio.run(scenario())
+    return downloader
+
+
+def stored_files(tmp_path):
+    return sorted(path.name for path in (tmp_path / "media").rglob("*") if path.is_file())
+
+
+def test_same_content_is_stored_once(storage, tmp_path):
+    content = b"photo bytes " * 10
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    downloader = download(storage, tmp_path, [make_item(1, content), make_item(2, content, "unique")])
+
+    assert stored_files(tmp_path) == [f"{sha256}.jpg"]
+    assert storage.fetchall("SELECT sha256, size FROM media") == [(sha256, len(content))]
+    assert storage.fetchall("SELECT message_id FROM message_media ORDER BY message_id") == [(1,), (2,)]
+    assert downloader.stats['bytes'] == 2 * len(content)
+
+
+def test_known_file_unique_id_skips_download(storage, tmp_path):
+    downloader = download(storage, tmp_path, [make_item(1, b"first", "unique"), make_item(2, b"second", "unique")])
+
+    assert downloader.stats['downloaded'] == 1 and downloader.stats['deduplicated'] == 1
+    assert storage.fetchall("SELECT media_id FROM message_media") == [(1,), (1,)]
+
+
+def test_oversized_file_of_unknown_size_is_aborted(storage, tmp_path):
+    downloader = download(
+        storage, tmp_path,
+        [make_item(1, b"x" * 100, "big"), make_item(2, b"x" * 100, "big"), make_item(3, b"small")],
+        max_file_size=64
+    )
+
+    assert downloader.stats['skipped'] == 2 and downloader.stats['errors'] == 0
+    # Во временном каталоге не остается недокачанных файлов
+    assert stored_files(tmp_path) == [f"{hashlib.sha256(b'small').hexdigest()}.jpg"]
+    assert storage.fetchall("SELECT message_id FROM message_media") == [(3,)]
+
+
+def test_known_size_over_limit_is_not_queued(storage, tmp_path):
+    downloader = MediaDownloader(storage, MediaConfig(enabled=True, directory=str(tmp_path / "media"), max_file_size=64))
+
+    assert not downloader.accepts(make_item(1, b"", size=100))
+    assert downloader.stats['skipped'] == 1
@@ -0,0 +1,43 @@
+"""Тесты материализованной статистики message_stats и ее триггеров"""
+
+from conftest import expected_hourly, expected_stats, hourly_totals, make_message, stored_stats, write_messages
+
+
+class TestStatsTriggers:
+    def test_insert(self, storage):
+        conn = storage.connection()
+        write_messages(conn, [
+            make_message(1, sentiment="positive"),
+            make_message(2, sentiment="negative", language="en"),
+            make_message(3, channel_id=2, channel_name="other", sentiment=None, language=None),
+        ])
+
+        assert stored_stats(conn) == expected_stats(conn)
+        assert stored_stats(conn)[('total', '')] == 3
+        assert hourly_totals(conn) == expected_hourly(conn)
+
+    def test_upsert_moves_counts(self, storage):
+        conn = storage.connection()
+        write_messages(conn, [make_message(1, sentiment="positive"), make_message(2, sentiment="positive")])
+
+        # Повторный парсинг: другой анализ и переименованный канал
+        write_messages(conn, [
+            make_message(1, channel_name="renamed", sentiment="negative", language="en"),
+            make_message(2, sentiment="positive"),
+        ])
+
+        assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 2
+        assert stored_stats(conn) == expected_stats(conn)
+        assert stored_stats(conn)[('sentiment', 'negative')] == 1
+        assert hourly_totals(conn) == expected_hourly(conn)
+
+    def test_delete(self, storage):
+        conn = storage.connection()
+        write_messages(conn, [make_message(message_id, sentiment="neutral") for message_id in range(1, 6)])
+
+        with conn:
+            conn.execute("DELETE FROM messages WHERE message_id <= 2")
+
+        assert stored_stats(conn) == expected_stats(conn)
+        assert stored_stats(conn)[('total', '')] == 3
+        assert hourly_totals(conn) == expected_hourly(conn)
@@ -0,0 +1,69 @@
+"""Тесты метрик в формате Prometheus"""
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Metric, MetricsRegistry
+
+
+def test_counter_with_labels():
+    counter = Counter("messages_total", "Сообщения", ("channel",))
+
+    counter.inc(channel="crypto")
+    counter.inc(2, channel="crypto")
+    counter.inc(channel='say "hi"')
+
+    assert counter.value(channel="crypto") == 3
+    assert counter.render() == [
+        "# HELP messages_total Сообщения",
+        "# TYPE messages_total counter",
+        'messages_total{channel="crypto"} 3',
+        'messages_total{channel="say \\"hi\\""} 1',
+    ]
+    with pytest.raises(ValueError):
+        counter.inc(-1, channel="crypto")
+    with pytest.raises(ValueError):
+        counter.inc(stage="write")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("batch_size", "Размер", buckets=(1, 10))
+
+    for value in (1, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'batch_size_bucket{le="1"} 1',
+        'batch_size_bucket{le="10"} 2',
+        'batch_size_bucket{le="+Inf"} 3',
+        "batch_size_sum 56",
+        "batch_size_count 3",
+    ]
+
+
+def test_gauge_function_is_read_on_render():
+    gauge = Gauge("queue_depth", "Очередь", ("queue",))
+    depth = [3]
+    gauge.set_function(lambda: depth[0], queue="write")
+    gauge.set_function(lambda: 1 / 0, queue="broken")
+
+    depth[0] = 7
+
+    assert gauge.render()[2:] == ['queue_depth{queue="write"} 7']
+
+
+def test_registry_renders_all_and_rejects_duplicates():
+    registry = MetricsRegistry()
+    registry.register(Counter("a_total", "A")).inc()
+    registry.register(Gauge("b", "B")).set(1.5)
+
+    with pytest.raises(ValueError):
+        registry.register(Counter("a_total", "A"))
+    assert registry.render().splitlines()[2::3] == ["a_total 1", "b 1.5"]
+
+
+def test_metric_without_samples_cannot_be_created():
+    class Incomplete(Metric):
+        type_name = "gauge"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Без samples")
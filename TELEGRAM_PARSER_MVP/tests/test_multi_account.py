@@ -0,0 +1,161 @@
+"""Тесты параллельного парсинга несколькими аккаунтами"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import multi_account_parser  # noqa: E402
+from multi_account_parser import MultiAccountParser, Unauthorized  # noqa: E402
+
+RATE_LIMIT_DELAY = 0.05
+
+
+class FakeClient:
+    """Клиент Pyrogram с историей канала из top_id сообщений"""
+
+    def __init__(self, account_id: str, top_id: int, calls: list, errors=None):
+        self.account_id = account_id
+        self.top_id = top_id
+        self.calls = calls
+        self.errors = list(errors or [])
+
+    async def get_chat_history(self, target, offset_id=0, limit=0):
+        self.calls.append((self.account_id, time.monotonic(), limit))
+        if self.errors:
+            raise self.errors.pop(0)
+        newest = min(offset_id - 1, self.top_id) if offset_id else self.top_id
+        for message_id in range(newest, max(newest - limit, 0), -1):
+            yield SimpleNamespace(
+                id=message_id, text=f"сообщение {message_id}", date=datetime(2024, 1, 1),
+                chat=SimpleNamespace(id=100, username="channel", title="Канал"),
+                from_user=None, media=None, views=1
+            )
+
+
+def write_config(accounts: int, retry_delay: float = 60.0):
+    config = {
+        "scaling": {
+            "max_concurrent_accounts": accounts,
+            "global_rate_limit": 0.001,
+            "account_rotation_interval": 20,
+            "retry_delay": retry_delay,
+            "max_retries": 2
+        },
+        "database": {"path": "telegram_data.db"},
+        "accounts": [
+            {
+                "account_id": f"a{i}", "api_id": "1", "api_hash": "hash", "phone_number": f"+{i}",
+                "session_name": f"session_{i}", "rate_limit_delay": RATE_LIMIT_DELAY
+            }
+            for i in range(accounts)
+        ]
+    }
+    with open("multi_account_config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+
+@pytest.fixture
+def make_parser(workdir, monkeypatch):
+    parsers = []
+
+    def make(accounts: int = 3, top_id: int = 200, errors=None, retry_delay: float = 60.0):
+        write_config(accounts, retry_delay)
+        parser = MultiAccountParser()
+        parser.calls = []
+        clients = {
+            account_id: FakeClient(account_id, top_id, parser.calls, (errors or {}).get(account_id))
+            for account_id in parser.accounts
+        }
+
+        async def get(account):
+            return clients[account.account_id]
+
+        monkeypatch.setattr(parser.client_pool, "get", get)
+        parsers.append(parser)
+        return parser
+
+    yield make
+    for parser in parsers:
+        asyncio.run(parser.close())
+
+
+def stored_ids(parser):
+    return [row[0] for row in parser.writer.storage.fetchall("SELECT message_id FROM messages ORDER BY message_id")]
+
+
+def test_all_accounts_share_ranges(make_parser):
+    parser = make_parser(accounts=3)
+
+    result = asyncio.run(parser.parse_with_account_rotation("@channel", 200))
+
+    assert result["success"] and result["messages_parsed"] == 200
+    assert stored_ids(parser) == list(range(1, 201))
+    # Аккаунт, который узнал top_id, тоже получает диапазоны
+    assert sorted(result["accounts_used"]) == ["a0", "a1", "a2"]
+
+
+def test_requests_of_one_account_respect_rate_limit_delay(make_parser):
+    parser = make_parser(accounts=2)
+
+    asyncio.run(parser.parse_with_account_rotation("@channel", 200))
+
+    for account_id in ("a0", "a1"):
+        times = [started for caller, started, _ in parser.calls if caller == account_id]
+        assert len(times) > 1
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert min(gaps) >= RATE_LIMIT_DELAY * 0.9
+
+
+def test_transient_error_pauses_account_instead_of_disabling(make_parser):
+    # top_id узнает a0, первый диапазон a1 падает с сетевой ошибкой
+    parser = make_parser(accounts=3, errors={"a1": [ConnectionError("connection reset")]})
+
+    result = asyncio.run(parser.parse_with_account_rotation("@channel", 200))
+
+    assert parser.accounts["a1"].is_active and "a1" in parser.active_accounts
+    assert parser.rate_limiter.is_paused("a1")
+    assert any("connection reset" in error for error in result["errors"])
+    # Диапазон a1 дочитали другие аккаунты
+    assert result["messages_parsed"] == 200
+
+
+def test_auth_error_disables_account(make_parser):
+    parser = make_parser(accounts=2, errors={"a1": [Unauthorized()]})
+
+    result = asyncio.run(parser.parse_with_account_rotation("@channel", 200))
+
+    assert not parser.accounts["a1"].is_active
+    assert parser.active_accounts == ["a0"]
+    assert not parser.rate_limiter.is_paused("a1")
+    assert result["success"] and result["messages_parsed"] == 200
+
+
+def test_error_cooldown_doubles_with_consecutive_failures(make_parser):
+    parser = make_parser(accounts=1, retry_delay=10)
+    account = parser.accounts["a0"]
+
+    for _ in range(3):
+        parser.account_state.record_request(account, "get_history", 0.1, "ConnectionError")
+    parser._account_error(account, ConnectionError("timeout"))
+
+    remaining = parser.rate_limiter.paused_until["a0"] - time.monotonic()
+    assert 39 < remaining <= 40
+    assert account.is_active
+
+
+def test_error_cooldown_is_capped(make_parser, monkeypatch):
+    parser = make_parser(accounts=1, retry_delay=600)
+    account = parser.accounts["a0"]
+    monkeypatch.setattr(multi_account_parser, "MAX_ERROR_COOLDOWN", 900.0)
+
+    for _ in range(5):
+        parser.account_state.record_request(account, "get_history", 0.1, "TimeoutError")
+    parser._account_error(account, TimeoutError())
+
+    assert parser.rate_limiter.paused_until["a0"] - time.monotonic() <= 900
@@ -0,0 +1,71 @@
+"""Тесты общего ограничителя запросов"""
+
+import asyncio
+import time
+
+from rate_limiter import RateLimiter, TokenBucket
+
+
+def test_bucket_allows_burst_then_limits_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20.0, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(4):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(scenario())
+
+    assert burst < 0.05
+    # Четыре токена сверх запаса приходят со скоростью 20 в секунду
+    assert total >= 4 / 20 * 0.9
+
+
+def test_concurrent_clients_share_one_bucket():
+    async def scenario():
+        limiter = RateLimiter(requests_per_second=50.0, burst=1)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire(f"client{i % 3}") for i in range(6)))
+        return limiter, time.monotonic() - started
+
+    limiter, elapsed = asyncio.run(scenario())
+
+    assert limiter.stats['requests'] == 6
+    assert elapsed >= 5 / 50 * 0.9
+
+
+def test_flood_wait_pauses_only_affected_client():
+    async def scenario():
+        limiter = RateLimiter(requests_per_second=1000.0, burst=10)
+        limiter.pause("pyrogram", 0.2)
+        order = []
+
+        async def request(client_key):
+            await limiter.acquire(client_key)
+            order.append(client_key)
+
+        started = time.monotonic()
+        await asyncio.gather(request("pyrogram"), request("telethon"))
+        return limiter, order, time.monotonic() - started
+
+    limiter, order, elapsed = asyncio.run(scenario())
+
+    assert order == ["telethon", "pyrogram"]
+    assert elapsed >= 0.18
+    assert limiter.stats['flood_waits'] == 1
+    assert not limiter.is_paused("pyrogram")
+
+
+def test_restored_pause_is_not_counted_again():
+    limiter = RateLimiter()
+
+    limiter.pause("account", 30, restored=True)
+    limiter.pause("account", 5)
+
+    assert limiter.is_paused("account")
+    assert limiter.stats['flood_waits'] == 1
+    # Более короткая пауза не сокращает уже действующую
+    assert limiter.paused_until["account"] - time.monotonic() > 25
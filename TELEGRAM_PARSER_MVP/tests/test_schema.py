@@ -0,0 +1,155 @@
+"""Тесты миграций схемы и уникальности сообщений"""
+
+import sqlite3
+
+import pytest
+
+import schema
+from conftest import expected_hourly, expected_stats, hourly_totals, make_message, stored_stats, write_messages
+from schema import SCHEMA_MIGRATIONS, init_schema
+
+LATEST_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Схема до миграций: без уникального индекса, поэтому возможны дубликаты
+BASELINE_SCHEMA = [
+    '''
+        CREATE TABLE messages (
+            id INTEGER PRIMARY KEY,
+            message_id INTEGER,
+            text TEXT,
+            date TIMESTAMP,
+            author TEXT,
+            author_id_hash TEXT,
+            channel_id INTEGER,
+            channel_name TEXT,
+            message_type TEXT,
+            media_type TEXT,
+            media_url TEXT,
+            reply_to INTEGER,
+            views INTEGER,
+            forwards INTEGER,
+            sentiment TEXT,
+            keywords TEXT,
+            language TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE TABLE channels (
+            id INTEGER PRIMARY KEY,
+            channel_id INTEGER UNIQUE,
+            channel_name TEXT,
+            title TEXT,
+            description TEXT,
+            members_count INTEGER,
+            type TEXT,
+            is_verified BOOLEAN,
+            is_scam BOOLEAN,
+            is_fake BOOLEAN,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE TABLE parsing_stats (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT,
+            channel_name TEXT,
+            messages_parsed INTEGER,
+            errors_count INTEGER,
+            start_time TIMESTAMP,
+            end_time TIMESTAMP,
+            config TEXT
+        )
+    ''',
+]
+
+BASELINE_ROWS = [
+    # (message_id, text, date, channel_id, channel_name, sentiment, keywords, language)
+    (1, "Биткоин растет", "2024-01-01 10:15:00", 1, "crypto", "positive", '["биткоин"]', "ru"),
+    (2, "Рынок падает", "2024-01-01 10:45:00", 1, "crypto", "negative", '["рынок"]', "ru"),
+    (1, "Биткоин растет снова", "2024-01-01 10:15:00", 1, "crypto", "neutral", '["биткоин"]', "ru"),
+    (1, "Oil prices", "2024-01-02 08:00:00", 2, "markets", "neutral", "not json", "en"),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "baseline.db"))
+    for sql in BASELINE_SCHEMA:
+        conn.execute(sql)
+    conn.executemany(
+        "INSERT INTO messages (message_id, text, date, channel_id, channel_name, sentiment, keywords, language) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        BASELINE_ROWS
+    )
+    conn.execute("INSERT INTO channels (channel_id, channel_name) VALUES (1, 'crypto')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+class TestMigrations:
+    def test_baseline_database_is_migrated(self, baseline_db):
+        init_schema(baseline_db)
+
+        assert baseline_db.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+        # Дубликаты схлопнуты в самую свежую копию
+        rows = baseline_db.execute(
+            "SELECT channel_id, message_id, text FROM messages ORDER BY channel_id, message_id"
+        ).fetchall()
+        assert rows == [(1, 1, "Биткоин растет снова"), (1, 2, "Рынок падает"), (2, 1, "Oil prices")]
+        assert stored_stats(baseline_db) == expected_stats(baseline_db)
+        assert hourly_totals(baseline_db) == expected_hourly(baseline_db)
+        assert baseline_db.execute(
+            "SELECT count FROM analytics_keywords_daily WHERE channel_name = 'crypto' AND keyword = 'биткоин'"
+        ).fetchone() == (1,)
+        # Полнотекстовый индекс построен по существующим строкам
+        assert baseline_db.execute(
+            "SELECT rowid FROM messages_fts WHERE messages_fts MATCH 'рынок'"
+        ).fetchall() == [(2,)]
+        columns = {row[1] for row in baseline_db.execute("PRAGMA table_info(channels)")}
+        assert {"access_hash", "updated_at"} <= columns
+
+    def test_unique_index_rejects_duplicates_after_migration(self, baseline_db):
+        init_schema(baseline_db)
+
+        with pytest.raises(sqlite3.IntegrityError):
+            baseline_db.execute("INSERT INTO messages (channel_id, message_id) VALUES (1, 1)")
+
+    def test_rerun_is_noop(self, baseline_db):
+        init_schema(baseline_db)
+        stats = stored_stats(baseline_db)
+
+        init_schema(baseline_db)
+
+        assert baseline_db.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+        assert stored_stats(baseline_db) == stats
+
+    def test_failed_version_is_rolled_back(self, baseline_db, monkeypatch):
+        broken = [
+            (version, statements + ["SELECT * FROM missing_table"] if version == 4 else statements)
+            for version, statements in SCHEMA_MIGRATIONS
+        ]
+        monkeypatch.setattr(schema, "SCHEMA_MIGRATIONS", broken)
+
+        with pytest.raises(sqlite3.OperationalError):
+            init_schema(baseline_db)
+
+        assert baseline_db.execute("PRAGMA user_version").fetchone()[0] == 3
+        columns = {row[1] for row in baseline_db.execute("PRAGMA table_info(channels)")}
+        assert "access_hash" not in columns
+
+        monkeypatch.setattr(schema, "SCHEMA_MIGRATIONS", SCHEMA_MIGRATIONS)
+        init_schema(baseline_db)
+        assert baseline_db.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+
+
+def test_rewrite_updates_existing_row(storage):
+    conn = storage.connection()
+    write_messages(conn, [make_message(1, text="первая версия", views=10)])
+
+    write_messages(conn, [make_message(1, text="исправленный текст", views=25)])
+
+    assert conn.execute("SELECT message_id, text, views FROM messages").fetchall() == [
+        (1, "исправленный текст", 25)
+    ]
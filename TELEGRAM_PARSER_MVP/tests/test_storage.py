@@ -0,0 +1,57 @@
+"""Тесты слоя хранения и чтений вне цикла событий"""
+
+import asyncio
+import threading
+
+import pytest
+
+
+def test_run_uses_single_db_thread(storage):
+    async def scenario():
+        first = await storage.run(threading.get_ident)
+        second = await storage.run(threading.get_ident)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second != threading.get_ident()
+
+
+def test_connections_are_per_thread(storage):
+    connection = storage.connection()
+
+    assert storage.connection() is connection
+    assert asyncio.run(asyncio.to_thread(storage.connection)) is not connection
+
+
+def test_reads_in_other_threads_see_committed_writes(storage):
+    asyncio.run(storage.run_write("INSERT INTO channels (channel_id, channel_name) VALUES (1, 'crypto')"))
+
+    rows = asyncio.run(asyncio.to_thread(storage.fetchall, "SELECT channel_name FROM channels"))
+
+    assert rows == [("crypto",)]
+
+
+def test_read_endpoints_leave_event_loop(web, monkeypatch):
+    TestClient = pytest.importorskip("fastapi.testclient").TestClient
+    calls = []
+
+    def record(name, result):
+        def handler(*args):
+            try:
+                asyncio.get_running_loop()
+                calls.append((name, "event loop"))
+            except RuntimeError:
+                calls.append((name, "thread"))
+            return result
+        return handler
+
+    monkeypatch.setattr(web.parser, "get_statistics", record("stats", {}))
+    monkeypatch.setattr(web.parser, "search", record("search", {"results": []}))
+    monkeypatch.setattr(web.parser.analytics, "timeseries", record("timeseries", []))
+
+    with TestClient(web.app) as client:
+        assert client.get("/api/stats").status_code == 200
+        assert client.get("/api/search", params={"q": "рынок"}).status_code == 200
+        assert client.get("/api/analytics/timeseries").status_code == 200
+
+    assert calls == [("stats", "thread"), ("search", "thread"), ("timeseries", "thread")]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+🕉️ Text Analysis - Функции анализа текста
+
+Чистые функции без состояния парсера: их можно вызывать
+в отдельных процессах (ProcessPoolExecutor) батчами.
+Тональность и ключевые слова считаются векторно по всему батчу
+(batch_analysis.py), язык - по каждому тексту.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from textblob import TextBlob
+    AI_AVAILABLE = True
+except ImportError:
+    AI_AVAILABLE = False
+
+from batch_analysis import (
+    BatchTokens, corpus_frequencies, is_keyword_term, sentiment_label, sentiment_scores, tfidf_keywords
+)
+from keyword_matcher import compile_keywords, normalize_text
+from language_detection import get_detector
+
+logger = logging.getLogger(__name__)
+
+KEYWORDS_TOP_N = 5
+
+# Версия анализаторов: увеличивать при любом изменении результатов,
+# иначе кэш анализа (analysis_cache.py) вернет устаревшие значения
+ANALYZER_VERSION = 3
+
+
+def analyzer_version() -> str:
+    """Версия анализаторов с учетом доступных библиотек"""
+    return f"{ANALYZER_VERSION}:{'textblob' if AI_AVAILABLE else 'none'}"
+
+
+def _textblob_sentiment(text: str) -> Optional[str]:
+    """Тональность TextBlob - только для текстов без кириллицы"""
+    try:
+        polarity = TextBlob(text).sentiment.polarity
+        if polarity > 0.1:
+            return "positive"
+        elif polarity < -0.1:
+            return "negative"
+        else:
+            return "neutral"
+    except Exception as e:
+        logger.warning(f"Ошибка анализа тональности: {e}")
+        return None
+
+
+def _sentiments(texts: List[str], batch: BatchTokens) -> List[Optional[str]]:
+    labels = [sentiment_label(score) for score in sentiment_scores(batch)]
+    if AI_AVAILABLE:
+        # Словарь русский: латинские тексты по-прежнему оценивает TextBlob
+        for index, has_cyrillic in enumerate(batch.cyrillic):
+            if not has_cyrillic and batch.lengths[index]:
+                labels[index] = _textblob_sentiment(texts[index])
+    return labels
+
+
+def _merge_keywords(text: str, ranked: List[str], tracked: Tuple[str, ...], top_n: int) -> List[str]:
+    """
+    Сначала отслеживаемые слова из конфигурации, затем топ TF-IDF
+
+    Словоформа найденного отслеживаемого слова ("катастрофа" при слове
+    "катастроф") не добавляется второй раз.
+    """
+    matcher = compile_keywords(tuple(tracked))
+    keywords = matcher.find_all(text)[:top_n] if matcher else []
+    prefixes = tuple(normalize_text(word) for word in keywords)
+    for word in ranked:
+        if len(keywords) >= top_n:
+            break
+        if not word.startswith(prefixes):
+            keywords.append(word)
+    return keywords
+
+
+def analyze_sentiment(text: str) -> Optional[str]:
+    """Анализ тональности текста"""
+    return _sentiments([text], BatchTokens([text]))[0]
+
+
+def extract_keywords(text: str, top_n: int = KEYWORDS_TOP_N, tracked: Tuple[str, ...] = ()) -> List[str]:
+    """Извлечение ключевых слов (IDF только по самому тексту, без корпуса)"""
+    try:
+        # Запас кандидатов на случай совпадений с отслеживаемыми словами
+        keywords, _ = tfidf_keywords(BatchTokens([text]), top_n + len(tracked))
+        return _merge_keywords(text, keywords[0], tracked, top_n)
+    except Exception as e:
+        logger.warning(f"Ошибка извлечения ключевых слов: {e}")
+        return []
+
+
+def detect_language(text: str, detector: str = "ngram") -> Optional[str]:
+    """Определение языка текста (офлайн, без сетевых вызовов)"""
+    try:
+        return get_detector(detector).detect(text)
+    except Exception as e:
+        logger.warning(f"Ошибка определения языка: {e}")
+        return None
+
+
+def analyze_batch(items: List[Tuple[str, Dict]]) -> List[Dict]:
+    """
+    Анализ батча текстов
+
+    items - пары (текст, опции), где опции - флаги sentiment/keywords/language
+    и имя детектора языка language_detector, tracked_keywords - ключевые слова
+    конфигурации парсинга, corpus_db - база с корпусом IDF.
+    Возвращает по словарю с результатами на каждый текст; при включенных
+    ключевых словах в нем есть terms - термы текста для обновления корпуса.
+    """
+    texts = [text or '' for text, _ in items]
+    batch = BatchTokens(texts)
+
+    sentiments = [None] * len(items)
+    if any(options.get('sentiment') for _, options in items):
+        sentiments = _sentiments(texts, batch)
+
+    keywords = doc_terms = [[] for _ in items]
+    keyword_options = [options for _, options in items if options.get('keywords')]
+    if keyword_options:
+        corpus_db = keyword_options[0].get('corpus_db')
+        candidates = [term for term in batch.terms if is_keyword_term(term)]
+        documents, corpus_df = corpus_frequencies(corpus_db, candidates) if corpus_db else (0, {})
+        tracked = max(len(options.get('tracked_keywords', ())) for options in keyword_options)
+        keywords, doc_terms = tfidf_keywords(batch, KEYWORDS_TOP_N + tracked, documents, corpus_df)
+
+    results = []
+    for index, (text, options) in enumerate(items):
+        result = {
+            'sentiment': sentiments[index] if options.get('sentiment') else None,
+            'keywords': _merge_keywords(texts[index], keywords[index], options.get('tracked_keywords', ()), KEYWORDS_TOP_N)
+            if options.get('keywords') else [],
+            'language': detect_language(texts[index], options.get('language_detector', 'ngram'))
+            if options.get('language') else None
+        }
+        if options.get('keywords'):
+            result['terms'] = doc_terms[index]
+        results.append(result)
+    return results